@@ -0,0 +1,291 @@
+"""Headless benchmarks voor de capture en detectie pipeline
+
+Voorbeeld:
+    python benchmark.py replay opnames/worp1.avi --detect
+    python benchmark.py replay opnames/frames/ --realtime
+    python benchmark.py board --width 1280 --height 720
+    python benchmark.py multiscale --scales 1 0.25 0.125
+"""
+import argparse
+import copy
+import json
+import logging
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from src.board_detection import BoardDetectionPipeline
+from src.camera import Camera
+from src.detector import DartboardDetector
+from src.sources import create_frame_source
+
+logger = logging.getLogger('dart_scorer.benchmark')
+
+
+def load_camera_config(config_path, cam_name='camera1'):
+    """Camera configuratie uit het config bestand als basis voor een replay"""
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    return copy.deepcopy(config['cameras'][cam_name])
+
+
+def summarize(name, durations):
+    """Gemiddelde en p95 van een lijst met tijden in seconden"""
+    if not durations:
+        return f"{name}: geen metingen"
+    values = np.asarray(durations) * 1000.0
+    return (f"{name}: gemiddeld {values.mean():.2f} ms, "
+            f"p95 {np.percentile(values, 95):.2f} ms, max {values.max():.2f} ms")
+
+
+def synthetic_board(width, height, center=None, radius=None, noise=8, seed=0):
+    """Eenvoudig synthetisch bord: lichte achtergrond, donkere dubbele ring en segmentlijnen"""
+    rng = np.random.default_rng(seed)
+    center = center or (width // 2, height // 2)
+    radius = radius or int(height * 0.35)
+    frame = np.full((height, width, 3), 190, np.uint8)
+    cv2.circle(frame, center, radius, (25, 25, 25), max(3, radius // 25))
+    cv2.circle(frame, center, int(radius * 0.6), (25, 25, 25), max(2, radius // 40))
+    for i in range(20):
+        angle = np.radians(i * 18 + 9)
+        end = (int(center[0] + radius * np.cos(angle)), int(center[1] + radius * np.sin(angle)))
+        cv2.line(frame, center, end, (120, 120, 120), 1)
+    noise_frame = rng.integers(-noise, noise + 1, frame.shape, dtype=np.int16)
+    return np.clip(frame.astype(np.int16) + noise_frame, 0, 255).astype(np.uint8)
+
+
+def legacy_detect_board(frame):
+    """De oorspronkelijke detect_board (nieuwe CLAHE, kernel en maskers per frame), ter vergelijking"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+    enhanced = clahe.apply(gray)
+    blurred = cv2.GaussianBlur(enhanced, (5, 5), 0)
+    _, thresh = cv2.threshold(blurred, 70, 255, cv2.THRESH_BINARY_INV)
+    edges = cv2.Canny(thresh, 30, 150)
+    kernel = np.ones((3, 3), np.uint8)
+    dilated = cv2.dilate(edges, kernel, iterations=1)
+    circles = cv2.HoughCircles(dilated, cv2.HOUGH_GRADIENT, dp=1, minDist=frame.shape[0] // 2,
+                               param1=50, param2=30, minRadius=int(frame.shape[0] * 0.25),
+                               maxRadius=int(frame.shape[0] * 0.45))
+    if circles is None:
+        return None
+    valid = []
+    for x, y, r in np.uint16(np.around(circles))[0]:
+        if x > r and x < frame.shape[1] - r and y > r and y < frame.shape[0] - r:
+            mask = np.zeros_like(gray)
+            cv2.circle(mask, (int(x), int(y)), int(r), 255, 3)
+            if cv2.mean(gray, mask=mask)[0] < 100:
+                valid.append((int(x), int(y), int(r)))
+    return min(valid, key=lambda c: c[2]) if valid else None
+
+
+def load_frames(source, count, width, height):
+    """Frames uit een opname, of synthetische borden met een verschuivend centrum"""
+    if source is None:
+        return [synthetic_board(width, height, (width // 2 + i % 7, height // 2 - i % 5), seed=i)
+                for i in range(count)]
+    cap = create_frame_source(source, {'replay': 'fast'})
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def labelled_frames(args):
+    """Frames met de echte (center, radius): synthetisch, of een opname met een labels bestand
+
+    Het labels bestand is een JSON lijst met per frame {"center": [x, y], "radius": r}.
+    """
+    if args.source is None:
+        frames, labels = [], []
+        rng = np.random.default_rng(args.seed)
+        for i in range(args.frames):
+            radius = int(args.height * rng.uniform(0.3, 0.4))
+            center = (int(args.width / 2 + rng.integers(-40, 41)), int(args.height / 2 + rng.integers(-20, 21)))
+            frames.append(synthetic_board(args.width, args.height, center, radius, seed=i))
+            labels.append((center[0], center[1], radius))
+        return frames, labels
+    if args.labels is None:
+        raise SystemExit("Een opname heeft een --labels bestand nodig")
+    with open(args.labels, 'r') as f:
+        labels = [(l['center'][0], l['center'][1], l['radius']) for l in json.load(f)]
+    frames = load_frames(args.source, min(args.frames, len(labels)), args.width, args.height)
+    return frames, labels[:len(frames)]
+
+
+def measure(detect, frames):
+    """Tijd per frame en de piek aan Python/numpy allocaties per frame"""
+    detect(frames[0])  # opwarmen: buffers en caches aanmaken
+    durations = []
+    for frame in frames:
+        start = time.perf_counter()
+        detect(frame)
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    peaks = []
+    for frame in frames[:20]:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        detect(frame)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    return durations, float(np.mean(peaks))
+
+
+def run_board(args):
+    """Vergelijk de oorspronkelijke bord detectie met BoardDetectionPipeline"""
+    with open(args.board_config, 'r') as f:
+        board_config = json.load(f)
+    frames = load_frames(args.source, args.frames, args.width, args.height)
+    if not frames:
+        raise SystemExit("Geen frames om te meten")
+    pipeline = BoardDetectionPipeline(board_config['board_detection'])
+
+    print(f"{len(frames)} frames van {frames[0].shape[1]}x{frames[0].shape[0]}")
+    results = {}
+    for name, detect in (('Origineel', legacy_detect_board), ('Pipeline', pipeline.detect)):
+        durations, peak = measure(detect, frames)
+        results[name] = np.mean(durations)
+        found = sum(detect(frame) is not None for frame in frames)
+        print(summarize(name, durations))
+        print(f"  allocaties per frame (piek): {peak / 1024:.0f} KiB, bord gevonden: {found}/{len(frames)}")
+    print(f"Versnelling: {results['Origineel'] / results['Pipeline']:.2f}x")
+
+
+def run_multiscale(args):
+    """Grof-naar-fijn bord detectie per schaal: snelheid en afwijking van de labels"""
+    with open(args.board_config, 'r') as f:
+        board_config = json.load(f)
+    frames, labels = labelled_frames(args)
+    if not frames:
+        raise SystemExit("Geen frames om te meten")
+
+    print(f"{len(frames)} gelabelde frames van {frames[0].shape[1]}x{frames[0].shape[0]}")
+    baseline = None
+    for scale in args.scales:
+        config = copy.deepcopy(board_config['board_detection'])
+        config['circle_detection']['coarse_scale'] = scale
+        pipeline = BoardDetectionPipeline(config)
+        durations, _ = measure(pipeline.detect, frames)
+        center_errors, radius_errors = [], []
+        for frame, (x, y, r) in zip(frames, labels):
+            circle = pipeline.detect(frame)
+            if circle is not None:
+                center_errors.append(np.hypot(circle[0] - x, circle[1] - y))
+                radius_errors.append(abs(circle[2] - r))
+
+        mean = float(np.mean(durations))
+        baseline = baseline or mean
+        name = 'Volle resolutie' if scale >= 1.0 else f"Grof 1/{round(1 / scale)}"
+        print(summarize(name, durations) + f" ({baseline / mean:.1f}x)")
+        if center_errors:
+            print(f"  gevonden: {len(center_errors)}/{len(frames)}, "
+                  f"centrum fout gem {np.mean(center_errors):.2f} / max {np.max(center_errors):.2f} px, "
+                  f"radius fout gem {np.mean(radius_errors):.2f} / max {np.max(radius_errors):.2f} px")
+        else:
+            print(f"  gevonden: 0/{len(frames)}")
+
+
+def run_replay(args):
+    """Speel een opname af via Camera en meet de doorvoer per stap
+
+    De frames worden synchroon (zonder capture thread) gegrabd en
+    gedecodeerd, zodat elk frame precies één keer verwerkt wordt en de
+    meting deterministisch is.
+    """
+    camera_config = load_camera_config(args.config)
+    camera_config['source'] = {
+        'path': args.source,
+        'replay': 'realtime' if args.realtime else 'fast',
+        'fps': args.fps
+    }
+    camera = Camera(args.source, camera_config, buffer_size=2)
+    if not camera.initialize():
+        raise SystemExit(f"Kon bron niet openen: {args.source}")
+    camera.start(threaded=False)
+
+    detector = DartboardDetector(args.board_config) if args.detect else None
+    read_times, detect_times = [], []
+    detections = 0
+    seq = 0
+    start = time.perf_counter()
+    try:
+        while args.max_frames is None or seq < args.max_frames:
+            read_start = time.perf_counter()
+            if not camera.grab():
+                break
+            seq = camera.retrieve(time.time())
+            read_times.append(time.perf_counter() - read_start)
+            if seq is None:
+                break
+
+            if detector is not None:
+                with camera.acquire_frame(seq) as lease:
+                    detect_start = time.perf_counter()
+                    found, _ = detector.detect_board(lease.frame)
+                    detect_times.append(time.perf_counter() - detect_start)
+                    detections += int(found)
+    finally:
+        elapsed = time.perf_counter() - start
+        camera.stop()
+
+    frames = len(read_times)
+    print(f"Frames: {frames} in {elapsed:.2f} s ({frames / max(elapsed, 1e-9):.1f} fps)")
+    print(summarize('Lezen', read_times))
+    if detector is not None:
+        print(summarize('Bord detectie', detect_times))
+        print(f"Bord gevonden in {detections}/{frames} frames")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dart scorer benchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    replay = subparsers.add_parser('replay', help='Doorvoer van een opname meten')
+    replay.add_argument('source', help='Videobestand of map met afbeeldingen')
+    replay.add_argument('--realtime', action='store_true',
+                        help='Afspelen op opnametempo in plaats van zo snel mogelijk')
+    replay.add_argument('--fps', type=float, default=30.0,
+                        help='Framerate voor een map met afbeeldingen')
+    replay.add_argument('--max-frames', type=int, default=None)
+    replay.add_argument('--detect', action='store_true', help='Ook bord detectie meten')
+    replay.add_argument('--config', default='config/camera_config.json')
+    replay.add_argument('--board-config', default='config/board_config.json')
+    replay.set_defaults(func=run_replay)
+
+    board = subparsers.add_parser('board', help='Bord detectie: origineel tegen pipeline')
+    board.add_argument('--source', default=None,
+                       help='Videobestand of map met afbeeldingen (standaard synthetisch)')
+    board.add_argument('--frames', type=int, default=100)
+    board.add_argument('--width', type=int, default=1280)
+    board.add_argument('--height', type=int, default=720)
+    board.add_argument('--board-config', default='config/board_config.json')
+    board.set_defaults(func=run_board)
+
+    multiscale = subparsers.add_parser('multiscale', help='Grof-naar-fijn bord detectie tegen labels')
+    multiscale.add_argument('--source', default=None,
+                            help='Videobestand of map met afbeeldingen (standaard synthetisch)')
+    multiscale.add_argument('--labels', default=None, help='JSON met center en radius per frame')
+    multiscale.add_argument('--scales', type=float, nargs='+', default=[1.0, 0.25, 0.125])
+    multiscale.add_argument('--frames', type=int, default=40)
+    multiscale.add_argument('--width', type=int, default=1280)
+    multiscale.add_argument('--height', type=int, default=720)
+    multiscale.add_argument('--seed', type=int, default=0)
+    multiscale.add_argument('--board-config', default='config/board_config.json')
+    multiscale.set_defaults(func=run_multiscale)
+
+    args = parser.parse_args()
+    # Geen info logging tijdens het meten
+    logging.getLogger('dart_scorer').setLevel(logging.WARNING)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
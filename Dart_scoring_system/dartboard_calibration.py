@@ -7,12 +7,16 @@ import math
 import json
 import logging
 
+from src.frame_worker import FrameWorker
+from src.geometry import SEGMENT_ANGLE, STANDARD_SEGMENT_START, STANDARD_SEGMENTS
+from src.rotation import estimate_rotation
+
 logger = logging.getLogger('dart_scorer.calibration')
 
 class DartboardDetector:
     def __init__(self):
-        # Dartbord segment waardes (van buitenaf met de klok mee)
-        self.segments = [10, 15, 2, 17, 3, 19, 7, 16, 8, 11, 14, 9, 12, 5, 20, 1, 18, 4, 13, 6]
+        # Dartbord segment waardes met de klok mee vanaf de 20 (standaard layout)
+        self.segments = STANDARD_SEGMENTS
         
         # Ring multiplicators
         self.DOUBLE_RING = 2
@@ -76,7 +80,7 @@ class DartboardDetector:
         
         # Draw segment lines
         for i in range(20):
-            angle = math.radians(i * 18 + rotation_offset)
+            angle = math.radians(STANDARD_SEGMENT_START + i * SEGMENT_ANGLE + rotation_offset)
             end_x = int(center[0] + radius * math.cos(angle))
             end_y = int(center[1] + radius * math.sin(angle))
             cv2.line(overlay, center, (end_x, end_y), (0, 255, 0), 1)
@@ -95,9 +99,12 @@ class DartboardDetector:
 
 
 class DartboardCalibrationScreen:
-    def __init__(self, root, cameras):
+    def __init__(self, root, camera_manager):
         self.root = root
-        self.cameras = cameras
+        self.camera_manager = camera_manager
+        self.camera_names = [name for name in ('camera1', 'camera2', 'camera3')
+                             if name in camera_manager.cameras]
+        self.calibrations = {}
         
         # Reset root window
         for widget in self.root.winfo_children():
@@ -110,6 +117,7 @@ class DartboardCalibrationScreen:
         self.detector = DartboardDetector()
         self.preview_active = False
         self.rotation_offset = 0
+        self.frame_worker = None
         
         # Main frame
         self.main_frame = tk.Frame(self.root, bg='#1a75ff', padx=20, pady=20)
@@ -189,6 +197,12 @@ class DartboardCalibrationScreen:
             text="+",
             command=lambda: self.adjust_rotation(5)
         ).pack(side='left', padx=2)
+        
+        ttk.Button(
+            rotation_frame,
+            text="Auto",
+            command=self.auto_rotation
+        ).pack(side='left', padx=2)
 
     def setup_control_buttons(self):
         """Setup control buttons"""
@@ -222,76 +236,106 @@ class DartboardCalibrationScreen:
     def start_processing(self):
         """Start camera verwerking"""
         self.preview_active = True
-        self.process_frame()
+        self.start_frame_worker()
+
+    def start_frame_worker(self):
+        """Ontvang alleen nieuwe frames van de huidige camera, via een worker thread"""
+        if self.frame_worker is not None:
+            self.frame_worker.stop()
+        self.frame_worker = FrameWorker(self.root, self.camera_manager, self.current_camera_name(),
+                                        self.resize_frame, self.process_frame)
+        self.frame_worker.start()
+
+    @classmethod
+    def resize_frame(cls, lease):
+        """(weergave frame, originele grootte) van een nieuw frame (in de worker thread)"""
+        # Bewaar de originele resolutie voor later gebruik
+        original_height, original_width = lease.frame.shape[:2]
+        
+        # Resize voor display (dit is de weergave-resolutie)
+        display_frame = cv2.resize(lease.frame, cls.display_size(lease.frame))
+        return (display_frame, (original_width, original_height)) if lease.valid else None
         
-    def process_frame(self):
+    def process_frame(self, result):
         """Verwerk en toon camera frame"""
         if not self.preview_active:
             return
             
-        # Haal frame op van huidige camera
-        current_camera = list(self.cameras.values())[self.current_camera_index]
-        if current_camera['last_frame'] is not None:
-            frame = current_camera['last_frame'].copy()
+        display_frame, (original_width, original_height) = result
+        display_height, display_width = display_frame.shape[:2]
+
+        # Detecteer dartbord
+        circle = self.detector.detect_board(display_frame)
+        
+        if circle is not None:
+            x, y, r = circle
             
-            # Bewaar de originele resolutie voor later gebruik
-            original_height, original_width = frame.shape[:2]
+            # Schaal de coördinaten terug naar de originele resolutie
+            x = int(x * (original_width / display_width))  # Schaal de x-coördinaat
+            y = int(y * (original_height / display_height))  # Schaal de y-coördinaat
+            r = int(r * (original_width / display_width))  # Schaal de straal op basis van breedte
             
-            # Resize voor display (dit is de weergave-resolutie)
-            display_frame = cv2.resize(frame, (640, 360))
+            # Update status
+            self.status_label.config(
+                text="Dartbord gedetecteerd!",
+                fg='lime'
+            )
+            self.save_button.config(state='normal')
+            self.next_button.config(state='normal')
             
-            # Detecteer dartbord
-            circle = self.detector.detect_board(display_frame)
+            # Maak visualisatie (gebruik de originele resolutie voor overlay)
+            detected_frame = self.detector.draw_overlay(
+                display_frame.copy(),
+                (x, y),
+                r,
+                self.rotation_offset
+            )
             
-            if circle is not None:
-                x, y, r = circle
-                
-                # Schaal de coördinaten terug naar de originele resolutie
-                x = int(x * (original_width / 640))  # Schaal de x-coördinaat
-                y = int(y * (original_height / 360))  # Schaal de y-coördinaat
-                r = int(r * (original_width / 640))  # Schaal de straal op basis van breedte
-                
-                # Update status
-                self.status_label.config(
-                    text="Dartbord gedetecteerd!",
-                    fg='lime'
-                )
-                self.save_button.config(state='normal')
-                self.next_button.config(state='normal')
-                
-                # Maak visualisatie (gebruik de originele resolutie voor overlay)
-                detected_frame = self.detector.draw_overlay(
-                    display_frame.copy(),
-                    (x, y),
-                    r,
-                    self.rotation_offset
-                )
-                
-                # Toon beelden
-                self.show_image(display_frame, self.original_canvas)
-                self.show_image(detected_frame, self.detection_canvas)
-            else:
-                # Update status
-                self.status_label.config(
-                    text="Geen dartbord gedetecteerd",
-                    fg='red'
-                )
-                self.save_button.config(state='disabled')
-                self.next_button.config(state='disabled')
-                
-                # Toon alleen origineel beeld
-                self.show_image(display_frame, self.original_canvas)
-                self.detection_canvas.delete("all")
-                
-        # Schedule volgende frame
-        if self.preview_active:
-            self.root.after(30, self.process_frame)
+            # Toon beelden
+            self.show_image(display_frame, self.original_canvas)
+            self.show_image(detected_frame, self.detection_canvas)
+        else:
+            # Update status
+            self.status_label.config(
+                text="Geen dartbord gedetecteerd",
+                fg='red'
+            )
+            self.save_button.config(state='disabled')
+            self.next_button.config(state='disabled')
+            
+            # Toon alleen origineel beeld
+            self.show_image(display_frame, self.original_canvas)
+            self.detection_canvas.delete("all")
+
+    @staticmethod
+    def display_size(frame):
+        """Weergave grootte met 360 pixels hoogte; een bord ROI houdt zo zijn verhoudingen"""
+        height, width = frame.shape[:2]
+        return int(round(width * 360 / height)), 360
+
+    def current_camera_name(self):
+        """Naam van de camera die gekalibreerd wordt"""
+        return self.camera_names[self.current_camera_index]
 
 
     def adjust_rotation(self, delta):
         """Pas rotatie aan met gegeven delta"""
         self.rotation_offset = (self.rotation_offset + delta) % 360
 
+    def auto_rotation(self):
+        """Bepaal de rotatie automatisch uit de segmenten van het bord"""
+        frame = self.camera_manager.get_frame(self.current_camera_name())
+        if frame is not None:
+            display_frame = cv2.resize(frame, self.display_size(frame))
+            circle = self.detector.detect_board(display_frame)
+            if circle is not None:
+                x, y, r = (int(v) for v in circle)
+                rotation = estimate_rotation(display_frame, (x, y), r, self.rotation_offset)
+                if rotation is not None:
+                    self.rotation_offset = rotation
+                    return
+        messagebox.showerror("Error", "Kon de rotatie niet bepalen")
+
     def show_image(self, frame, canvas):
         """Toon een frame op een canvas"""
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -305,16 +349,20 @@ class DartboardCalibrationScreen:
     def save_calibration(self):
         """Sla kalibratie op voor huidige camera"""
         try:
-            current_camera = list(self.cameras.values())[self.current_camera_index]
-            frame = current_camera['last_frame']
+            frame = self.camera_manager.get_frame(self.current_camera_name())
             if frame is not None:
-                circle = self.detector.detect_board(cv2.resize(frame, (640, 360)))
+                display_size = self.display_size(frame)
+                circle = self.detector.detect_board(cv2.resize(frame, display_size))
                 if circle is not None:
                     x, y, r = circle
-                    current_camera['calibration'] = {
-                        'center': (x, y),
-                        'radius': r,
-                        'rotation_offset': self.rotation_offset
+                    # Capture voortaan alleen het bord; kalibratie in coördinaten van die ROI
+                    center, radius, frame_size = self.camera_manager.apply_board_roi(
+                        self.current_camera_name(), (x, y), r, display_size)
+                    self.calibrations[self.current_camera_name()] = {
+                        'center': center,
+                        'radius': radius,
+                        'rotation_offset': self.rotation_offset,
+                        'frame_size': list(frame_size)
                     }
                     messagebox.showinfo("Success", "Kalibratie opgeslagen voor huidige camera")
                     return
@@ -326,14 +374,16 @@ class DartboardCalibrationScreen:
 
     def next_camera(self):
         """Ga naar volgende camera of rond kalibratie af"""
-        if self.current_camera_index < 2:
+        if self.current_camera_index < len(self.camera_names) - 1:
             # Ga naar volgende camera
             self.current_camera_index += 1
             self.rotation_offset = 0
+            if self.preview_active:
+                self.start_frame_worker()
             
             # Update button text
             self.next_button.config(
-                text="Next Camera" if self.current_camera_index < 2 else "Complete",
+                text="Next Camera" if self.current_camera_index < len(self.camera_names) - 1 else "Complete",
                 state='disabled'
             )
             self.save_button.config(state='disabled')
@@ -352,10 +402,10 @@ class DartboardCalibrationScreen:
             # Sla configuratie op
             config = {
                 'cameras': {
-                    f'camera{i+1}': {
-                        'calibration': cam.get('calibration', {})
+                    name: {
+                        'calibration': self.calibrations.get(name, {})
                     }
-                    for i, cam in enumerate(self.cameras.values())
+                    for name in self.camera_names
                 }
             }
             
@@ -366,6 +416,8 @@ class DartboardCalibrationScreen:
             
             # Stop camera processing
             self.preview_active = False
+            if self.frame_worker is not None:
+                self.frame_worker.stop()
             
             # Sluit kalibratie scherm
             self.root.destroy()
@@ -373,6 +425,6 @@ class DartboardCalibrationScreen:
         except Exception as e:
             messagebox.showerror("Error", f"Error bij opslaan kalibratie: {str(e)}")
 
-def start_dartboard_calibration(root, cameras):
-    """Start het dartbord kalibratie scherm"""
-    return DartboardCalibrationScreen(root, cameras)
\ No newline at end of file
+def start_dartboard_calibration(root, camera_manager):
+    """Start het dartbord kalibratie scherm met de capture sessies van de CameraManager"""
+    return DartboardCalibrationScreen(root, camera_manager)
\ No newline at end of file
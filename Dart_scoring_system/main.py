@@ -10,6 +10,8 @@ from PIL import Image, ImageTk
 from src.detector import DartboardDetector
 from src.scorer import ScoreCalculator
 from src.gui.scoring import ScoringGUI
+from src.discovery import get_device_discovery
+from src.camera import CameraManager
 
 # Setup logging
 logging.basicConfig(
@@ -27,18 +29,25 @@ class DartScorerApp:
         self.detector = DartboardDetector()
         self.scorer = ScoreCalculator()
         
-        # Camera management
+        # Camera management: langlopende capture sessies gedeeld met de kalibratie
+        self.camera_manager = CameraManager()
         self.cameras = {
-            'camera1': {'id': None, 'cap': None, 'last_frame': None},
-            'camera2': {'id': None, 'cap': None, 'last_frame': None},
-            'camera3': {'id': None, 'cap': None, 'last_frame': None}
+            'camera1': {'id': None},
+            'camera2': {'id': None},
+            'camera3': {'id': None}
         }
         
         # GUI elementen
         self.preview_canvases = {}
         self.camera_combos = {}
+
+        # Camera detectie (gedeeld, gecachet en met hot-plug monitoring)
+        self.discovery = get_device_discovery()
+        self.discovery_generation = None
         
         self.setup_gui()
+        self.discovery.start_monitoring()
+        self.refresh_camera_lists()
         
     def setup_window(self):
         """Configureer het hoofdvenster"""
@@ -98,6 +107,9 @@ class DartScorerApp:
         """Maak camera configuratie sectie"""
         camera_frame = ttk.LabelFrame(self.main_frame, text="Camera Configuration", padding="10")
         camera_frame.grid(row=1, column=0, columnspan=3, sticky="nsew", padx=5, pady=5)
+
+        # Eén keer detecteren voor alle dropdowns
+        available_cameras = self.get_available_cameras()
         
         for i, cam_name in enumerate(['camera1', 'camera2', 'camera3']):
             # Container voor elke camera
@@ -113,7 +125,7 @@ class DartScorerApp:
             # Dropdown voor camera selectie
             combo = ttk.Combobox(
                 container,
-                values=self.get_available_cameras(),
+                values=available_cameras,
                 state='readonly',
                 width=30
             )
@@ -145,18 +157,21 @@ class DartScorerApp:
         
     def get_available_cameras(self) -> list:
         """Detecteer beschikbare camera's"""
-        available_cameras = []
-        for i in range(10):  # Check eerste 10 indices
-            cap = cv2.VideoCapture(i)
-            if cap.isOpened():
-                available_cameras.append(str(i))
-                cap.release()
-        return available_cameras
+        return self.discovery.get_available_cameras()
+
+    def refresh_camera_lists(self):
+        """Werk de dropdowns bij als de discovery nieuwe devices gevonden heeft"""
+        if self.discovery.generation != self.discovery_generation:
+            self.discovery_generation = self.discovery.generation
+            available_cameras = self.discovery.get_available_cameras()
+            for combo in self.camera_combos.values():
+                combo['values'] = available_cameras
+        self.root.after(1000, self.refresh_camera_lists)
         
     def on_camera_selected(self, camera_name: str):
         """Handle camera selectie"""
         try:
-            selected_id = int(self.camera_combos[camera_name].get())
+            selected_id = CameraManager.parse_camera_id(self.camera_combos[camera_name].get())
             self.cameras[camera_name]['id'] = selected_id
             
             # Update start knop status
@@ -183,12 +198,8 @@ class DartScorerApp:
             return
             
         try:
-            cap = cv2.VideoCapture(camera['id'])
-            if not cap.isOpened():
-                raise Exception("Kon camera niet openen")
-                
-            ret, frame = cap.read()
-            if not ret:
+            frame = self.get_session_frame(camera_name, camera['id'])
+            if frame is None:
                 raise Exception("Kon geen frame lezen")
                 
             # Toon test frame
@@ -196,34 +207,36 @@ class DartScorerApp:
             cv2.waitKey(1000)
             cv2.destroyWindow(f"{camera_name} Test")
             
-            cap.release()
             messagebox.showinfo("Success", f"Camera {camera_name} werkt correct!")
             
         except Exception as e:
             logger.error(f"Error bij camera test: {str(e)}")
             messagebox.showerror("Error", f"Camera test gefaald: {str(e)}")
+
+    def get_session_frame(self, camera_name: str, camera_id: int, level: str = 'full',
+                          timeout: float = 2.0):
+        """Haal een frame op uit de capture sessie van een camera"""
+        camera = self.camera_manager.open_camera(camera_name, camera_id)
+        if camera is None:
+            raise Exception("Kon camera niet openen")
+
+        lease = camera.wait_for_frame(0, timeout=timeout, level=level)
+        if lease is None:
+            return None
+        with lease:
+            return lease.frame.copy()
             
     def capture_single_frame(self, camera_name: str):
-        """Neem één enkel frame op van de camera"""
+        """Toon het huidige frame van de camera"""
         camera = self.cameras[camera_name]
         if camera['id'] is None:
             return
 
         try:
-            # Open camera, neem frame op, en sluit direct weer
-            cap = cv2.VideoCapture(camera['id'])
-            if not cap.isOpened():
-                raise Exception("Kon camera niet openen")
-                
-            ret, frame = cap.read()
-            cap.release()  # Sluit camera direct
+            frame = self.get_session_frame(camera_name, camera['id'], level='preview')
             
-            if ret:
-                # Bewaar frame voor detector
-                camera['last_frame'] = frame
-                
-                # Resize en toon preview
-                frame = cv2.resize(frame, (400, 300))
+            if frame is not None:
+                # Toon preview
                 frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
                 img = Image.fromarray(frame_rgb)
                 photo = ImageTk.PhotoImage(image=img)
@@ -247,22 +260,17 @@ class DartScorerApp:
             
     def start_calibration(self):
         """Start het kalibratieproces"""
-        # Stop alle previews
-        for camera in self.cameras.values():
-            if camera['cap'] is not None:
-                camera['cap'].release()
-                
-        # Start kalibratie met detector
-        self.detector.start_calibration(self.root, self.cameras)
+        # Kalibratie hergebruikt de open capture sessies
+        self.camera_manager.save_config()
+        self.detector.start_calibration(self.root, self.camera_manager)
         
     def stop_all_cameras(self):
         """Stop alle camera's"""
-        for camera in self.cameras.values():
-            if camera['cap'] is not None:
-                camera['cap'].release()
+        self.camera_manager.stop_all_cameras()
                 
     def on_closing(self):
         """Handle programma afsluiting"""
+        self.discovery.stop_monitoring()
         self.stop_all_cameras()
         self.root.destroy()
 
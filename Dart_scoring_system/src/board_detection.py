@@ -0,0 +1,257 @@
+import logging
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger('dart_scorer.board_detection')
+
+
+class BoardDetectionPipeline:
+    """Herbruikbare bord detectie op basis van board_detection in board_config.json
+
+    CLAHE en de morfologie kernel worden één keer gemaakt, de tussenbeelden
+    worden per frame grootte één keer gealloceerd en via dst= hergebruikt.
+    Kandidaat cirkels worden beoordeeld door de grijswaarden op vooraf
+    berekende ring coördinaten te lezen in plaats van per kandidaat een
+    masker ter grootte van het frame te tekenen.
+
+    Met coarse_scale < 1 draait HoughCircles op een verkleind beeld; elke
+    grove kandidaat wordt daarna op volle resolutie verfijnd door langs
+    stralen binnen een smalle ring rond de grove cirkel de donkere
+    dubbele ring te zoeken en daar een cirkel door te fitten.
+    """
+    def __init__(self, config: Dict):
+        preprocessing = config.get('preprocessing', {})
+        circles = config.get('circle_detection', {})
+
+        grid = int(preprocessing.get('clahe_grid_size', 8))
+        self.clahe = cv2.createCLAHE(clipLimit=float(preprocessing.get('clahe_clip_limit', 3.0)),
+                                     tileGridSize=(grid, grid))
+        size = int(preprocessing.get('morph_kernel_size', 3))
+        self.kernel = np.ones((size, size), np.uint8)
+        self.threshold = float(preprocessing.get('threshold', 70))
+        self.canny_low = float(preprocessing.get('canny_low', 30))
+        self.canny_high = float(preprocessing.get('canny_high', 150))
+
+        self.min_distance = circles.get('min_distance')
+        self.param1 = float(circles.get('param1', 50))
+        self.param2 = float(circles.get('param2', 30))
+        # Radii als fractie van de framehoogte, of (oude config) in pixels
+        self.min_radius_factor = circles.get('min_radius_factor')
+        self.max_radius_factor = circles.get('max_radius_factor')
+        self.min_radius = circles.get('min_radius', 0)
+        self.max_radius = circles.get('max_radius', 0)
+        self.max_ring_intensity = float(circles.get('max_ring_intensity', 100))
+
+        # Grof-naar-fijn: schaal van het Hough niveau en de breedte van de verfijningsring
+        self.coarse_scale = float(circles.get('coarse_scale', 1.0))
+        self.refine_margin = float(circles.get('refine_margin', 0.08))
+        self.refine_rays = int(circles.get('refine_rays', 120))
+        self.refine_min_gradient = float(circles.get('refine_min_gradient', 5))
+        self.refine_angles = np.linspace(0, 2 * np.pi, self.refine_rays, endpoint=False)
+
+        # Pixel offsets van een 3 pixels dikke cirkel, per radius gecachet
+        self.ring_offsets: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+        self.shape = None
+        self.buffers = None
+        self.coarse_frame: Optional[np.ndarray] = None
+
+    def _scratch(self, shape: Tuple[int, int]) -> Dict[str, np.ndarray]:
+        """Tussenbeelden voor deze frame grootte, alleen bij een nieuwe grootte gealloceerd"""
+        if self.shape != shape:
+            self.shape = shape
+            self.buffers = {name: np.empty(shape, np.uint8)
+                            for name in ('gray', 'enhanced', 'blurred', 'thresh', 'edges', 'dilated')}
+        return self.buffers
+
+    def _downscale(self, frame: np.ndarray) -> np.ndarray:
+        """Frame op het grove niveau, in een hergebruikte buffer"""
+        size = (max(1, int(round(frame.shape[1] * self.coarse_scale))),
+                max(1, int(round(frame.shape[0] * self.coarse_scale))))
+        shape = (size[1], size[0]) + frame.shape[2:]
+        if self.coarse_frame is None or self.coarse_frame.shape != shape:
+            self.coarse_frame = np.empty(shape, frame.dtype)
+        cv2.resize(frame, size, dst=self.coarse_frame, interpolation=cv2.INTER_AREA)
+        return self.coarse_frame
+
+    def radius_range(self, height: int, width: Optional[int] = None,
+                     roi_padding: Optional[float] = None) -> Tuple[int, int]:
+        """Toegestane radius van de dubbele ring in pixels
+
+        In een bord ROI (zie CameraManager.apply_board_roi) vult de ring het
+        beeld op `roi_padding` na; de factoren voor het volledige beeld
+        gelden daar niet.
+        """
+        if roi_padding is not None and width is not None:
+            # Aan een sensorrand kan de ROI aan één kant ingekort zijn; de lange zijde klopt dan nog
+            expected = max(height, width) / (2 * (1 + roi_padding))
+            return int(expected * 0.8), int(np.ceil(expected * 1.1))
+        if self.min_radius_factor is not None and self.max_radius_factor is not None:
+            return int(height * self.min_radius_factor), int(height * self.max_radius_factor)
+        return int(self.min_radius), int(self.max_radius)
+
+    def enhance(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Geef (grijs, CLAHE + blur) voor een BGR of grijs frame"""
+        buffers = self._scratch(frame.shape[:2])
+        gray = buffers['gray']
+        if frame.ndim == 3:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+        else:
+            np.copyto(gray, frame)
+
+        self.clahe.apply(gray, dst=buffers['enhanced'])
+        cv2.GaussianBlur(buffers['enhanced'], (5, 5), 0, dst=buffers['blurred'])
+        return gray, buffers['blurred']
+
+    def preprocess(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Geef (grijs, edge beeld) voor een BGR of grijs frame"""
+        gray, _ = self.enhance(frame)
+        buffers = self.buffers
+        # Zwarte dubbele ring isoleren
+        cv2.threshold(buffers['blurred'], self.threshold, 255, cv2.THRESH_BINARY_INV,
+                      dst=buffers['thresh'])
+        cv2.Canny(buffers['thresh'], self.canny_low, self.canny_high, edges=buffers['edges'])
+        cv2.dilate(buffers['edges'], self.kernel, dst=buffers['dilated'], iterations=1)
+        return gray, buffers['dilated']
+
+    def ring_coordinates(self, radius: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(dy, dx) offsets van de pixels van een 3 pixels dikke cirkel rond (0, 0)"""
+        offsets = self.ring_offsets.get(radius)
+        if offsets is None:
+            size = 2 * radius + 5
+            mask = np.zeros((size, size), np.uint8)
+            cv2.circle(mask, (radius + 2, radius + 2), radius, 255, 3)
+            dy, dx = np.nonzero(mask)
+            offsets = (dy - (radius + 2), dx - (radius + 2))
+            if len(self.ring_offsets) >= 64:
+                self.ring_offsets.clear()
+            self.ring_offsets[radius] = offsets
+        return offsets
+
+    def ring_intensity(self, gray: np.ndarray, x: int, y: int, r: int) -> float:
+        """Gemiddelde grijswaarde op de ring (dezelfde pixels als een getekend masker)"""
+        dy, dx = self.ring_coordinates(int(r))
+        ys = np.clip(dy + int(y), 0, gray.shape[0] - 1)
+        xs = np.clip(dx + int(x), 0, gray.shape[1] - 1)
+        return float(gray[ys, xs].mean())
+
+    def find_circles(self, edges: np.ndarray, min_radius: int, max_radius: int,
+                     scale: float = 1.0) -> Optional[np.ndarray]:
+        """HoughCircles op het edge beeld; (N, 3) array of None"""
+        height = edges.shape[0]
+        circles = cv2.HoughCircles(
+            edges,
+            cv2.HOUGH_GRADIENT,
+            dp=1,
+            minDist=self.min_distance * scale if self.min_distance else height // 2,
+            param1=self.param1,
+            param2=self.param2,
+            minRadius=min_radius,
+            maxRadius=max_radius
+        )
+        return None if circles is None else circles[0]
+
+    def select(self, gray: np.ndarray, circles: np.ndarray) -> Optional[Tuple[int, int, int]]:
+        """Kies de kleinste kandidaat die binnen het frame ligt en een donkere ring heeft"""
+        height, width = gray.shape[:2]
+        best = None
+        for x, y, r in np.around(circles).astype(np.int64):
+            if not (r < x < width - r and r < y < height - r):
+                continue
+            if self.ring_intensity(gray, x, y, r) >= self.max_ring_intensity:
+                continue
+            if best is None or r < best[2]:
+                best = (int(x), int(y), int(r))
+        return best
+
+    def detect(self, frame: np.ndarray, roi_padding: Optional[float] = None) -> Optional[Tuple[int, int, int]]:
+        """Detecteer de dubbele ring; geeft (x, y, radius) of None"""
+        if self.coarse_scale < 1.0:
+            return self.detect_coarse_to_fine(frame, roi_padding)
+        gray, edges = self.preprocess(frame)
+        circles = self.find_circles(edges, *self.radius_range(*frame.shape[:2], roi_padding))
+        if circles is None:
+            return None
+        return self.select(gray, circles)
+
+    def detect_coarse_to_fine(self, frame: np.ndarray,
+                              roi_padding: Optional[float] = None) -> Optional[Tuple[int, int, int]]:
+        """Hough op het grove niveau, daarna verfijnen op volle resolutie"""
+        scale = self.coarse_scale
+        # Op het grove niveau werkt Hough beter op het gladde grijsbeeld
+        # dan op de (relatief dikke) randen van het drempelbeeld
+        _, blurred = self.enhance(self._downscale(frame))
+        min_radius, max_radius = self.radius_range(*frame.shape[:2], roi_padding)
+        circles = self.find_circles(blurred, int(min_radius * scale), int(np.ceil(max_radius * scale)), scale)
+        if circles is None:
+            return None
+
+        height, width = frame.shape[:2]
+        best = None
+        for x, y, r in circles / scale:
+            if not (r < x < width - r and r < y < height - r):
+                continue
+            margin = max(self.refine_margin * r, 3.0 / scale)
+            refined = self.refine(frame, (x, y), r, margin)
+            # De fit mag niet naar een andere ring weglopen
+            if refined is None or abs(refined[2] - r) > margin or not min_radius <= refined[2] <= max_radius:
+                continue
+            if best is None or refined[2] < best[2]:
+                best = refined
+        if best is None:
+            return None
+        return tuple(int(round(value)) for value in best)
+
+    def refine(self, frame: np.ndarray, center: Tuple[float, float], radius: float,
+               margin: float) -> Optional[Tuple[float, float, float]]:
+        """Fit de dubbele ring op volle resolutie binnen radius +- margin
+
+        Langs elke straal wordt het grijsprofiel gelezen; het midden tussen
+        de sterkste daling (licht naar donker) en stijging (donker naar
+        licht) is een punt op de ring. Door die punten gaat een kleinste
+        kwadraten cirkel, met een tweede fit zonder uitschieters (darts,
+        segmentlijnen). None als er geen donkere ring gevonden wordt.
+        """
+        offsets = np.arange(-margin, margin + 1.0, dtype=np.float32)
+        radii = radius + offsets
+        map_x = (center[0] + np.outer(np.cos(self.refine_angles), radii)).astype(np.float32)
+        map_y = (center[1] + np.outer(np.sin(self.refine_angles), radii)).astype(np.float32)
+        profiles = cv2.remap(frame, map_x, map_y, cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        if profiles.ndim == 3:
+            profiles = cv2.cvtColor(profiles, cv2.COLOR_BGR2GRAY)
+        profiles = cv2.GaussianBlur(profiles.astype(np.float32), (5, 1), 0)
+
+        gradient = np.diff(profiles, axis=1)
+        falling = np.argmin(gradient, axis=1)
+        rising = np.argmax(gradient, axis=1)
+        rows = np.arange(len(gradient))
+        valid = ((falling < rising)
+                 & (-gradient[rows, falling] >= self.refine_min_gradient)
+                 & (gradient[rows, rising] >= self.refine_min_gradient))
+        if np.count_nonzero(valid) < self.refine_rays // 2:
+            return None
+        # Zelfde eis als select(): de ring zelf moet donker zijn
+        if np.median(profiles[valid].min(axis=1)) >= self.max_ring_intensity:
+            return None
+
+        # Midden van de donkere band; diff index i ligt tussen sample i en i + 1
+        ring = radius + offsets[0] + (falling[valid] + rising[valid]) / 2.0 + 0.5
+        xs = center[0] + ring * np.cos(self.refine_angles[valid])
+        ys = center[1] + ring * np.sin(self.refine_angles[valid])
+
+        fit = self.fit_circle(xs, ys)
+        residual = np.abs(np.hypot(xs - fit[0], ys - fit[1]) - fit[2])
+        inliers = residual <= max(1.5, 2.5 * float(np.median(residual)))
+        if np.count_nonzero(inliers) < self.refine_rays // 2:
+            return None
+        return self.fit_circle(xs[inliers], ys[inliers])
+
+    @staticmethod
+    def fit_circle(xs: np.ndarray, ys: np.ndarray) -> Tuple[float, float, float]:
+        """Algebraïsche kleinste kwadraten cirkel fit (Kåsa)"""
+        a = np.column_stack((2 * xs, 2 * ys, np.ones_like(xs)))
+        b = xs ** 2 + ys ** 2
+        (cx, cy, c), *_ = np.linalg.lstsq(a, b, rcond=None)
+        return float(cx), float(cy), float(np.sqrt(c + cx ** 2 + cy ** 2))
@@ -0,0 +1,83 @@
+import logging
+import math
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger('dart_scorer.board_plane')
+
+# Canoniek bordvlak: 512x512, dubbele ring met straal 240 rond het midden.
+# Alle camera's worden hierop afgebeeld, met de kalibratie rotatie eruit.
+CANONICAL_SIZE = 512
+CANONICAL_CENTER = (CANONICAL_SIZE / 2, CANONICAL_SIZE / 2)
+CANONICAL_RADIUS = 240.0
+
+
+def similarity_homography(center: Tuple[float, float], radius: float, rotation: float = 0.0) -> np.ndarray:
+    """Homografie van een frontaal bord (cirkel + rotatie) naar het canonieke vlak"""
+    scale = CANONICAL_RADIUS / float(radius)
+    theta = math.radians(-rotation)
+    cos, sin = scale * math.cos(theta), scale * math.sin(theta)
+    cx, cy = center
+    return np.array([
+        [cos, -sin, CANONICAL_CENTER[0] - cos * cx + sin * cy],
+        [sin, cos, CANONICAL_CENTER[1] - sin * cx - cos * cy],
+        [0.0, 0.0, 1.0]
+    ], dtype=np.float64)
+
+
+class BoardPlane:
+    """Afbeelding tussen de pixels van één camera en het canonieke bordvlak"""
+    def __init__(self, homography: np.ndarray):
+        self.homography = np.asarray(homography, dtype=np.float64).reshape(3, 3)
+        self.inverse = np.linalg.inv(self.homography)
+
+    @staticmethod
+    def _apply(matrix: np.ndarray, points) -> np.ndarray:
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        return cv2.perspectiveTransform(points, matrix).reshape(-1, 2)
+
+    def to_board(self, points) -> np.ndarray:
+        """(N, 2) camera punten naar het bordvlak"""
+        return self._apply(self.homography, points)
+
+    def to_image(self, points) -> np.ndarray:
+        """(N, 2) bordvlak punten terug naar de camera"""
+        return self._apply(self.inverse, points)
+
+    def to_board_point(self, point: Tuple[float, float]) -> Tuple[float, float]:
+        x, y = self.to_board([point])[0]
+        return float(x), float(y)
+
+    def local_scale(self, point: Tuple[float, float]) -> float:
+        """Bordvlak pixels per camera pixel rond een punt (wortel van de Jacobiaan determinant)"""
+        h = self.homography
+        x, y = point
+        w = h[2, 0] * x + h[2, 1] * y + h[2, 2]
+        u = (h[0, 0] * x + h[0, 1] * y + h[0, 2]) / w
+        v = (h[1, 0] * x + h[1, 1] * y + h[1, 2]) / w
+        jacobian = np.array([
+            [h[0, 0] - u * h[2, 0], h[0, 1] - u * h[2, 1]],
+            [h[1, 0] - v * h[2, 0], h[1, 1] - v * h[2, 1]]
+        ]) / w
+        return float(math.sqrt(abs(np.linalg.det(jacobian))))
+
+
+def plane_from_calibration(calibration: Dict, frame_shape: Tuple[int, ...],
+                           default_size: Tuple[int, int]) -> BoardPlane:
+    """BoardPlane voor een kalibratie, geschaald naar de frame grootte
+
+    Een kalibratie met 'homography' (3x3, in kalibratie pixels) wordt direct
+    gebruikt; anders volgt de homografie uit center, radius en rotation.
+    """
+    width, height = calibration.get('frame_size', default_size)
+    # Frame pixels terug naar kalibratie pixels
+    to_calibration = np.diag([width / frame_shape[1], height / frame_shape[0], 1.0])
+
+    if calibration.get('homography') is not None:
+        homography = np.asarray(calibration['homography'], dtype=np.float64).reshape(3, 3)
+    else:
+        homography = similarity_homography(calibration['center'], calibration['radius'],
+                                           calibration.get('rotation', 0.0))
+    return BoardPlane(homography @ to_calibration)
@@ -2,117 +2,792 @@ import cv2
 import json
 import numpy as np
 import logging
-from threading import Thread, Lock
+from threading import Thread, RLock, Condition
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 import time
+import math
 import os
 
+from .discovery import get_device_discovery
+from .process_capture import ProcessCamera
+from .sources import create_frame_source
+from .recorder import Recorder
+from .streaming import StreamServer
+from .telemetry import CaptureTelemetry
+
 logger = logging.getLogger('dart_scorer.camera')
 
+# Sensor crop properties; alleen drivers die ze ondersteunen (bv. XIMEA) nemen ze over
+DEVICE_ROI_PROPS = (('x', cv2.CAP_PROP_XI_OFFSET_X), ('y', cv2.CAP_PROP_XI_OFFSET_Y),
+                    ('width', cv2.CAP_PROP_XI_WIDTH), ('height', cv2.CAP_PROP_XI_HEIGHT))
+
+
+def failure_backoff(failures, limit=0.1):
+    """Wachttijd na `failures` mislukte reads op rij: eerst niet, daarna oplopend tot `limit` seconden"""
+    if failures < 3:
+        return 0.0
+    return min(limit, 0.005 * 2 ** min(failures - 3, 10))
+
+
+def board_roi(center, radius, frame_size, roi, resolution, padding=0.1, align=4):
+    """ROI in sensor pixels rond de dubbele ring, en de kalibratie omgerekend naar die ROI
+
+    center en radius komen uit een frame van frame_size (bv. het 'half'
+    niveau) van de huidige ROI. De nieuwe ROI is `padding` groter dan de
+    ring en uitgelijnd op `align` pixels; de kalibratie wordt teruggegeven
+    als (center, radius, frame_size) in volle resolutie pixels van de
+    nieuwe ROI. De ROI bewaart de marge als 'padding', zodat de bord
+    detectie weet hoe groot de ring in het uitgesneden beeld is.
+    """
+    full_width, full_height = resolution['width'], resolution['height']
+    if roi['width'] > 0 and roi['height'] > 0:
+        x, y, width, height = roi['x'], roi['y'], roi['width'], roi['height']
+    else:
+        x, y, width, height = 0, 0, full_width, full_height
+
+    scale_x = width / frame_size[0]
+    scale_y = height / frame_size[1]
+    center_x = x + center[0] * scale_x
+    center_y = y + center[1] * scale_y
+    reach = radius * max(scale_x, scale_y) * (1 + padding)
+
+    # Afronden tegen float ruis, anders schuift een rand net een uitlijnstap op
+    left = max(0, math.floor(round(center_x - reach, 6) / align) * align)
+    top = max(0, math.floor(round(center_y - reach, 6) / align) * align)
+    right = min(full_width, math.ceil(round(center_x + reach, 6) / align) * align)
+    bottom = min(full_height, math.ceil(round(center_y + reach, 6) / align) * align)
+
+    new_roi = {'x': left, 'y': top, 'width': right - left, 'height': bottom - top, 'padding': padding}
+    calibration = ((center_x - left, center_y - top), radius * (scale_x + scale_y) / 2,
+                   (new_roi['width'], new_roi['height']))
+    return new_roi, calibration
+
+
+def negotiate_fourcc(cap, candidates, camera_id=None):
+    """Probeer de FOURCC codes in volgorde en geef de eerste die de driver accepteert"""
+    for code in candidates:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*code))
+        actual = int(cap.get(cv2.CAP_PROP_FOURCC))
+        actual_code = ''.join(chr((actual >> (8 * i)) & 0xFF) for i in range(4))
+        if actual_code == code:
+            return code
+        logger.debug(f"Camera {camera_id} ondersteunt FOURCC {code} niet")
+    return None
+
+
+def open_source(camera_id, config, profile=None):
+    """Open de frame bron van een camera met de instellingen uit de config
+
+    Geeft (bron, fourcc) terug; gooit een Exception als de bron niet open
+    gaat. Gedeeld door Camera en het capture proces van ProcessCamera.
+    """
+    profile = profile or {}
+    cap = create_frame_source(camera_id, config.get('source'))
+    if not cap.is_device:
+        # Opnames hebben een vaste resolutie en geen device instellingen
+        if not cap.isOpened():
+            raise Exception(f"Kon bron {camera_id} niet openen")
+        logger.info(f"Camera {camera_id} speelt opname af "
+                    f"({type(cap).__name__}, replay={cap.replay})")
+        return cap, None
+
+    # Pixelformaat moet vóór de resolutie ingesteld worden
+    fourcc = negotiate_fourcc(cap, profile.get('fourcc') or [], camera_id)
+
+    # Stel resolutie in
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, config['resolution']['width'])
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, config['resolution']['height'])
+
+    # Stel camera parameters in
+    cap.set(cv2.CAP_PROP_EXPOSURE, config['settings']['exposure'])
+    cap.set(cv2.CAP_PROP_BRIGHTNESS, config['settings']['brightness'])
+    cap.set(cv2.CAP_PROP_CONTRAST, config['settings']['contrast'])
+    cap.set(cv2.CAP_PROP_FPS, config['settings']['fps'])
+
+    # Minimaliseer de driver buffer zodat read() het nieuwste frame geeft
+    if profile.get('buffer_size'):
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, profile['buffer_size'])
+
+    if not cap.isOpened():
+        raise Exception(f"Kon camera {camera_id} niet openen")
+
+    logger.info(f"Camera {camera_id} succesvol geïnitialiseerd (fourcc={fourcc or 'default'})")
+    return cap, fourcc
+
+class FrameRingBuffer:
+    """Voorgealloceerde ringbuffer met een vast aantal frame slots
+
+    Slots die door een lezer vastgehouden worden (pins) worden niet
+    overschreven; de schrijver kiest altijd het oudste vrije slot.
+    """
+    def __init__(self, size, shape, dtype=np.uint8):
+        # Eén extra slot zodat het slot waarin geschreven wordt nooit
+        # tussen de uitgegeven frames zit
+        self.size = max(1, int(size))
+        self.reallocate(shape, dtype)
+
+    @property
+    def shape(self):
+        return self.frames.shape[1:]
+
+    def next_slot(self):
+        """Geef het slot waar het volgende frame in geschreven wordt
+
+        Geeft None als alle slots vastgehouden worden door lezers. Het oude
+        volgnummer van het slot vervalt, zodat acquire_frame het frame dat
+        nu overschreven wordt niet meer kan vastpinnen.
+        """
+        if self.write_index is None or self.pins[self.write_index]:
+            self.write_index = self._find_free_slot()
+        if self.write_index is None:
+            return None
+        self.sequences[self.write_index] = 0
+        return self.frames[self.write_index]
+
+    def commit(self, timestamp=0.0):
+        """Markeer het huidige schrijfslot als gevuld en schuif door"""
+        slot = self.write_index
+        self.generation += 1
+        self.sequences[slot] = self.generation
+        self.timestamps[slot] = timestamp
+        self.write_index = self._find_free_slot()
+        return slot
+
+    def _find_free_slot(self):
+        """Zoek het oudste slot dat niet vastgehouden wordt en niet het nieuwste is"""
+        free = (self.pins == 0) & (self.sequences != self.generation)
+        if not free.any():
+            return None
+        candidates = np.flatnonzero(free)
+        return int(candidates[np.argmin(self.sequences[candidates])])
+
+    def latest_index(self):
+        """Index van het meest recente frame, of None als de buffer leeg is"""
+        if self.generation == 0:
+            return None
+        return int(np.argmax(self.sequences))
+
+    def ordered_indices(self):
+        """Slot indices van oud naar nieuw"""
+        filled = [i for i in np.flatnonzero(self.sequences > 0) if i != self.write_index]
+        filled.sort(key=lambda i: self.sequences[i])
+        return [int(i) for i in filled[-self.size:]]
+
+    def pin(self, slot):
+        """Houd een slot vast zodat het niet overschreven wordt"""
+        self.pins[slot] += 1
+        return self.pins
+
+    def reallocate(self, shape, dtype=None):
+        """Alloceer de buffer opnieuw voor een andere frame grootte"""
+        dtype = dtype or self.frames.dtype
+        slots = self.size + 1
+        self.frames = np.zeros((slots,) + tuple(shape), dtype=dtype)
+        self.sequences = np.zeros(slots, dtype=np.int64)
+        self.timestamps = np.zeros(slots, dtype=np.float64)
+        # Nieuwe pins array: oude leases geven hun slot vrij op de oude array
+        self.pins = np.zeros(slots, dtype=np.int32)
+        self.write_index = 0
+        self.generation = 0
+
+
+# Standaard pyramid niveaus naast het volledige (ROI) frame
+DEFAULT_PYRAMID = {
+    'half': {'scale': 0.5},
+    'preview': {'width': 400, 'height': 300}
+}
+
+
+class FramePyramid:
+    """Verkleinde versies van de frames in de ringbuffer, één per niveau per slot
+
+    Niveaus met abonnees worden één keer in de capture thread gebouwd;
+    andere niveaus worden pas bij opvragen gemaakt en daarna hergebruikt.
+    """
+    def __init__(self, levels, slots):
+        self.levels = dict(levels)
+        self.slots = slots
+        self.subscribers = {name: 0 for name in self.levels}
+        self.buffers = {}
+        self.sequences = {}
+
+    def check_level(self, name):
+        if name != 'full' and name not in self.levels:
+            raise ValueError(f"Onbekend pyramid niveau: {name}")
+
+    def level_size(self, name, source_shape):
+        """Breedte en hoogte van een niveau voor een bron van gegeven grootte"""
+        spec = self.levels[name]
+        if 'scale' in spec:
+            return (max(1, int(source_shape[1] * spec['scale'])),
+                    max(1, int(source_shape[0] * spec['scale'])))
+        return int(spec['width']), int(spec['height'])
+
+    def subscribed(self):
+        return [name for name, count in self.subscribers.items() if count > 0]
+
+    def target(self, name, slot, source_shape):
+        """Geef het doel slot voor een niveau, (her)alloceer als de grootte veranderd is"""
+        width, height = self.level_size(name, source_shape)
+        shape = (self.slots, height, width) + tuple(source_shape[2:])
+        if name not in self.buffers or self.buffers[name].shape != shape:
+            self.buffers[name] = np.zeros(shape, dtype=np.uint8)
+            self.sequences[name] = np.zeros(self.slots, dtype=np.int64)
+        return self.buffers[name][slot]
+
+    def is_current(self, name, slot, seq):
+        return name in self.sequences and self.sequences[name][slot] == seq
+
+    def mark(self, name, slot, seq):
+        self.sequences[name][slot] = seq
+
+    def reset(self, slots):
+        """Gooi alle niveaus weg, bijvoorbeeld na een herallocatie van de ringbuffer"""
+        self.slots = slots
+        self.buffers = {}
+        self.sequences = {}
+
+
+class FrameLease:
+    """Read-only view op een frame dat niet overschreven wordt tot release()"""
+    def __init__(self, camera, pins, slot, seq, timestamp, frame):
+        self.camera = camera
+        self.slot = slot
+        self.seq = seq
+        self.timestamp = timestamp
+        self.frame = frame
+        self._pins = pins
+        self._released = False
+
+    @property
+    def valid(self):
+        """Het slot is vastgepind, dus het frame blijft geldig tot release()"""
+        return not self._released
+
+    def level(self, name):
+        """Read-only view van hetzelfde frame op een ander pyramid niveau"""
+        return self.camera._level_view(self.slot, self.seq, name)
+
+    def release(self):
+        """Geef het slot weer vrij voor de capture thread"""
+        if not self._released:
+            self._released = True
+            with self.camera.buffer_lock:
+                self._pins[self.slot] -= 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def __del__(self):
+        self.release()
+
+
 class Camera:
     """Klasse voor individuele camera handling"""
-    def __init__(self, camera_id, config):
+    def __init__(self, camera_id, config, buffer_size=None, profile=None):
         self.camera_id = camera_id
         self.config = config
+        self.profile = profile or {}
+        self.fourcc = None
         self.cap = None
+        # True als de driver de ROI zelf uitsnijdt; frames zijn dan al de ROI
+        self.device_roi = False
         self.is_running = False
-        self.frame_buffer = []
-        self.buffer_lock = Lock()
-        self.last_frame = None
-        self.frame_count = 0
+        self.capture_thread = None
+        # RLock zodat een lease ook vanuit de garbage collector vrijgegeven kan worden
+        self.buffer_lock = RLock()
+        self.frame_condition = Condition(self.buffer_lock)
+
+        # Gemeten capture prestaties, opvraagbaar via get_telemetry()
+        self.telemetry = CaptureTelemetry()
+
+        if buffer_size is None:
+            buffer_size = config.get('frame_buffer_size', 10)
+        resolution = config['resolution']
+        self.frame_buffer = FrameRingBuffer(
+            buffer_size, (resolution['height'], resolution['width'], 3)
+        )
+        self.pyramid = FramePyramid(config.get('pyramid', DEFAULT_PYRAMID),
+                                    len(self.frame_buffer.frames))
         
     def initialize(self):
         """Initialize de camera met gegeven configuratie"""
         try:
-            self.cap = cv2.VideoCapture(self.camera_id)
-            
-            # Stel resolutie in
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 
-                        self.config['resolution']['width'])
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 
-                        self.config['resolution']['height'])
-            
-            # Stel camera parameters in
-            self.cap.set(cv2.CAP_PROP_EXPOSURE, 
-                        self.config['settings']['exposure'])
-            self.cap.set(cv2.CAP_PROP_BRIGHTNESS, 
-                        self.config['settings']['brightness'])
-            self.cap.set(cv2.CAP_PROP_CONTRAST, 
-                        self.config['settings']['contrast'])
-            self.cap.set(cv2.CAP_PROP_FPS, 
-                        self.config['settings']['fps'])
-            
-            if not self.cap.isOpened():
-                raise Exception(f"Kon camera {self.camera_id} niet openen")
-                
-            logger.info(f"Camera {self.camera_id} succesvol geïnitialiseerd")
+            self.cap, self.fourcc = open_source(self.camera_id, self.config, self.profile)
+            if self.cap.is_device:
+                # Laat de sensor alleen het bord uitlezen als de driver dat kan
+                self.device_roi = self._set_device_roi(self.config['roi'])
             return True
             
         except Exception as e:
             logger.error(f"Error bij initialiseren camera {self.camera_id}: {str(e)}")
             return False
             
-    def start(self):
-        """Start de camera capture thread"""
+    def start(self, threaded=True):
+        """Start de camera capture thread
+
+        Met threaded=False wordt de camera alleen actief gezet en levert een
+        externe coördinator (zie SynchronizedCapture) de frames aan.
+        """
         if not self.is_running:
             self.is_running = True
-            self.capture_thread = Thread(target=self._capture_loop)
-            self.capture_thread.daemon = True
-            self.capture_thread.start()
+            if threaded:
+                self.capture_thread = Thread(target=self._capture_loop)
+                self.capture_thread.daemon = True
+                self.capture_thread.start()
             logger.info(f"Camera {self.camera_id} capture gestart")
             
     def stop(self):
         """Stop de camera capture"""
-        self.is_running = False
+        with self.frame_condition:
+            self.is_running = False
+            self.frame_condition.notify_all()
         if self.capture_thread:
             self.capture_thread.join()
+            self.capture_thread = None
         if self.cap:
             self.cap.release()
-        logger.info(f"Camera {self.camera_id} capture gestopt")
+        stats = self.telemetry.snapshot()
+        logger.info(f"Camera {self.camera_id} capture gestopt "
+                    f"({stats['fps']:.1f} fps, {stats['frames']} frames, "
+                    f"{stats['failed_reads']} mislukt, {stats['dropped_frames']} gedropt)")
             
     def _capture_loop(self):
-        """Main capture loop die in een aparte thread draait"""
+        """Main capture loop die in een aparte thread draait
+
+        read() blokkeert tot de device een nieuw frame heeft, dus het tempo
+        wordt door de camera bepaald en er is geen extra sleep nodig.
+        """
+        if self.cap is None:
+            logger.error(f"Camera {self.camera_id} is niet geïnitialiseerd")
+            self.is_running = False
+            return
+
         while self.is_running:
-            if self.cap is None:
+            # Decodeer direct in het volgende slot van de ringbuffer
+            slot = self._acquire_write_slot()
+            if slot is None:
+                # Alle slots zijn in gebruik door lezers: frame overslaan
+                self.cap.grab()
+                self.telemetry.record_drop()
                 continue
-                
-            ret, frame = self.cap.read()
+
+            read_start = time.perf_counter()
+            ret, frame = self.cap.read(slot)
             if not ret:
-                logger.warning(f"Kon geen frame lezen van camera {self.camera_id}")
+                if getattr(self.cap, 'finished', False):
+                    # Einde van een opname: lezers niet laten wachten
+                    logger.info(f"Bron van camera {self.camera_id} is afgelopen")
+                    with self.frame_condition:
+                        self.is_running = False
+                        self.frame_condition.notify_all()
+                    break
+                failures = self._record_failure(time.perf_counter() - read_start)
+                # Een losgekoppelde device faalt direct; niet een core vol laten draaien
+                time.sleep(failure_backoff(failures))
                 continue
-                
-            # Pas ROI toe als geconfigureerd
-            roi = self.config['roi']
-            if roi['width'] > 0 and roi['height'] > 0:
-                frame = frame[roi['y']:roi['y']+roi['height'],
-                            roi['x']:roi['x']+roi['width']]
-                
-            # Update frame buffer
+
+            self.telemetry.record_read(time.perf_counter() - read_start)
+            self._publish_frame(slot, frame, self._frame_timestamp(time.time()))
+
+    def _record_failure(self, duration):
+        """Tel een mislukte read; log alleen de eerste en daarna elke honderdste"""
+        failures = self.telemetry.record_read(duration, ok=False)
+        if failures == 1 or failures % 100 == 0:
+            logger.warning(f"Kon geen frame lezen van camera {self.camera_id} "
+                           f"({failures} keer achter elkaar)")
+        return failures
+
+    def get_telemetry(self):
+        """Capture telemetrie van deze camera, zie CaptureTelemetry"""
+        with self.buffer_lock:
+            pins = self.frame_buffer.pins
+            filled = len(self.frame_buffer.ordered_indices())
+            occupancy = {
+                'slots': len(pins),
+                'filled_slots': filled,
+                # Gevuld maar nog niet door een consument opgehaald: groeit als lezers achterlopen
+                'unconsumed_slots': self.telemetry.unconsumed(self.frame_buffer.generation, filled),
+                'pinned_slots': int(np.count_nonzero(pins)),
+                'leases': int(pins.sum())
+            }
+        return self.telemetry.snapshot(camera_id=self.camera_id, fourcc=self.fourcc,
+                                       buffer=occupancy)
+
+    def grab(self):
+        """Grab een frame op de device zonder het te decoderen"""
+        return self.cap is not None and self.cap.grab()
+
+    def retrieve(self, timestamp):
+        """Decodeer het laatst gegrabde frame in de ringbuffer
+
+        Geeft het volgnummer van het gepubliceerde frame terug, of None.
+        """
+        slot = self._acquire_write_slot()
+        if slot is None:
+            self.telemetry.record_drop()
+            return None
+        read_start = time.perf_counter()
+        ret, frame = self.cap.retrieve(slot)
+        if not ret:
+            self._record_failure(time.perf_counter() - read_start)
+            return None
+        self.telemetry.record_read(time.perf_counter() - read_start)
+        return self._publish_frame(slot, frame, self._frame_timestamp(timestamp))
+
+    def _frame_timestamp(self, capture_time):
+        """Opnametijd van de bron (replay met index), anders de capture tijd"""
+        recorded = getattr(self.cap, 'recorded_timestamp', None)
+        return capture_time if recorded is None else recorded
+
+    def _acquire_write_slot(self):
+        """Geef het ringbuffer slot voor het volgende frame"""
+        with self.buffer_lock:
+            return self.frame_buffer.next_slot()
+
+    def _publish_frame(self, slot, frame, timestamp):
+        """Zet een gedecodeerd frame in de buffer en wek wachtende lezers"""
+        if frame is not slot and not np.shares_memory(frame, slot):
+            # Camera levert een andere resolutie dan geconfigureerd
             with self.buffer_lock:
-                self.frame_buffer.append(frame)
-                if len(self.frame_buffer) > self.config.get('frame_buffer_size', 10):
-                    self.frame_buffer.pop(0)
-                self.last_frame = frame
-                self.frame_count += 1
-                
-            # Kleine pauze om CPU gebruik te beperken
-            time.sleep(1/self.config['settings']['fps'])
+                if frame.shape != self.frame_buffer.shape:
+                    logger.info(f"Camera {self.camera_id} levert {frame.shape[1]}x{frame.shape[0]}, "
+                                f"frame buffer wordt opnieuw gealloceerd")
+                    self.frame_buffer.reallocate(frame.shape)
+                    self.pyramid.reset(len(self.frame_buffer.frames))
+                    self.telemetry.reset_consumption()
+                slot = self.frame_buffer.next_slot()
+            if slot is None:
+                return None
+            np.copyto(slot, frame)
+
+        # Bouw de geabonneerde pyramid niveaus één keer, vóór het frame zichtbaar is
+        source = self._apply_roi(slot)
+        with self.buffer_lock:
+            index = self.frame_buffer.write_index
+            seq = self.frame_buffer.generation + 1
+            targets = [(name, self.pyramid.target(name, index, source.shape))
+                       for name in self.pyramid.subscribed()]
+        for name, target in targets:
+            cv2.resize(source, (target.shape[1], target.shape[0]), dst=target,
+                       interpolation=cv2.INTER_AREA)
+
+        with self.frame_condition:
+            index = self.frame_buffer.commit(timestamp)
+            for name, _ in targets:
+                self.pyramid.mark(name, index, seq)
+            self.frame_condition.notify_all()
+            return self.frame_buffer.generation
             
-    def get_latest_frame(self):
-        """Haal het meest recente frame op"""
+    def _set_device_roi(self, roi):
+        """Stel de ROI in op de device; False als de driver geen crop ondersteunt"""
+        if self.cap is None or not self.cap.is_device or roi['width'] <= 0 or roi['height'] <= 0:
+            return False
+        try:
+            # Eerst de grootte verkleinen, anders past de offset niet binnen de sensor
+            for key, prop in DEVICE_ROI_PROPS[2:] + DEVICE_ROI_PROPS[:2]:
+                self.cap.set(prop, roi[key])
+            if all(int(self.cap.get(prop)) == roi[key] for key, prop in DEVICE_ROI_PROPS):
+                logger.info(f"Camera {self.camera_id} leest ROI {roi['width']}x{roi['height']} "
+                            f"op ({roi['x']}, {roi['y']}) uit de sensor")
+                return True
+        except Exception as e:
+            logger.error(f"Error bij instellen device ROI: {str(e)}")
+        logger.info(f"Camera {self.camera_id} ondersteunt geen sensor ROI, frames worden uitgesneden")
+        return False
+
+    def set_roi(self, roi):
+        """Wijzig de ROI tijdens het draaien (op de device als die dat kan, anders als view)"""
+        with self.buffer_lock:
+            self.config['roi'] = dict(roi)
+            if self.device_roi:
+                self.device_roi = self._set_device_roi(self.config['roi'])
+                if not self.device_roi:
+                    # Terug naar het volledige sensorbeeld en uitsnijden in software
+                    self._set_device_roi({'x': 0, 'y': 0,
+                                          'width': self.config['resolution']['width'],
+                                          'height': self.config['resolution']['height']})
+
+    def _apply_roi(self, frame):
+        """Geef een view van het frame met de geconfigureerde ROI"""
+        roi = self.config['roi']
+        if self.device_roi:
+            return frame
+        if roi['width'] > 0 and roi['height'] > 0:
+            return frame[roi['y']:roi['y']+roi['height'],
+                         roi['x']:roi['x']+roi['width']]
+        return frame
+
+    def subscribe(self, level):
+        """Laat de capture thread een pyramid niveau voor elk frame bouwen"""
+        self.pyramid.check_level(level)
+        if level != 'full':
+            with self.buffer_lock:
+                self.pyramid.subscribers[level] += 1
+
+    def unsubscribe(self, level):
+        """Stop met bouwen van een pyramid niveau als niemand het meer gebruikt"""
+        if level != 'full':
+            with self.buffer_lock:
+                self.pyramid.subscribers[level] = max(0, self.pyramid.subscribers[level] - 1)
+
+    def _level_view(self, slot, seq, level):
+        """Read-only view van een slot op een pyramid niveau, zo nodig nu gebouwd"""
+        self.pyramid.check_level(level)
+        with self.buffer_lock:
+            source = self._apply_roi(self.frame_buffer.frames[slot])
+            if level == 'full':
+                frame = source
+            else:
+                frame = self.pyramid.target(level, slot, source.shape)
+                if not self.pyramid.is_current(level, slot, seq):
+                    cv2.resize(source, (frame.shape[1], frame.shape[0]), dst=frame,
+                               interpolation=cv2.INTER_AREA)
+                    self.pyramid.mark(level, slot, seq)
+            frame = frame.view()
+            frame.flags.writeable = False
+            return frame
+
+    def get_latest_frame(self, level='full'):
+        """Haal een kopie van het meest recente frame op"""
         with self.buffer_lock:
-            return self.last_frame.copy() if self.last_frame is not None else None
+            slot = self.frame_buffer.latest_index()
+            if slot is None:
+                return None
+            seq = int(self.frame_buffer.sequences[slot])
+            self.telemetry.record_consumption(float(self.frame_buffer.timestamps[slot]), seq)
+            return self._level_view(slot, seq, level).copy()
             
+    @property
+    def device_index(self):
+        """Index van de live device die deze camera open heeft, of None"""
+        if self.cap is None or not getattr(self.cap, 'is_device', False) or not self.cap.isOpened():
+            return None
+        return int(self.camera_id)
+
+    @property
+    def frame_seq(self):
+        """Volgnummer van het meest recente frame (0 als er nog geen is)"""
+        return self.frame_buffer.generation
+
+    def wait_for_frame(self, after_seq=0, timeout=None, level='full'):
+        """Wacht op een frame nieuwer dan after_seq
+
+        Geeft een FrameLease met een read-only view op het gevraagde pyramid
+        niveau terug, of None bij een timeout. Het slot wordt niet
+        overschreven totdat de lease vrijgegeven wordt, dus er is geen kopie
+        nodig; gebruik bij voorkeur `with`. Met timeout=0 wordt niet gewacht.
+        """
+        with self.frame_condition:
+            if self.frame_buffer.generation <= after_seq:
+                if timeout == 0:
+                    return None
+                self.frame_condition.wait_for(
+                    lambda: self.frame_buffer.generation > after_seq or not self.is_running,
+                    timeout
+                )
+            if self.frame_buffer.generation <= after_seq:
+                return None
+
+            return self._lease_slot(self.frame_buffer.latest_index(), level)
+
+    def acquire_frame(self, seq, level='full'):
+        """Geef een FrameLease voor een specifiek volgnummer, of None als het frame al overschreven is"""
+        with self.buffer_lock:
+            slots = np.flatnonzero(self.frame_buffer.sequences == seq)
+            if seq <= 0 or len(slots) == 0:
+                return None
+            return self._lease_slot(int(slots[0]), level)
+
+    def _lease_slot(self, slot, level='full'):
+        """Pin een slot en geef er een read-only FrameLease voor"""
+        seq = int(self.frame_buffer.sequences[slot])
+        frame = self._level_view(slot, seq, level)
+        pins = self.frame_buffer.pin(slot)
+        self.telemetry.record_consumption(float(self.frame_buffer.timestamps[slot]), seq)
+        return FrameLease(self, pins, slot, seq,
+                          float(self.frame_buffer.timestamps[slot]),
+                          frame)
+
     def get_frame_buffer(self):
-        """Haal de hele frame buffer op"""
+        """Haal de frame buffer op als views van oud naar nieuw
+
+        De views verwijzen naar de ringbuffer zelf en worden overschreven
+        zodra de camera er weer rond is; kopieer een frame als het langer
+        bewaard moet worden.
+        """
         with self.buffer_lock:
-            return self.frame_buffer.copy()
+            return [self._apply_roi(self.frame_buffer.frames[i])
+                    for i in self.frame_buffer.ordered_indices()]
             
+class FrameSet:
+    """Set van gelijktijdig gegrabde frames van alle camera's"""
+    def __init__(self, seq, leases, timestamps, skew):
+        self.seq = seq
+        self.leases = leases
+        self.timestamps = timestamps
+        self.skew = skew
+
+    @property
+    def frames(self):
+        """Read-only frames per camera naam"""
+        return {name: lease.frame for name, lease in self.leases.items()}
+
+    def release(self):
+        """Geef alle frames weer vrij"""
+        for lease in self.leases.values():
+            lease.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class SynchronizedCapture:
+    """Coördinator die alle camera's direct na elkaar laat grabben en parallel decodeert
+
+    In plaats van drie vrij lopende capture threads wordt per ronde eerst
+    grab() op alle camera's aangeroepen en daarna retrieve() parallel
+    uitgevoerd. Het resultaat wordt als FrameSet met gemeten skew gepubliceerd.
+    """
+    def __init__(self, cameras, skew_history=300):
+        self.cameras = dict(cameras)
+        self.is_running = False
+        self.capture_thread = None
+        self.executor = None
+        self.condition = Condition()
+        self.seq = 0
+        self.frame_seqs = {}
+        self.timestamps = {}
+        self.skew = 0.0
+        self.skews = deque(maxlen=skew_history)
+        self.incomplete_sets = 0
+
+    def start(self):
+        """Start de gesynchroniseerde capture"""
+        if self.is_running or not self.cameras:
+            return
+        for camera in self.cameras.values():
+            camera.start(threaded=False)
+        self.executor = ThreadPoolExecutor(max_workers=len(self.cameras),
+                                           thread_name_prefix='retrieve')
+        self.is_running = True
+        self.capture_thread = Thread(target=self._capture_loop, daemon=True)
+        self.capture_thread.start()
+        logger.info(f"Gesynchroniseerde capture gestart voor {len(self.cameras)} camera's")
+
+    def stop(self):
+        """Stop de gesynchroniseerde capture"""
+        with self.condition:
+            self.is_running = False
+            self.condition.notify_all()
+        if self.capture_thread:
+            self.capture_thread.join()
+            self.capture_thread = None
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        for camera in self.cameras.values():
+            camera.stop()
+        logger.info("Gesynchroniseerde capture gestopt")
+
+    def _capture_loop(self):
+        """Grab alle camera's direct na elkaar en decodeer daarna parallel
+
+        grab() blokkeert tot de device een nieuw frame heeft, dus de
+        snelheid van de ronde wordt door de traagste camera bepaald.
+        """
+        while self.is_running:
+            grab_times = {}
+            for name, camera in self.cameras.items():
+                if camera.grab():
+                    grab_times[name] = time.time()
+
+            if not grab_times and all(getattr(c.cap, 'finished', False)
+                                      for c in self.cameras.values()):
+                # Alle opnames zijn afgespeeld
+                with self.condition:
+                    self.is_running = False
+                    self.condition.notify_all()
+                break
+
+            futures = {name: self.executor.submit(self.cameras[name].retrieve, ts)
+                       for name, ts in grab_times.items()}
+            frame_seqs = {name: future.result() for name, future in futures.items()}
+
+            if len(grab_times) < len(self.cameras) or None in frame_seqs.values():
+                self.incomplete_sets += 1
+                logger.warning("Onvolledige frameset, niet alle camera's leverden een frame")
+                continue
+
+            skew = max(grab_times.values()) - min(grab_times.values())
+            with self.condition:
+                self.seq += 1
+                self.frame_seqs = frame_seqs
+                self.timestamps = grab_times
+                self.skew = skew
+                self.skews.append(skew)
+                self.condition.notify_all()
+
+    def wait_for_frameset(self, after_seq=0, timeout=None):
+        """Wacht op een frameset nieuwer dan after_seq
+
+        Geeft een FrameSet terug waarvan de frames niet overschreven worden
+        tot release(), of None bij een timeout.
+        """
+        with self.condition:
+            if self.seq <= after_seq:
+                if timeout == 0:
+                    return None
+                self.condition.wait_for(lambda: self.seq > after_seq or not self.is_running, timeout)
+            if self.seq <= after_seq:
+                return None
+
+            leases = {}
+            for name, frame_seq in self.frame_seqs.items():
+                lease = self.cameras[name].acquire_frame(frame_seq)
+                if lease is None:
+                    for acquired in leases.values():
+                        acquired.release()
+                    return None
+                leases[name] = lease
+            return FrameSet(self.seq, leases, dict(self.timestamps), self.skew)
+
+    def get_skew_statistics(self):
+        """Statistieken van de skew tussen camera's in milliseconden"""
+        with self.condition:
+            skews = np.array(self.skews, dtype=np.float64) * 1000.0
+            incomplete = self.incomplete_sets
+        if len(skews) == 0:
+            return {'count': 0, 'incomplete_sets': incomplete}
+        return {
+            'count': int(len(skews)),
+            'last_ms': float(skews[-1]),
+            'mean_ms': float(skews.mean()),
+            'p95_ms': float(np.percentile(skews, 95)),
+            'max_ms': float(skews.max()),
+            'incomplete_sets': incomplete
+        }
+
+
 class CameraManager:
     """Klasse voor het beheren van meerdere camera's"""
     def __init__(self, config_path='config/camera_config.json'):
         self.config_path = config_path
+        self.config = None
         self.cameras = {}
+        self.sync_capture = None
+        self.recorder = None
+        self.stream_server = None
         self.load_config()
+        # Discovery mag de devices van deze sessies niet opnieuw openen
+        get_device_discovery().register_sessions(self.devices_in_use)
         
     def load_config(self):
         """Laad camera configuratie uit JSON bestand"""
@@ -133,17 +808,140 @@ class CameraManager:
         """Initialize alle camera's met gegeven IDs"""
         for cam_name, camera_id in camera_ids.items():
             if cam_name in self.config['cameras']:
-                # Update camera ID in config
-                self.config['cameras'][cam_name]['id'] = int(camera_id)
-                camera_config = self.config['cameras'][cam_name]
-                
-                # Maak nieuwe camera instance
-                camera = Camera(int(camera_id), camera_config)
+                camera = self._create_camera(cam_name, camera_id)
                 if camera.initialize():
                     self.cameras[cam_name] = camera
                     
         self.save_config()
+
+    def _create_camera(self, cam_name, camera_id):
+        """Maak een camera instance voor de geconfigureerde backend"""
+        # Update camera ID in config
+        camera_id = self.parse_camera_id(camera_id)
+        self.config['cameras'][cam_name]['id'] = camera_id
+        camera_config = self.config['cameras'][cam_name]
+
+        camera_class = Camera
+        if self._global_setting('capture_backend', 'thread') == 'process':
+            camera_class = ProcessCamera
+        return camera_class(camera_id, camera_config,
+                            buffer_size=self._global_setting('frame_buffer_size', 10),
+                            profile=self._capture_profile(camera_config))
+
+    @staticmethod
+    def parse_camera_id(camera_id):
+        """Device indices als int, paden naar opnames als string"""
+        if isinstance(camera_id, str) and camera_id.isdigit():
+            return int(camera_id)
+        return camera_id
+
+    def open_camera(self, cam_name, camera_id):
+        """Open een langlopende capture sessie voor één camera, of hergebruik de bestaande
+
+        Setup, kalibratie en scoring delen zo dezelfde capture thread; de
+        device wordt één keer geopend en een preview kost alleen een kopie.
+        """
+        camera_id = self.parse_camera_id(camera_id)
+        camera = self.cameras.get(cam_name)
+        if camera is not None and camera.camera_id == camera_id and camera.is_running:
+            return camera
+        if camera is not None:
+            self.close_camera(cam_name)
+
+        # Een device kan maar één keer geopend worden; deel de sessie
+        for other in self.cameras.values():
+            if other.camera_id == camera_id and other.is_running:
+                self.cameras[cam_name] = other
+                return other
+
+        if cam_name not in self.config['cameras']:
+            logger.error(f"Onbekende camera: {cam_name}")
+            return None
+
+        camera = self._create_camera(cam_name, camera_id)
+        if not camera.initialize():
+            return None
+        camera.start()
+        self.cameras[cam_name] = camera
+        return camera
+
+    def devices_in_use(self):
+        """Device indices die de sessies van deze manager geopend hebben"""
+        return {camera.device_index for camera in list(self.cameras.values())
+                if camera.device_index is not None}
+
+    def close_camera(self, cam_name):
+        """Sluit de capture sessie van één camera"""
+        camera = self.cameras.pop(cam_name, None)
+        if camera is not None and camera not in self.cameras.values():
+            camera.stop()
         
+    def _global_setting(self, key, default=None):
+        """Haal een waarde uit global_settings op"""
+        if not self.config:
+            return default
+        return self.config.get('global_settings', {}).get(key, default)
+
+    def _capture_profile(self, camera_config):
+        """Haal het capture profiel op voor een camera (per camera of globaal)"""
+        name = camera_config.get('capture_profile') or self._global_setting('capture_profile', 'default')
+        profiles = self.config.get('capture_profiles', {}) if self.config else {}
+        if name not in profiles:
+            logger.warning(f"Capture profiel '{name}' niet gevonden, standaard instellingen gebruikt")
+        return profiles.get(name, {})
+
+    def get_telemetry(self):
+        """Capture telemetrie per camera"""
+        return {cam_name: camera.get_telemetry() for cam_name, camera in self.cameras.items()}
+
+    def dump_telemetry(self, path=None):
+        """Telemetrie van alle camera's als JSON, optioneel weggeschreven naar path"""
+        data = json.dumps(self.get_telemetry(), indent=2)
+        if path is not None:
+            try:
+                with open(path, 'w') as f:
+                    f.write(data)
+            except Exception as e:
+                logger.error(f"Error bij opslaan telemetrie: {str(e)}")
+        return data
+
+    def apply_board_roi(self, cam_name, center, radius, frame_size):
+        """Beperk de capture van een camera tot het gekalibreerde bord
+
+        Berekent een ROI rond de dubbele ring (global_settings.board_roi_padding
+        extra marge), past die direct toe op de lopende camera en slaat hem
+        op. Geeft de kalibratie (center, radius, frame_size) terug in
+        coördinaten van de nieuwe ROI.
+        """
+        camera_config = self.config['cameras'][cam_name]
+        roi, calibration = board_roi(center, radius, frame_size, camera_config['roi'],
+                                     camera_config['resolution'],
+                                     self._global_setting('board_roi_padding', 0.1))
+        camera = self.cameras.get(cam_name)
+        if camera is not None:
+            camera.set_roi(roi)
+        camera_config['roi'] = roi
+        logger.info(f"ROI van {cam_name} ingesteld op {roi['width']}x{roi['height']} "
+                    f"op ({roi['x']}, {roi['y']})")
+        self.save_config()
+        return calibration
+
+    def board_roi_padding(self, cam_name):
+        """Marge van de bord ROI van een camera, of None als die het volledige beeld levert"""
+        camera_config = self.config['cameras'].get(cam_name, {})
+        return camera_config.get('roi', {}).get('padding')
+
+    def reset_roi(self, cam_name):
+        """Zet de ROI van een camera terug op het volledige beeld"""
+        camera_config = self.config['cameras'][cam_name]
+        resolution = camera_config['resolution']
+        roi = {'x': 0, 'y': 0, 'width': resolution['width'], 'height': resolution['height']}
+        camera = self.cameras.get(cam_name)
+        if camera is not None:
+            camera.set_roi(roi)
+        camera_config['roi'] = roi
+        self.save_config()
+
     def save_config(self):
         """Sla huidige camera configuratie op"""
         try:
@@ -153,16 +951,121 @@ class CameraManager:
         except Exception as e:
             logger.error(f"Error bij opslaan camera config: {str(e)}")
             
-    def start_all_cameras(self):
-        """Start alle geïnitialiseerde camera's"""
-        for camera in self.cameras.values():
-            camera.start()
+    def start_all_cameras(self, synchronized=None):
+        """Start alle geïnitialiseerde camera's
+
+        Als synchronized niet opgegeven is bepaalt global_settings.synchronized_capture
+        of de camera's via één SynchronizedCapture coördinator lopen.
+        """
+        if synchronized is None:
+            synchronized = self._global_setting('synchronized_capture', False)
+
+        if synchronized and any(isinstance(c, ProcessCamera) for c in self.cameras.values()):
+            logger.warning("Gesynchroniseerde capture werkt niet met de process backend, "
+                           "camera's lopen vrij")
+            synchronized = False
+
+        if synchronized:
+            self.sync_capture = SynchronizedCapture(self.cameras)
+            self.sync_capture.start()
+        else:
+            for camera in self.cameras.values():
+                camera.start()
+
+        if self.config.get('recording', {}).get('enabled'):
+            self.start_recording()
+        if self.config.get('networking', {}).get('stream_enabled'):
+            self.start_streaming()
             
     def stop_all_cameras(self):
         """Stop alle camera's"""
-        for camera in self.cameras.values():
+        self.stop_streaming()
+        self.stop_recording()
+        if self.sync_capture:
+            self.sync_capture.stop()
+            self.sync_capture = None
+            return
+
+        # Een gedeelde sessie staat onder meerdere namen in de dict
+        for camera in {id(c): c for c in self.cameras.values()}.values():
             camera.stop()
+
+    def start_recording(self):
+        """Start de opname van alle actieve camera's volgens het 'recording' config blok"""
+        if self.recorder is not None:
+            return self.recorder
+        try:
+            self.recorder = Recorder(self.cameras, self.config.get('recording', {}))
+            self.recorder.start()
+        except Exception as e:
+            logger.error(f"Error bij starten opname: {str(e)}")
+            self.recorder = None
+        return self.recorder
+
+    def stop_recording(self):
+        """Stop de opname en schrijf de resterende frames weg"""
+        if self.recorder is not None:
+            self.recorder.stop()
+            self.recorder = None
+
+    def start_streaming(self):
+        """Start de MJPEG stream server volgens het 'networking' config blok"""
+        if self.stream_server is not None:
+            return self.stream_server
+        networking = self.config.get('networking', {})
+        try:
+            self.stream_server = StreamServer(self.cameras,
+                                              port=networking.get('stream_port', 8080),
+                                              quality=networking.get('stream_quality', 80),
+                                              host=networking.get('stream_host', '0.0.0.0'))
+            self.stream_server.start()
+        except Exception as e:
+            logger.error(f"Error bij starten stream server: {str(e)}")
+            self.stream_server = None
+        return self.stream_server
+
+    def stop_streaming(self):
+        """Stop de stream server"""
+        if self.stream_server is not None:
+            self.stream_server.stop()
+            self.stream_server = None
+
+    def wait_for_frameset(self, after_seq=0, timeout=None):
+        """Wacht op een gesynchroniseerde FrameSet, zie SynchronizedCapture"""
+        if self.sync_capture is None:
+            return None
+        return self.sync_capture.wait_for_frameset(after_seq, timeout)
+
+    def get_skew_statistics(self):
+        """Skew statistieken van de gesynchroniseerde capture"""
+        if self.sync_capture is None:
+            return {'count': 0, 'incomplete_sets': 0}
+        return self.sync_capture.get_skew_statistics()
             
+    def get_frame(self, cam_name, level='full'):
+        """Haal een kopie van het meest recente frame van één camera op"""
+        camera = self.cameras.get(cam_name)
+        return camera.get_latest_frame(level) if camera else None
+
+    def wait_for_frame(self, cam_name, after_seq=0, timeout=None, level='full'):
+        """Wacht op een nieuw frame van één camera, zie Camera.wait_for_frame"""
+        camera = self.cameras.get(cam_name)
+        if camera is None:
+            return None
+        return camera.wait_for_frame(after_seq, timeout, level)
+
+    def subscribe(self, cam_name, level):
+        """Abonneer op een pyramid niveau van één camera"""
+        camera = self.cameras.get(cam_name)
+        if camera is not None:
+            camera.subscribe(level)
+
+    def unsubscribe(self, cam_name, level):
+        """Zeg een abonnement op een pyramid niveau op"""
+        camera = self.cameras.get(cam_name)
+        if camera is not None:
+            camera.unsubscribe(level)
+
     def get_frames(self):
         """Haal frames op van alle camera's"""
         frames = {}
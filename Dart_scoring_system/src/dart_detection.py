@@ -0,0 +1,280 @@
+import logging
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger('dart_scorer.dart_detection')
+
+DEFAULT_DART_DETECTION = {
+    'downscale': 0.25,
+    'diff_threshold': 25,
+    'min_area': 6,
+    'max_area_fraction': 0.2,
+    'motion_pixels': 4,
+    'settle_frames': 3,
+    'board_margin': 1.05,
+    'refine_padding': 16
+}
+
+# Levenscyclus van een worp, per camera
+STATE_IDLE = 'idle'
+STATE_IN_FLIGHT = 'in-flight'
+STATE_SETTLED = 'settled'
+STATE_SCORED = 'scored'
+STATE_REMOVED = 'darts-removed'
+
+
+class CameraDartState:
+    """Referentiebeelden en scratch buffers voor de dart detectie van één camera"""
+    def __init__(self, bbox: Tuple[int, int, int, int], scale: float, center: Tuple[float, float],
+                 radius: float):
+        x0, y0, x1, y1 = bbox
+        self.bbox = bbox
+        self.scale = scale
+        self.small_size = (max(1, int((x1 - x0) * scale)), max(1, int((y1 - y0) * scale)))
+        width, height = self.small_size
+
+        self.small_bgr = np.empty((height, width, 3), np.uint8)
+        self.small = np.empty((height, width), np.uint8)
+        self.previous = np.empty((height, width), np.uint8)
+        self.diff = np.empty((height, width), np.uint8)
+        self.changed = np.empty((height, width), np.uint8)
+        self.moving = np.empty((height, width), np.uint8)
+
+        # Alleen pixels binnen het bord tellen
+        self.mask = np.zeros((height, width), np.uint8)
+        cv2.circle(self.mask, (int(round((center[0] - x0) * scale)), int(round((center[1] - y0) * scale))),
+                   max(1, int(round(radius * scale))), 255, -1)
+        self.mask_area = max(1, cv2.countNonZero(self.mask))
+
+        self.reference_small: Optional[np.ndarray] = None
+        self.reference_full: Optional[np.ndarray] = None
+        # Het lege bord, om het weghalen van de darts te herkennen
+        self.empty_small: Optional[np.ndarray] = None
+        self.stable_frames = 0
+
+        self.state = STATE_IDLE
+        self.darts_on_board = 0
+        self.stats = {'frames': 0, 'throws': 0, 'removals': 0, 'false_alarms': 0}
+
+
+class DartDetectionEngine:
+    """Detecteert nieuwe darts door frames met een referentiebeeld te vergelijken
+
+    Per camera wordt een referentie van het lege (of laatst gesettelde)
+    bord bijgehouden. Elk frame wordt alleen binnen het gekalibreerde bord
+    en op lage resolutie vergeleken; pas als er een stabiele verandering
+    is (de dart zit vast en er beweegt niets meer) wordt de punt op volle
+    resolutie rond het veranderde gebied bepaald en de referentie
+    bijgewerkt.
+
+    Elke camera doorloopt daarbij de toestanden idle -> in-flight (er
+    beweegt iets) -> settled (weer stil) -> scored (tip bepaald, één keer
+    per dart) of darts-removed (het bord is weer leeg). De dure tip
+    bepaling draait dus per worp, niet per frame.
+    """
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = dict(DEFAULT_DART_DETECTION)
+        self.config.update(config or {})
+        self.states: Dict[str, CameraDartState] = {}
+
+    def reset(self, camera_name: Optional[str] = None) -> None:
+        """Vergeet de referentie van één camera (of alle), bv. bij een nieuw spel"""
+        if camera_name is None:
+            self.states.clear()
+        else:
+            self.states.pop(camera_name, None)
+
+    def _state(self, camera_name: str, frame: np.ndarray, center: Tuple[float, float],
+               radius: float) -> CameraDartState:
+        """State voor deze camera; opnieuw opgebouwd als de kalibratie of frame grootte verandert"""
+        reach = radius * self.config['board_margin']
+        height, width = frame.shape[:2]
+        bbox = (max(0, int(center[0] - reach)), max(0, int(center[1] - reach)),
+                min(width, int(np.ceil(center[0] + reach)) + 1),
+                min(height, int(np.ceil(center[1] + reach)) + 1))
+        state = self.states.get(camera_name)
+        if state is None or state.bbox != bbox:
+            state = CameraDartState(bbox, self.config['downscale'], center, reach)
+            self.states[camera_name] = state
+        return state
+
+    def _set_reference(self, state: CameraDartState, crop: np.ndarray) -> None:
+        state.reference_small = state.small.copy()
+        state.reference_full = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        state.stable_frames = 0
+
+    def _transition(self, camera_name: str, state: CameraDartState, new_state: str) -> None:
+        if state.state != new_state:
+            logger.debug(f"{camera_name}: {state.state} -> {new_state}")
+            state.state = new_state
+
+    def _changed_pixels(self, state: CameraDartState, reference: np.ndarray, dst: np.ndarray) -> int:
+        """Aantal pixels binnen het bord dat verschilt van reference"""
+        cv2.absdiff(state.small, reference, dst=state.diff)
+        cv2.threshold(state.diff, self.config['diff_threshold'], 255, cv2.THRESH_BINARY, dst=dst)
+        cv2.bitwise_and(dst, state.mask, dst=dst)
+        return cv2.countNonZero(dst)
+
+    def get_state(self, camera_name: str) -> Dict:
+        """Huidige toestand, darts op het bord en tellers van een camera"""
+        state = self.states.get(camera_name)
+        if state is None:
+            return {'state': STATE_IDLE, 'darts_on_board': 0, 'stats': {}}
+        return {'state': state.state, 'darts_on_board': state.darts_on_board, 'stats': dict(state.stats)}
+
+    def process(self, camera_name: str, frame: np.ndarray, center: Tuple[float, float],
+                radius: float) -> Optional[Dict]:
+        """Verwerk een frame; geeft een dict met de dart punt als een worp gesetteld is"""
+        config = self.config
+        state = self._state(camera_name, frame, center, radius)
+        x0, y0, x1, y1 = state.bbox
+        crop = frame[y0:y1, x0:x1]
+
+        # Verkleind grijsbeeld van alleen het bord
+        cv2.resize(crop, state.small_size, dst=state.small_bgr, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(state.small_bgr, cv2.COLOR_BGR2GRAY, dst=state.small)
+        cv2.GaussianBlur(state.small, (3, 3), 0, dst=state.small)
+
+        state.stats['frames'] += 1
+        if state.reference_small is None:
+            self._set_reference(state, crop)
+            state.empty_small = state.reference_small
+            np.copyto(state.previous, state.small)
+            return None
+
+        # Verschil met de referentie (is er iets bijgekomen?) en met het
+        # vorige frame (beweegt er nog iets?)
+        changed = self._changed_pixels(state, state.reference_small, state.changed)
+        moving = self._changed_pixels(state, state.previous, state.moving) > config['motion_pixels']
+        np.copyto(state.previous, state.small)
+
+        if moving:
+            self._transition(camera_name, state, STATE_IN_FLIGHT)
+            state.stable_frames = 0
+            return None
+
+        if state.state != STATE_IN_FLIGHT:
+            if changed < config['min_area']:
+                return None
+            # De beweging zelf is gemist (bv. door de scheduler): toch laten settelen
+            self._transition(camera_name, state, STATE_IN_FLIGHT)
+
+        state.stable_frames += 1
+        if state.stable_frames < config['settle_frames']:
+            return None
+        self._transition(camera_name, state, STATE_SETTLED)
+        after = STATE_SCORED if state.darts_on_board else STATE_IDLE
+
+        if state.darts_on_board and self._changed_pixels(state, state.empty_small, state.diff) < config['min_area']:
+            # Het bord ziet er weer leeg uit: de darts zijn weggehaald
+            logger.info(f"Darts weggehaald op {camera_name}")
+            state.darts_on_board = 0
+            state.stats['removals'] += 1
+            self._set_reference(state, crop)
+            self._transition(camera_name, state, STATE_REMOVED)
+            return None
+
+        if changed < config['min_area']:
+            # Beweging zonder blijvende verandering (hand, schaduw)
+            state.stats['false_alarms'] += 1
+            state.stable_frames = 0
+            self._transition(camera_name, state, after)
+            return None
+
+        if changed > config['max_area_fraction'] * state.mask_area:
+            # Te grote verandering (iemand voor het bord, licht): nieuwe referentie
+            logger.info(f"Grote verandering op {camera_name}, referentie vernieuwd")
+            self._set_reference(state, crop)
+            self._transition(camera_name, state, after)
+            return None
+
+        result = self._locate_dart(state, crop)
+        self._set_reference(state, crop)
+        if result is None:
+            self._transition(camera_name, state, after)
+            return None
+
+        state.darts_on_board += 1
+        state.stats['throws'] += 1
+        self._transition(camera_name, state, STATE_SCORED)
+
+        tip = (result['tip'][0] + x0, result['tip'][1] + y0)
+        logger.info(f"Dart gedetecteerd op {camera_name}: tip=({tip[0]:.1f}, {tip[1]:.1f}), "
+                    f"confidence={result['confidence']:.2f}")
+        return {
+            'camera': camera_name,
+            'position': tip,
+            'board_center': center,
+            'board_radius': radius,
+            'confidence': result['confidence'],
+            'bbox': (result['bbox'][0] + x0, result['bbox'][1] + y0,
+                     result['bbox'][2] + x0, result['bbox'][3] + y0),
+            'area': result['area'],
+            'darts_on_board': state.darts_on_board
+        }
+
+    def _locate_dart(self, state: CameraDartState, crop: np.ndarray) -> Optional[Dict]:
+        """Zoek de grootste nieuwe blob en bepaal de punt op volle resolutie"""
+        count, _, stats, _ = cv2.connectedComponentsWithStats(state.changed, connectivity=8)
+        if count < 2:
+            return None
+        label = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+        if stats[label, cv2.CC_STAT_AREA] < self.config['min_area']:
+            return None
+
+        # Blob rechthoek terug naar volle resolutie, met marge
+        scale = state.scale
+        pad = self.config['refine_padding']
+        x, y, w, h = stats[label, :4]
+        rx0 = max(0, int(x / scale) - pad)
+        ry0 = max(0, int(y / scale) - pad)
+        rx1 = min(crop.shape[1], int((x + w) / scale) + pad)
+        ry1 = min(crop.shape[0], int((y + h) / scale) + pad)
+
+        region = cv2.cvtColor(crop[ry0:ry1, rx0:rx1], cv2.COLOR_BGR2GRAY)
+        diff = cv2.absdiff(region, state.reference_full[ry0:ry1, rx0:rx1])
+        _, binary = cv2.threshold(diff, self.config['diff_threshold'], 255, cv2.THRESH_BINARY)
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+        if count < 2:
+            return None
+        label = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+        ys, xs = np.nonzero(labels == label)
+        if len(xs) < 3:
+            return None
+
+        tip, elongation = self.find_tip(np.column_stack((xs, ys)).astype(np.float64))
+        return {
+            'tip': (tip[0] + rx0, tip[1] + ry0),
+            'bbox': (rx0, ry0, rx1, ry1),
+            'area': int(len(xs)),
+            # Een dart is langwerpig; een ronde blob is eerder een schaduw of ruis
+            'confidence': float(min(1.0, max(0.0, (elongation - 1.0) / 4.0)))
+        }
+
+    @staticmethod
+    def find_tip(points: np.ndarray) -> Tuple[Tuple[float, float], float]:
+        """Punt van een dart blob: het dunste uiteinde langs de hoofdas
+
+        Geeft (tip, verhouding lengte/breedte) terug.
+        """
+        mean = points.mean(axis=0)
+        centered = points - mean
+        eigenvalues, eigenvectors = np.linalg.eigh(np.cov(centered.T))
+        axis = eigenvectors[:, 1]
+        elongation = float(np.sqrt(eigenvalues[1] / max(eigenvalues[0], 1e-6)))
+
+        projection = centered @ axis
+        low, high = projection.min(), projection.max()
+        end = 0.2 * (high - low)
+        low_count = np.count_nonzero(projection <= low + end)
+        high_count = np.count_nonzero(projection >= high - end)
+
+        # Het uiteinde met de minste pixels is de (dunne) punt
+        if low_count <= high_count:
+            extreme = points[projection <= low + 1.0]
+        else:
+            extreme = points[projection >= high - 1.0]
+        tip = extreme.mean(axis=0)
+        return (float(tip[0]), float(tip[1])), elongation
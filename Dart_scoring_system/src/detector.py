@@ -8,6 +8,15 @@ import tkinter as tk
 from PIL import Image, ImageTk
 from tkinter import ttk, messagebox
 
+from .board_detection import BoardDetectionPipeline
+from .board_plane import CANONICAL_CENTER, CANONICAL_RADIUS, BoardPlane, plane_from_calibration
+from .dart_detection import DEFAULT_DART_DETECTION, DartDetectionEngine
+from .frame_worker import FrameWorker
+from .geometry import SEGMENT_ANGLE, BoardGeometry
+from .rectify import BoardRectifier, load_rectifier
+from .rotation import estimate_rotation, single_bands
+from .scoremap import ScoreMap, get_score_map
+
 logger = logging.getLogger('dart_scorer.detector')
 
 class CircleDetectionConfig(TypedDict):
@@ -24,24 +33,130 @@ class PreprocessingConfig(TypedDict):
     canny_high: int
     morph_kernel_size: int
 
+class TrackingConfig(TypedDict):
+    samples: int
+    radius_offsets: List[int]
+    tolerance: float
+    max_ring_intensity: float
+
+class DartDetectionConfig(TypedDict):
+    downscale: float
+    diff_threshold: int
+    min_area: int
+    max_area_fraction: float
+    motion_pixels: int
+    settle_frames: int
+    board_margin: float
+    refine_padding: int
+
 class RegionConfig(TypedDict):
     outer_radius_factor: float
     inner_radius_factor: float
 
 class BoardConfig(TypedDict):
-    board_detection: Dict[str, PreprocessingConfig | CircleDetectionConfig]
+    board_detection: Dict[str, PreprocessingConfig | CircleDetectionConfig | TrackingConfig]
     scoring_regions: Dict[str, RegionConfig]
+    point_values: Dict[str, List[Dict]]
+    dart_detection: DartDetectionConfig
     cameras: Dict[str, Dict]
 
+# Frame grootte waarin kalibraties zonder 'frame_size' gemaakt zijn ('half' niveau)
+DEFAULT_CALIBRATION_SIZE = (640, 360)
+
+# Grijswaarde gewichten (BGR), gelijk aan cv2.COLOR_BGR2GRAY
+GRAY_WEIGHTS = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+class BoardTracker:
+    """Volgt een eenmaal gedetecteerd bord met een goedkope verificatie
+
+    Na een detectie wordt de intensiteit langs de dubbele ring op een
+    vast aantal punten (en een paar radii rond de ring) als referentie
+    opgeslagen. Volgende frames lezen alleen die pixels en vergelijken ze
+    met de referentie; alleen als dat niet meer klopt (camera verschoven,
+    bord weg) is een volledige detectie nodig.
+    """
+    def __init__(self, config: TrackingConfig):
+        angles = np.linspace(0, 2 * np.pi, int(config.get('samples', 72)), endpoint=False)
+        self.cos = np.cos(angles)
+        self.sin = np.sin(angles)
+        self.radius_offsets = np.asarray(config.get('radius_offsets', [-2, 0, 2]), dtype=np.float64)
+        self.tolerance = float(config.get('tolerance', 25))
+        self.max_ring_intensity = float(config.get('max_ring_intensity', 100))
+        self.reset()
+
+    def reset(self) -> None:
+        self.center: Optional[Tuple[int, int]] = None
+        self.radius: Optional[int] = None
+        self.shape: Optional[Tuple[int, ...]] = None
+        self.reference: Optional[np.ndarray] = None
+        self.ring_index: Optional[int] = None
+
+    @property
+    def locked(self) -> bool:
+        return self.reference is not None
+
+    def sample(self, frame: np.ndarray, center: Tuple[int, int], radius: int) -> Optional[np.ndarray]:
+        """Grijswaarden op de sample cirkels, vorm (radii, samples); None als ze buiten het frame vallen"""
+        radii = radius + self.radius_offsets[:, None]
+        xs = np.rint(center[0] + radii * self.cos).astype(np.intp)
+        ys = np.rint(center[1] + radii * self.sin).astype(np.intp)
+        height, width = frame.shape[:2]
+        if xs.min() < 0 or ys.min() < 0 or xs.max() >= width or ys.max() >= height:
+            return None
+        pixels = frame[ys, xs]
+        if pixels.ndim == 3:
+            return pixels.astype(np.float32) @ GRAY_WEIGHTS
+        return pixels.astype(np.float32)
+
+    def lock(self, frame: np.ndarray, center: Tuple[int, int], radius: int) -> bool:
+        """Sla de referentie op voor een gedetecteerd bord"""
+        center = (int(center[0]), int(center[1]))
+        radius = int(radius)
+        reference = self.sample(frame, center, radius)
+        if reference is None:
+            self.reset()
+            return False
+        self.center, self.radius, self.shape = center, radius, frame.shape
+        self.reference = reference
+        # De radius offset die het dichtst bij de ring zelf ligt
+        self.ring_index = int(np.argmin(np.abs(self.radius_offsets)))
+        return True
+
+    def verify(self, frame: np.ndarray) -> bool:
+        """Check of het bord nog op dezelfde plek staat
+
+        De mediaan van het verschil met de referentie maakt de check
+        ongevoelig voor een paar punten die door een dart bedekt worden.
+        """
+        if not self.locked or frame.shape != self.shape:
+            return False
+        profile = self.sample(frame, self.center, self.radius)
+        if profile is None:
+            return False
+        if np.median(profile[self.ring_index]) > self.max_ring_intensity:
+            return False
+        return float(np.median(np.abs(profile - self.reference))) <= self.tolerance
+
 class DartboardDetector:
     def __init__(self, config_path: str = 'config/board_config.json'):
         self.config_path = config_path
         self.load_config()
         self.board_center: Optional[Tuple[int, int]] = None
         self.board_radius: Optional[int] = None
-        self.perspective_matrix: Optional[np.ndarray] = None
+        # (breedte, hoogte) van het frame waarin board_center gevonden is
+        self.board_frame_size: Optional[Tuple[int, int]] = None
+        # Marge van de bord ROI per camera; alleen voor camera's die tot hun bord beperkt zijn
+        self.roi_padding: Dict[str, float] = {}
+        # Camera -> canoniek bordvlak, per (camera, frame grootte) gecachet
+        self.board_planes: Dict[Tuple[str, Tuple[int, int]], BoardPlane] = {}
+        # Remap maps en uitvoer buffers voor het canonieke bordbeeld
+        self.rectifiers: Dict[Tuple[str, Tuple[int, int]], BoardRectifier] = {}
+        self.rectified: Dict[str, np.ndarray] = {}
         self.calibration_ui = None
         self.preview_active = False
+        # Een tracker per camera, zie track_board
+        self.trackers: Dict[str, BoardTracker] = {}
+        self.tracking_stats = {'verified': 0, 'detected': 0, 'lost': 0}
 
     def load_config(self) -> None:
         """Laad detectie configuratie uit JSON bestand"""
@@ -67,6 +182,12 @@ class DartboardDetector:
                         'param2': 25,
                         'min_radius': 50,
                         'max_radius': 300
+                    },
+                    'tracking': {
+                        'samples': 72,
+                        'radius_offsets': [-2, 0, 2],
+                        'tolerance': 25,
+                        'max_ring_intensity': 100
                     }
                 },
                 'scoring_regions': {
@@ -83,152 +204,233 @@ class DartboardDetector:
                         'inner_radius_factor': 0.08
                     }
                 },
+                'dart_detection': dict(DEFAULT_DART_DETECTION),
                 'cameras': {}
             }
 
-    def detect_board(self, frame: np.ndarray) -> Tuple[bool, Optional[Dict]]:
-        """Detecteer het dartbord met focus op de dubbele ring als buitenste referentie"""
+        # Ringen en segment layout één keer gecompileerd, gedeeld met de scorer
+        self.geometry = BoardGeometry.from_config(self.config)
+
+        # Detectie pipeline met CLAHE, kernels en buffers uit de config
+        self.pipeline = BoardDetectionPipeline(self.config['board_detection'])
+        self.dart_engine = DartDetectionEngine(self.config.get('dart_detection'))
+
+    def detect_board(self, frame: np.ndarray, roi_padding: Optional[float] = None) -> Tuple[bool, Optional[Dict]]:
+        """Detecteer het dartbord met focus op de dubbele ring als buitenste referentie
+
+        Met roi_padding is frame een bord ROI en wordt de ring op de
+        bijbehorende grootte gezocht.
+        """
         try:
             if frame is None:
                 return False, None
-                
-            # Converteer naar grayscale
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            
-            # Verbeter contrast
-            clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8,8))
-            enhanced = clahe.apply(gray)
-            
-            # Gaussian blur voor ruisreductie
-            blurred = cv2.GaussianBlur(enhanced, (5, 5), 0)
-            
-            # Pas thresholding toe om zwarte ring te isoleren
-            _, thresh = cv2.threshold(blurred, 70, 255, cv2.THRESH_BINARY_INV)
-            
-            # Edge detection
-            edges = cv2.Canny(thresh, 30, 150)
-            
-            # Morphologische operaties om de dubbele ring te benadrukken
-            kernel = np.ones((3,3), np.uint8)
-            dilated = cv2.dilate(edges, kernel, iterations=1)
-            
-            # Cirkeldetectie met parameters afgestemd op de dubbele ring
-            circles = cv2.HoughCircles(
-                dilated,
-                cv2.HOUGH_GRADIENT,
-                dp=1,
-                minDist=frame.shape[0] // 2,
-                param1=50,
-                param2=30,
-                minRadius=int(frame.shape[0] * 0.25),  # Verkleind voor dubbele ring
-                maxRadius=int(frame.shape[0] * 0.45)   # Verkleind voor dubbele ring
-            )
-            
-            if circles is not None:
-                circles = np.uint16(np.around(circles))
-                
-                # Filter cirkels op basis van intensiteit rond de rand
-                valid_circles = []
-                for circle in circles[0]:
-                    x, y, r = circle
-                    
-                    # Check of het punt binnen het frame ligt
-                    if (x > r and x < frame.shape[1] - r and 
-                        y > r and y < frame.shape[0] - r):
-                        
-                        # Maak een masker voor de ring
-                        mask = np.zeros_like(gray)
-                        cv2.circle(mask, (x, y), r, 255, 3)
-                        
-                        # Check gemiddelde intensiteit op de ring
-                        ring_mean = cv2.mean(gray, mask=mask)[0]
-                        
-                        # Voeg cirkel toe als de ring donker genoeg is (dubbele ring is zwart)
-                        if ring_mean < 100:  # Threshold voor donkere ring
-                            valid_circles.append(circle)
-                
-                if valid_circles:
-                    # Neem de meest geschikte cirkel
-                    best_circle = sorted(valid_circles, key=lambda c: c[2])[0]
-                    
-                    # De gevonden cirkel is de dubbele ring
-                    x, y, r = best_circle
-                    self.board_center = (x, y)
-                    self.board_radius = r
-                    
-                    logger.info(f"Dubbele ring gedetecteerd: center=({x}, {y}), radius={r}")
-                    
-                    return True, {
-                        'center': self.board_center,
-                        'radius': self.board_radius
-                    }
-            
-            return False, None
+
+            circle = self.pipeline.detect(frame, roi_padding)
+            if circle is None:
+                return False, None
+
+            # De gevonden cirkel is de dubbele ring
+            x, y, r = circle
+            self.board_center = (x, y)
+            self.board_radius = r
+            self.board_frame_size = (frame.shape[1], frame.shape[0])
+            logger.debug(f"Dubbele ring gedetecteerd: center=({x}, {y}), radius={r}")
+
+            return True, {
+                'center': self.board_center,
+                'radius': self.board_radius
+            }
             
         except Exception as e:
             logger.error(f"Error in board detection: {str(e)}")
             return False, None
 
-    def detect_segment(self, point: Tuple[int, int]) -> Dict:
+    def track_board(self, frame: np.ndarray, camera_name: str = 'default') -> Tuple[bool, Optional[Dict]]:
+        """Zoals detect_board, maar verifieer eerst het bord uit het vorige frame
+
+        Alleen als de goedkope ring verificatie faalt wordt de volledige
+        detectie uitgevoerd. Het resultaat bevat 'tracked': True als het
+        bord zonder nieuwe detectie bevestigd is.
+        """
+        if frame is None:
+            return False, None
+
+        tracker = self.trackers.get(camera_name)
+        if tracker is None:
+            tracker = BoardTracker(self.config['board_detection'].get('tracking', {}))
+            self.trackers[camera_name] = tracker
+
+        if tracker.verify(frame):
+            self.tracking_stats['verified'] += 1
+            self.board_center = tracker.center
+            self.board_radius = tracker.radius
+            self.board_frame_size = (frame.shape[1], frame.shape[0])
+            return True, {'center': tracker.center, 'radius': tracker.radius, 'tracked': True}
+
+        if tracker.locked:
+            self.tracking_stats['lost'] += 1
+            logger.info(f"Bord van {camera_name} niet meer bevestigd, opnieuw detecteren")
+
+        detected, info = self.detect_board(frame, self.roi_padding.get(camera_name))
+        self.tracking_stats['detected'] += 1
+        if detected:
+            tracker.lock(frame, info['center'], info['radius'])
+            info = {'center': tracker.center or info['center'],
+                    'radius': tracker.radius or info['radius'],
+                    'tracked': False}
+        else:
+            tracker.reset()
+            # Geen bord in dit frame: een oud bord mag niet opgeslagen worden
+            self.board_center = None
+            self.board_radius = None
+            self.board_frame_size = None
+        return detected, info
+
+    def set_board_roi(self, camera_name: str, padding: Optional[float]) -> None:
+        """Meld dat de frames van een camera voortaan een bord ROI zijn (None: volledig beeld)
+
+        Het bord uit eerdere frames ligt dan in andere coördinaten en wordt vergeten.
+        """
+        if padding is None:
+            self.roi_padding.pop(camera_name, None)
+        else:
+            self.roi_padding[camera_name] = float(padding)
+        self.board_center = None
+        self.board_radius = None
+        self.board_frame_size = None
+        self.reset_tracking(camera_name)
+
+    def reset_tracking(self, camera_name: Optional[str] = None) -> None:
+        """Vergeet het gevolgde bord van één camera, of van alle camera's"""
+        for name, tracker in self.trackers.items():
+            if camera_name is None or name == camera_name:
+                tracker.reset()
+
+    def camera_calibration(self, camera_name: str,
+                           frame_shape: Tuple[int, ...]) -> Optional[Tuple[Tuple[float, float], float]]:
+        """Gekalibreerd (center, radius) van een camera, geschaald naar de frame grootte"""
+        camera = self.config.get('cameras', {}).get(camera_name, {})
+        calibration = camera.get('calibration')
+        if not calibration:
+            return None
+        width, height = calibration.get('frame_size', DEFAULT_CALIBRATION_SIZE)
+        scale_x = frame_shape[1] / width
+        scale_y = frame_shape[0] / height
+        center = (calibration['center'][0] * scale_x, calibration['center'][1] * scale_y)
+        return center, calibration['radius'] * (scale_x + scale_y) / 2
+
+    def board_plane(self, camera_name: str, frame_shape: Tuple[int, ...]) -> Optional[BoardPlane]:
+        """Homografie van deze camera naar het canonieke bordvlak, of None zonder kalibratie"""
+        key = (camera_name, tuple(frame_shape[:2]))
+        plane = self.board_planes.get(key)
+        if plane is None:
+            calibration = self.config.get('cameras', {}).get(camera_name, {}).get('calibration')
+            if not calibration:
+                return None
+            plane = plane_from_calibration(calibration, frame_shape, DEFAULT_CALIBRATION_SIZE)
+            self.board_planes[key] = plane
+        return plane
+
+    def get_rectifier(self, camera_name: str, frame_shape: Tuple[int, ...], lens: Optional[Dict] = None,
+                      cache_path: Optional[str] = None) -> Optional[BoardRectifier]:
+        """Gecombineerde lenscorrectie en bord rectificatie voor deze camera, of None zonder kalibratie"""
+        key = (camera_name, tuple(frame_shape[:2]))
+        rectifier = self.rectifiers.get(key)
+        if rectifier is None:
+            plane = self.board_plane(camera_name, frame_shape)
+            if plane is None:
+                return None
+            rectifier = load_rectifier((frame_shape[1], frame_shape[0]), plane.homography, lens, cache_path)
+            self.rectifiers[key] = rectifier
+        return rectifier
+
+    def rectify(self, frame: np.ndarray, camera_name: str, lens: Optional[Dict] = None,
+                cache_path: Optional[str] = None) -> Optional[np.ndarray]:
+        """Canoniek 512x512 bordbeeld van een frame; de buffer wordt per camera hergebruikt"""
+        try:
+            rectifier = self.get_rectifier(camera_name, frame.shape, lens, cache_path)
+            if rectifier is None:
+                return None
+            dst = self.rectified.get(camera_name)
+            if dst is None or dst.shape[:2] != rectifier.size[::-1] or dst.shape[2:] != frame.shape[2:]:
+                dst = None
+            self.rectified[camera_name] = rectifier.rectify(frame, dst)
+            return self.rectified[camera_name]
+        except Exception as e:
+            logger.error(f"Error bij rectificatie: {str(e)}")
+            return None
+
+    def detect_dart(self, frame: np.ndarray, camera_name: str = 'default',
+                    rectified: bool = False) -> Tuple[bool, Optional[Dict]]:
+        """Detecteer een nieuwe, gesettelde dart in het gekalibreerde bord van deze camera
+
+        Met rectified=True is frame al het canonieke bordbeeld van rectify().
+        """
+        try:
+            if frame is None:
+                return False, None
+
+            if rectified:
+                if camera_name not in self.config.get('cameras', {}):
+                    return False, None
+                calibration = (CANONICAL_CENTER, CANONICAL_RADIUS)
+            else:
+                calibration = self.camera_calibration(camera_name, frame.shape)
+                if calibration is None:
+                    return False, None
+
+            dart = self.dart_engine.process(camera_name, frame, *calibration)
+            if dart is None:
+                return False, None
+
+            if rectified:
+                dart['board_position'] = dart['position']
+                dart['board_scale'] = 1.0
+                return True, dart
+
+            # Tip ook in het canonieke bordvlak, voor de fusie van camera's
+            plane = self.board_plane(camera_name, frame.shape)
+            dart['board_position'] = plane.to_board_point(dart['position'])
+            dart['board_scale'] = plane.local_scale(dart['position'])
+            return True, dart
+
+        except Exception as e:
+            logger.error(f"Error bij dart detectie: {str(e)}")
+            return False, None
+
+    def throw_state(self, camera_name: str) -> Dict:
+        """Toestand van de worp cyclus van een camera (idle, in-flight, settled, scored, darts-removed)"""
+        return self.dart_engine.get_state(camera_name)
+
+    def reset_dart_detection(self, camera_name: Optional[str] = None) -> None:
+        """Begin opnieuw met een leeg bord als referentie"""
+        self.dart_engine.reset(camera_name)
+
+    def get_score_map(self, rotation: float = 0.0) -> Optional[ScoreMap]:
+        """ScoreMap voor de huidige kalibratie, of None als het bord niet gedetecteerd is"""
+        if self.board_center is None or self.board_radius is None:
+            return None
+        return get_score_map(self.board_center, self.board_radius, self.geometry, rotation)
+
+    def detect_segment(self, point: Tuple[int, int], rotation: float = 0.0) -> Dict:
         """
         Detecteer in welk segment en ring een punt ligt
         """
         try:
-            if self.board_center is None or self.board_radius is None:
+            score_map = self.get_score_map(rotation)
+            if score_map is None:
                 return {'success': False, 'error': 'Bord niet gedetecteerd'}
 
-            # Bereken afstand van punt tot centrum
-            dx = point[0] - self.board_center[0]
-            dy = point[1] - self.board_center[1]
-            distance = math.sqrt(dx*dx + dy*dy)
-            distance_factor = distance / self.board_radius
-            
-            # Bereken hoek (0-360 graden)
-            angle = math.degrees(math.atan2(dy, dx))
-            if angle < 0:
-                angle += 360
-                
-            # Segment waarden in volgorde (tegen de klok in, startend bij 20)
-            segment_values = [20, 1, 18, 4, 13, 6, 10, 15, 2, 17, 3, 19, 7, 16, 8, 11, 14, 9, 12, 5]
-            
-            # Bepaal segment nummer (0-19)
-            # We draaien 9 graden (halve segment) voor correcte uitlijning
-            segment_index = int(((angle + 9) % 360) / 18)
-            segment_value = segment_values[segment_index]
-            
-            # Bepaal ring (double, triple, single of bull)
-            ring_value = 1  # default single
-            regions = self.config['scoring_regions']
-            
-            if distance_factor <= regions['bullseye']['outer_radius_factor']:
-                # Bullseye gebied
-                if distance_factor <= regions['bullseye']['inner_radius_factor']:
-                    segment_value = 50  # Double bull
-                    ring_value = 1
-                else:
-                    segment_value = 25  # Single bull
-                    ring_value = 1
-            else:
-                # Check double ring
-                if regions['doubles']['inner_radius_factor'] <= distance_factor <= regions['doubles']['outer_radius_factor']:
-                    ring_value = 2
-                # Check triple ring
-                elif regions['triples']['inner_radius_factor'] <= distance_factor <= regions['triples']['outer_radius_factor']:
-                    ring_value = 3
-                # Check of punt binnen het bord valt
-                elif distance_factor > regions['doubles']['outer_radius_factor']:
-                    return {'success': False, 'error': 'Punt buiten bord'}
-            
-            score = segment_value * ring_value
-            
+            hit = score_map.lookup(point)
+            if hit['label'] == 0:
+                return {'success': False, 'error': 'Punt buiten bord'}
+
             return {
                 'success': True,
-                'segment_value': segment_value,
-                'ring_value': ring_value,
-                'score': score,
-                'segment_index': segment_index,
-                'distance_factor': distance_factor,
-                'angle': angle
+                'segment_value': hit['segment_value'],
+                'ring_value': hit['multiplier'],
+                'score': hit['score'],
+                'segment_index': hit['segment_index']
             }
             
         except Exception as e:
@@ -247,9 +449,9 @@ class DartboardDetector:
                 return debug_frame
                 
             # Teken scoring regions
-            for region_name, region in self.config['scoring_regions'].items():
-                outer_radius = int(self.board_radius * region['outer_radius_factor'])
-                inner_radius = int(self.board_radius * region['inner_radius_factor'])
+            for inner_factor, outer_factor in self.geometry.regions.values():
+                outer_radius = int(self.board_radius * outer_factor)
+                inner_radius = int(self.board_radius * inner_factor)
                 
                 # Standaard groene kleur voor de cirkels
                 circle_color = (0, 255, 0)
@@ -257,20 +459,21 @@ class DartboardDetector:
                 cv2.circle(debug_frame, self.board_center, inner_radius, circle_color, 1)
 
             # Teken segmentlijnen en het speciale T20 vak
+            triple_inner_factor, triple_outer_factor = self.geometry.regions['triples']
             for i in range(20):
-                angle = math.radians(i * 18 + rotation)
-                next_angle = math.radians((i + 1) * 18 + rotation)
+                angle = math.radians(self.geometry.segment_start(i, rotation))
+                next_angle = angle + math.radians(SEGMENT_ANGLE)
                 
                 # Teken segmentlijnen
                 end_x = int(self.board_center[0] + self.board_radius * math.cos(angle))
                 end_y = int(self.board_center[1] + self.board_radius * math.sin(angle))
                 cv2.line(debug_frame, self.board_center, (end_x, end_y), (0, 255, 0), 1)
                 
-                # Markeer het triple 20 vak (segment 20 is op positie 5)
-                if i == 5:  # Index voor segment 20
+                # Markeer het triple 20 vak
+                if self.get_segment_value(i) == 20:
                     # Bereken hoekpunten voor het triple 20 vak
-                    triple_outer = self.board_radius * self.config['scoring_regions']['triples']['outer_radius_factor']
-                    triple_inner = self.board_radius * self.config['scoring_regions']['triples']['inner_radius_factor']
+                    triple_outer = self.board_radius * triple_outer_factor
+                    triple_inner = self.board_radius * triple_inner_factor
                     
                     # Maak een lijst van punten voor het triple 20 vak
                     pts = np.array([
@@ -312,16 +515,27 @@ class DartboardDetector:
             logger.error(f"Error in debug visualization: {str(e)}")
             return frame
 
+    def estimate_rotation(self, frame: np.ndarray, prior: float = 0.0) -> Optional[float]:
+        """Segment rotatie van het gedetecteerde bord uit het hoekprofiel, of None"""
+        if self.board_center is None or self.board_radius is None:
+            return None
+        try:
+            return estimate_rotation(frame, self.board_center, self.board_radius, prior,
+                                     bands=single_bands(self.config['scoring_regions']))
+        except Exception as e:
+            logger.error(f"Error bij rotatie schatting: {str(e)}")
+            return None
+
     def get_segment_value(self, segment_index: int) -> int:
         """Krijg puntenwaarde voor een segment"""
-        segment_values = [10, 15, 2, 17, 3, 19, 7, 16, 8, 11, 14, 9, 12, 5, 20, 1, 18, 4, 13, 6]
-        return segment_values[segment_index % 20]
+        return self.geometry.segment_values[segment_index % 20]
 
-    def start_calibration(self, root: tk.Tk, cameras: Dict) -> None:
-        """Start het kalibratieproces voor de camera's"""
-        self.calibration_ui = CalibrationUI(root, self, cameras)
+    def start_calibration(self, root: tk.Tk, camera_manager) -> None:
+        """Start het kalibratieproces voor de camera's van de CameraManager"""
+        self.calibration_ui = CalibrationUI(root, self, camera_manager)
 
-    def save_calibration(self, camera_name: str, center: Tuple[int, int], radius: int, rotation: float = 0) -> None:
+    def save_calibration(self, camera_name: str, center: Tuple[int, int], radius: int, rotation: float = 0,
+                         frame_size: Optional[Tuple[int, int]] = None) -> None:
         """Sla kalibratie op voor een specifieke camera"""
         if 'cameras' not in self.config:
             self.config['cameras'] = {}
@@ -330,9 +544,13 @@ class DartboardDetector:
             'calibration': {
                 'center': center,
                 'radius': radius,
-                'rotation': rotation
+                'rotation': rotation,
+                'frame_size': list(frame_size or DEFAULT_CALIBRATION_SIZE)
             }
         }
+        self.dart_engine.reset(camera_name)
+        self.board_planes = {key: plane for key, plane in self.board_planes.items() if key[0] != camera_name}
+        self.rectifiers = {key: r for key, r in self.rectifiers.items() if key[0] != camera_name}
         
         self.save_config()
 
@@ -348,13 +566,19 @@ class DartboardDetector:
 
 
 class CalibrationUI:
-    def __init__(self, root: tk.Tk, detector: DartboardDetector, cameras: Dict):
+    def __init__(self, root: tk.Tk, detector: DartboardDetector, camera_manager):
         self.root = root
         self.detector = detector
-        self.cameras = cameras
+        self.camera_manager = camera_manager
+        self.camera_names = [name for name in ('camera1', 'camera2', 'camera3')
+                             if name in camera_manager.cameras]
         self.current_camera_index = 0
         self.preview_active = False
         self.rotation = 0
+        self.frame_worker = None
+        # Camera's die al tot hun bord beperkt zijn
+        for name in self.camera_names:
+            self.detector.set_board_roi(name, camera_manager.board_roi_padding(name))
         
         # Reset root window
         for widget in root.winfo_children():
@@ -424,6 +648,11 @@ class CalibrationUI:
             text="+",
             command=lambda: self.adjust_rotation(5)
         ).grid(row=0, column=2, padx=2)
+        ttk.Button(
+            control_frame,
+            text="Auto",
+            command=self.auto_rotation
+        ).grid(row=0, column=3, padx=2)
         
         # Save en Next knoppen
         ttk.Button(
@@ -434,7 +663,7 @@ class CalibrationUI:
         
         self.next_button = ttk.Button(
             control_frame,
-            text="Next Camera" if self.current_camera_index < 2 else "Complete",
+            text="Next Camera" if self.current_camera_index < len(self.camera_names) - 1 else "Complete",
             command=self.next_camera
         )
         self.next_button.grid(row=1, column=1, columnspan=2, pady=10, padx=5)
@@ -442,39 +671,46 @@ class CalibrationUI:
     def start_preview(self):
         """Start camera preview"""
         self.preview_active = True
-        self.update_preview()
+        for name in self.camera_names:
+            self.camera_manager.subscribe(name, 'half')
+        self.start_frame_worker()
+
+    def start_frame_worker(self):
+        """Ontvang de frames van de huidige camera via een worker thread"""
+        if self.frame_worker is not None:
+            self.frame_worker.stop()
+        # Alleen een nieuw frame uit de capture sessie wordt afgeleverd; het
+        # 'half' niveau is de display resolutie
+        self.frame_worker = FrameWorker(
+            self.root, self.camera_manager, self.current_camera_name(),
+            lambda lease: lease.frame.copy() if lease.valid else None,
+            self.update_preview, level='half'
+        )
+        self.frame_worker.start()
         
-    def update_preview(self):
+    def update_preview(self, display_frame: np.ndarray):
         """Update camera preview"""
         if not self.preview_active:
             return
             
-        # Krijg huidige camera
-        current_camera = list(self.cameras.values())[self.current_camera_index]
-        frame = current_camera['last_frame']
+        # Volg het bord; volledige detectie alleen als de verificatie faalt
+        detected, info = self.detector.track_board(display_frame, self.current_camera_name())
         
-        if frame is not None:
-            # Resize voor display
-            display_frame = cv2.resize(frame, (640, 360))
-            
-            # Detecteer bord
-            detected, info = self.detector.detect_board(display_frame)
+        if detected:
+            # Maak debug visualisatie
+            debug_frame = self.detector.draw_debug(display_frame, self.rotation)
             
-            if detected:
-                # Maak debug visualisatie
-                debug_frame = self.detector.draw_debug(display_frame, self.rotation)
-                
-                # Update beide canvassen
-                self.show_frame(display_frame, self.original_canvas)
-                self.show_frame(debug_frame, self.detection_canvas)
-            else:
-                # Alleen origineel frame
-                self.show_frame(display_frame, self.original_canvas)
-                self.detection_canvas.delete("all")
-                
-        # Schedule volgende update
-        if self.preview_active:
-            self.root.after(30, self.update_preview)
+            # Update beide canvassen
+            self.show_frame(display_frame, self.original_canvas)
+            self.show_frame(debug_frame, self.detection_canvas)
+        else:
+            # Alleen origineel frame
+            self.show_frame(display_frame, self.original_canvas)
+            self.detection_canvas.delete("all")
+
+    def current_camera_name(self) -> str:
+        """Naam van de camera die gekalibreerd wordt"""
+        return self.camera_names[self.current_camera_index]
             
     def show_frame(self, frame: np.ndarray, canvas: tk.Canvas):
         """Toon frame op canvas"""
@@ -490,29 +726,48 @@ class CalibrationUI:
         """Pas rotatie aan"""
         self.rotation = (self.rotation + delta) % 360
         
+    def auto_rotation(self):
+        """Bepaal de rotatie uit de zwarte en witte segmenten van het huidige frame"""
+        frame = self.camera_manager.get_frame(self.current_camera_name(), 'half')
+        rotation = self.detector.estimate_rotation(frame, self.rotation) if frame is not None else None
+        if rotation is None:
+            messagebox.showerror("Error", "Kon de rotatie niet bepalen")
+            return
+        self.rotation = rotation
+        
     def save_current(self):
         """Sla kalibratie op voor huidige camera"""
-        current_camera = list(self.cameras.keys())[self.current_camera_index]
+        current_camera = self.current_camera_name()
         
         if self.detector.board_center and self.detector.board_radius:
-            self.detector.save_calibration(
+            # Capture voortaan alleen het bord; kalibratie in coördinaten van die ROI.
+            # board_frame_size hoort bij board_center, ook als het laatste frame al gecropt is
+            center, radius, frame_size = self.camera_manager.apply_board_roi(
                 current_camera,
                 self.detector.board_center,
                 self.detector.board_radius,
-                self.rotation
+                self.detector.board_frame_size
             )
+            self.detector.save_calibration(current_camera, center, radius, self.rotation, frame_size)
+            # Volgende frames zijn de nieuwe ROI: het oude bord en de tracker vervallen
+            self.detector.set_board_roi(current_camera, self.camera_manager.board_roi_padding(current_camera))
             messagebox.showinfo("Success", f"Kalibratie opgeslagen voor {current_camera}")
         else:
             messagebox.showerror("Error", "Geen dartbord gedetecteerd")
             
     def next_camera(self):
         """Ga naar volgende camera of rond af"""
-        if self.current_camera_index < 2:
+        if self.current_camera_index < len(self.camera_names) - 1:
             self.current_camera_index += 1
             self.rotation = 0
+            # Het bord van de vorige camera mag niet voor deze opgeslagen worden
+            name = self.current_camera_name()
+            self.detector.set_board_roi(name, self.camera_manager.board_roi_padding(name))
+            if self.preview_active:
+                self.start_frame_worker()
             self.status_label.config(text=f"Kalibreren camera {self.current_camera_index + 1}")
             self.next_button.config(
-                text="Next Camera" if self.current_camera_index < 2 else "Complete"
+                text="Next Camera" if self.current_camera_index < len(self.camera_names) - 1 else "Complete"
             )
         else:
             # Kalibratie compleet
@@ -527,6 +782,8 @@ class CalibrationUI:
             
             # Stop preview
             self.preview_active = False
+            if self.frame_worker is not None:
+                self.frame_worker.stop()
             
             # Sluit kalibratie window
             self.root.destroy()
@@ -537,5 +794,10 @@ class CalibrationUI:
     def stop_preview(self):
         """Stop camera preview"""
         self.preview_active = False
+        if self.frame_worker is not None:
+            self.frame_worker.stop()
+            self.frame_worker = None
+        for name in self.camera_names:
+            self.camera_manager.unsubscribe(name, 'half')
         self.original_canvas.delete("all")
         self.detection_canvas.delete("all")
\ No newline at end of file
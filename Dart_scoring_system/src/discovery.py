@@ -0,0 +1,158 @@
+import glob
+import logging
+import re
+import sys
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import Thread, Lock, Event
+
+import cv2
+
+from .sources import capture_api
+
+logger = logging.getLogger('dart_scorer.discovery')
+
+
+class DeviceDiscovery:
+    """Parallelle, gecachete detectie van beschikbare camera's
+
+    Alle indices worden tegelijk geprobeerd met een timeout per probe. Het
+    resultaat wordt gecachet op basis van de set device nodes (/dev/video*),
+    zodat een nieuwe probe alleen nodig is als er een camera bij komt of
+    verdwijnt. Een optionele achtergrond thread houdt dat in de gaten.
+    Devices die een open capture sessie vasthoudt (zie register_sessions)
+    worden niet opnieuw geopend maar tellen als beschikbaar.
+    """
+    def __init__(self, max_index=10, probe_timeout=2.0, poll_interval=2.0):
+        self.max_index = max_index
+        self.probe_timeout = probe_timeout
+        self.poll_interval = poll_interval
+        self.lock = Lock()
+        self.cache_key = None
+        self.cached_cameras = None
+        self.generation = 0
+        self.monitor_thread = None
+        self.stop_event = Event()
+        self.session_providers = []
+
+    def register_sessions(self, provider):
+        """Registreer een (gebonden) methode die de device indices van open sessies geeft"""
+        with self.lock:
+            self.session_providers.append(weakref.WeakMethod(provider))
+
+    def devices_in_use(self):
+        """Device indices die nu door een capture sessie geopend zijn"""
+        with self.lock:
+            self.session_providers = [ref for ref in self.session_providers if ref() is not None]
+            providers = [ref() for ref in self.session_providers]
+        in_use = set()
+        for provider in providers:
+            if provider is not None:
+                in_use.update(provider())
+        return in_use
+
+    def _device_nodes(self):
+        """Set van video device nodes, of None als het platform die niet heeft"""
+        if not sys.platform.startswith('linux'):
+            return None
+        return frozenset(glob.glob('/dev/video*'))
+
+    def _candidate_indices(self, nodes):
+        """Indices die geprobeerd moeten worden"""
+        if not nodes:
+            return list(range(self.max_index))
+        indices = set()
+        for node in nodes:
+            match = re.search(r'(\d+)$', node)
+            if match and int(match.group(1)) < self.max_index:
+                indices.add(int(match.group(1)))
+        return sorted(indices)
+
+    @staticmethod
+    def _probe(index):
+        """Check of een camera index geopend kan worden"""
+        # Zelfde backend als DeviceSource, anders kunnen probe en capture het oneens zijn
+        cap = cv2.VideoCapture(index, capture_api())
+        try:
+            return cap.isOpened()
+        finally:
+            cap.release()
+
+    def probe(self, indices):
+        """Probeer alle indices tegelijk; probes die te lang duren tellen als niet beschikbaar"""
+        if not indices:
+            return []
+        executor = ThreadPoolExecutor(max_workers=len(indices), thread_name_prefix='camera-probe')
+        futures = {executor.submit(self._probe, i): i for i in indices}
+        done, not_done = wait(futures, timeout=self.probe_timeout)
+        # Niet wachten op hangende probes, die ruimen zichzelf op
+        executor.shutdown(wait=False)
+
+        for future in not_done:
+            logger.warning(f"Camera probe voor index {futures[future]} duurde te lang")
+
+        available = []
+        for future in done:
+            try:
+                if future.result():
+                    available.append(futures[future])
+            except Exception as e:
+                logger.error(f"Error bij proben camera {futures[future]}: {str(e)}")
+        return [str(i) for i in sorted(available)]
+
+    def get_available_cameras(self, refresh=False) -> list:
+        """Detecteer beschikbare camera's, uit de cache als de devices niet veranderd zijn"""
+        nodes = self._device_nodes()
+        with self.lock:
+            if not refresh and self.cached_cameras is not None and nodes == self.cache_key:
+                return list(self.cached_cameras)
+
+        candidates = self._candidate_indices(nodes)
+        # Een device met een open sessie kan niet nog eens geopend worden
+        in_use = self.devices_in_use().intersection(candidates)
+        probed = self.probe([i for i in candidates if i not in in_use])
+        cameras = sorted(set(probed) | {str(i) for i in in_use}, key=int)
+        with self.lock:
+            changed = cameras != self.cached_cameras
+            self.cache_key = nodes
+            self.cached_cameras = cameras
+            if changed:
+                self.generation += 1
+        logger.info(f"Beschikbare camera's: {cameras}")
+        return list(cameras)
+
+    def start_monitoring(self):
+        """Start een achtergrond thread die bij hot-plug de cache ververst"""
+        if self.monitor_thread is not None:
+            return
+        self.stop_event.clear()
+        self.monitor_thread = Thread(target=self._monitor_loop, daemon=True)
+        self.monitor_thread.start()
+
+    def stop_monitoring(self):
+        """Stop de achtergrond thread"""
+        self.stop_event.set()
+        if self.monitor_thread is not None:
+            self.monitor_thread.join()
+            self.monitor_thread = None
+
+    def _monitor_loop(self):
+        """Probe opnieuw zodra de set device nodes verandert"""
+        while not self.stop_event.wait(self.poll_interval):
+            nodes = self._device_nodes()
+            if nodes is not None and nodes != self.cache_key:
+                logger.info("Camera devices gewijzigd, opnieuw detecteren")
+                self.get_available_cameras(refresh=True)
+
+
+_discovery = None
+_discovery_lock = Lock()
+
+
+def get_device_discovery() -> DeviceDiscovery:
+    """Gedeelde DeviceDiscovery instantie voor de hele applicatie"""
+    global _discovery
+    with _discovery_lock:
+        if _discovery is None:
+            _discovery = DeviceDiscovery()
+        return _discovery
@@ -0,0 +1,109 @@
+import logging
+import threading
+import tkinter as tk
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger('dart_scorer.frame_worker')
+
+
+class FrameWorker:
+    """Verwerkt de frames van één camera in een eigen thread en geeft het resultaat aan Tk
+
+    De thread blokkeert op wait_for_frame, dus zonder nieuw frame wordt er
+    niets gedaan en staan er geen lege `after` callbacks in de Tk mainloop.
+    `process(lease)` draait in de worker thread; het resultaat gaat via een
+    virtueel event naar `deliver(result)` in de mainloop. Een resultaat dat
+    Tk nog niet opgehaald heeft wordt vervangen, zodat een trage GUI niet
+    achter de camera aan gaat lopen.
+    """
+    TIMEOUT = 0.5
+
+    def __init__(self, root: tk.Misc, camera_manager, camera_name: str,
+                 process: Callable[[Any], Any], deliver: Callable[[Any], None], level: str = 'full'):
+        self.root = root
+        self.camera_manager = camera_manager
+        self.camera_name = camera_name
+        self.process = process
+        self.deliver = deliver
+        self.level = level
+        self.event = f"<<Frame-{id(self)}>>"
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.stopped.set()
+        self.result = None
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.thread is not None and not self.stopped.is_set()
+
+    def start(self):
+        """Start de worker thread"""
+        if self.is_running:
+            return
+        # Een eigen stop event per thread; een vorige thread kan nog uitlopen
+        self.stopped = threading.Event()
+        self.root.bind(self.event, self._deliver)
+        self.thread = threading.Thread(target=self._run, args=(self.stopped,),
+                                       name=f"frames-{self.camera_name}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop de worker; niet joinen, de thread kan net op de mainloop wachten"""
+        self.stopped.set()
+        self.thread = None
+        with self.lock:
+            self.result = None
+        try:
+            self.root.unbind(self.event)
+        except tk.TclError:
+            pass
+
+    def _idle_wait(self) -> float:
+        """Eén frame interval; een camera in SynchronizedCapture blokkeert zelf niet"""
+        camera = self.camera_manager.cameras.get(self.camera_name)
+        fps = (getattr(camera, 'config', None) or {}).get('settings', {}).get('fps') or 30
+        return 1.0 / float(fps)
+
+    def _run(self, stopped: threading.Event):
+        seq = 0
+        previous = None
+        while not stopped.is_set():
+            camera = self.camera_manager.cameras.get(self.camera_name)
+            # Een nieuwe sessie of een opnieuw gealloceerde ring (bv. na een
+            # bord ROI) begint weer bij volgnummer 1
+            if camera is not previous or (camera is not None and camera.frame_seq < seq):
+                seq = 0
+                previous = camera
+            lease = None if camera is None else camera.wait_for_frame(seq, self.TIMEOUT, self.level)
+            if lease is None:
+                if camera is None or not camera.is_running:
+                    stopped.wait(self.TIMEOUT if camera is None else self._idle_wait())
+                continue
+
+            try:
+                with lease:
+                    seq = lease.seq
+                    result = self.process(lease)
+            except Exception as e:
+                logger.error(f"Error bij verwerken frame van {self.camera_name}: {str(e)}")
+                continue
+            if result is None or stopped.is_set():
+                continue
+
+            with self.lock:
+                notify = self.result is None
+                self.result = result
+            if notify:
+                try:
+                    self.root.event_generate(self.event, when='tail')
+                except (tk.TclError, RuntimeError):
+                    # Venster gesloten
+                    stopped.set()
+
+    def _deliver(self, event=None):
+        """Draait in de Tk mainloop: geef het nieuwste resultaat door"""
+        with self.lock:
+            result, self.result = self.result, None
+        if result is not None and not self.stopped.is_set():
+            self.deliver(result)
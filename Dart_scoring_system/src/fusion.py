@@ -0,0 +1,102 @@
+import logging
+import math
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .board_plane import CANONICAL_CENTER, CANONICAL_RADIUS
+
+logger = logging.getLogger('dart_scorer.fusion')
+
+DEFAULT_FUSION = {
+    'window': 0.5,
+    'max_spread': 20.0,
+    'min_confidence': 0.05
+}
+
+
+class ThrowFusion:
+    """Combineert de tip schattingen van alle camera's tot één worp
+
+    Schattingen komen binnen in het canonieke bordvlak. De eerste opent een
+    worp; die wordt uitgegeven zodra alle camera's gemeld hebben of na
+    `window` seconden. Schattingen verder dan `max_spread` van de sterkste
+    cluster tellen niet mee, de rest wordt gewogen met confidence en de
+    lokale schaal van de camera. Meldingen die binnen `window` na het
+    uitgeven van een worp nog binnenkomen horen bij die worp en worden
+    genegeerd, zodat elke dart precies één keer gescoord wordt.
+    """
+    def __init__(self, cameras: Sequence[str], config: Optional[Dict] = None):
+        self.cameras = set(cameras)
+        self.config = dict(DEFAULT_FUSION)
+        self.config.update(config or {})
+        self.pending: List[Dict] = []
+        self.opened_at: Optional[float] = None
+        self.closed_until = 0.0
+        self.emitted = 0
+
+    def reset(self) -> None:
+        self.pending = []
+        self.opened_at = None
+        self.closed_until = 0.0
+
+    def add(self, camera_name: str, position: Tuple[float, float], confidence: float,
+            scale: float = 1.0, timestamp: Optional[float] = None) -> None:
+        """Voeg de tip schatting van een camera toe (in bordvlak coördinaten)"""
+        now = time.monotonic() if timestamp is None else timestamp
+        if now < self.closed_until:
+            logger.debug(f"Late schatting van {camera_name} genegeerd")
+            return
+        if self.opened_at is None:
+            self.opened_at = now
+        # Een camera meldt per worp één keer; een nieuwere schatting vervangt de oude
+        self.pending = [e for e in self.pending if e['camera'] != camera_name]
+        self.pending.append({
+            'camera': camera_name,
+            'position': (float(position[0]), float(position[1])),
+            'confidence': float(confidence),
+            # Eén camera pixel fout weegt zwaarder als die veel bordvlak beslaat
+            'weight': max(float(confidence), self.config['min_confidence']) / max(scale, 1e-6) ** 2
+        })
+
+    def poll(self, now: Optional[float] = None) -> Optional[Dict]:
+        """Geef de gecombineerde worp als die compleet is, anders None"""
+        if self.opened_at is None:
+            return None
+        now = time.monotonic() if now is None else now
+        reported = {e['camera'] for e in self.pending}
+        if not self.cameras <= reported and now - self.opened_at < self.config['window']:
+            return None
+
+        throw = self.combine(self.pending, self.config['max_spread'])
+        self.pending = []
+        self.opened_at = None
+        self.closed_until = now + self.config['window']
+        self.emitted += 1
+        logger.info(f"Worp gecombineerd uit {throw['cameras']}: "
+                    f"({throw['position'][0]:.1f}, {throw['position'][1]:.1f})")
+        return throw
+
+    @staticmethod
+    def combine(estimates: List[Dict], max_spread: float) -> Dict:
+        """Gewogen gemiddelde van de schattingen rond de zwaarste cluster"""
+        def support(estimate):
+            x, y = estimate['position']
+            return sum(e['weight'] for e in estimates
+                       if math.hypot(e['position'][0] - x, e['position'][1] - y) <= max_spread)
+
+        anchor = max(estimates, key=support)['position']
+        inliers = [e for e in estimates
+                   if math.hypot(e['position'][0] - anchor[0], e['position'][1] - anchor[1]) <= max_spread]
+
+        total = sum(e['weight'] for e in inliers)
+        x = sum(e['weight'] * e['position'][0] for e in inliers) / total
+        y = sum(e['weight'] * e['position'][1] for e in inliers) / total
+        confidence = sum(e['confidence'] for e in inliers) / len(estimates)
+        return {
+            'position': (x, y),
+            'board_center': CANONICAL_CENTER,
+            'board_radius': CANONICAL_RADIUS,
+            'confidence': confidence,
+            'cameras': sorted(e['camera'] for e in inliers),
+            'rejected': sorted(e['camera'] for e in estimates if e not in inliers)
+        }
@@ -0,0 +1,153 @@
+import logging
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger('dart_scorer.geometry')
+
+# Ringen van een geraakt punt
+RING_MISS = 0
+RING_SINGLE = 1
+RING_DOUBLE = 2
+RING_TRIPLE = 3
+RING_OUTER_BULL = 4
+RING_BULL = 5
+
+SEGMENT_ANGLE = 18.0
+
+# Standaard layout in beeldcoördinaten (y naar beneden, hoeken met de klok
+# mee): 20 gecentreerd boven op 270 graden, dus beginnend op 261 graden
+STANDARD_SEGMENTS = [20, 1, 18, 4, 13, 6, 10, 15, 2, 17, 3, 19, 7, 16, 8, 11, 14, 9, 12, 5]
+STANDARD_SEGMENT_START = 261.0
+
+# Resolutie van de hoek -> segment tabel
+ANGLE_BINS_PER_DEGREE = 10
+
+
+def standard_segments() -> list:
+    """point_values.segments voor de standaard layout (beginhoek per segment)"""
+    return [{'value': value, 'angle': (STANDARD_SEGMENT_START + i * SEGMENT_ANGLE) % 360.0}
+            for i, value in enumerate(STANDARD_SEGMENTS)]
+
+
+class BoardGeometry:
+    """Onveranderlijk, gecompileerd model van het bord: ringen, segmenten en waarden
+
+    Wordt één keer uit board_config.json gebouwd (scoring_regions en
+    point_values.segments, met 'angle' de beginhoek van elk segment) en
+    gedeeld door detector, scorer en ScoreMap. Ringgrenzen zijn als
+    gekwadrateerde radius factoren opgeslagen, zodat een punt zonder
+    wortel geclassificeerd wordt, en een hoek tabel met 0.1 graad
+    resolutie geeft het segment. Scoren is daarmee alleen array indexering.
+    """
+    def __init__(self, regions: Dict, segments: Optional[Sequence[Dict]] = None):
+        segments = sorted(segments or standard_segments(), key=lambda s: float(s['angle']) % 360.0)
+        if len(segments) != 20:
+            raise ValueError("Een dartbord heeft 20 segmenten")
+        starts = np.array([float(s['angle']) % 360.0 for s in segments])
+        if not np.allclose(np.diff(starts), SEGMENT_ANGLE):
+            raise ValueError("Segmenten moeten elk 18 graden beslaan")
+
+        self.segment_values = tuple(int(s['value']) for s in segments)
+        self.segment_offset = float(starts[0])
+        self.regions = {name: (float(r['inner_radius_factor']), float(r['outer_radius_factor']))
+                        for name, r in regions.items()}
+
+        bull, outer_bull = self.regions['bullseye']
+        triple_inner, triple_outer = self.regions['triples']
+        double_inner, double_outer = self.regions['doubles']
+        self.bull_sq = bull ** 2
+        self.outer_bull_sq = outer_bull ** 2
+        self.double_outer_sq = double_outer ** 2
+
+        # Oplopende grenzen met intervallen (a, b]; binnengrenzen van de
+        # ringen tellen mee, dus die schuiven een ulp naar beneden
+        inner = lambda factor: np.nextafter(factor ** 2, -np.inf)
+        ring_bounds_sq = np.array([self.bull_sq, self.outer_bull_sq,
+                                   inner(triple_inner), triple_outer ** 2,
+                                   inner(double_inner), self.double_outer_sq])
+        if np.any(np.diff(ring_bounds_sq) < 0):
+            raise ValueError("scoring_regions overlappen of staan niet in volgorde bull < triple < double")
+        self.ring_bounds_sq = self._frozen_array(ring_bounds_sq)
+        self.ring_codes = self._frozen_array([RING_BULL, RING_OUTER_BULL, RING_SINGLE, RING_TRIPLE,
+                                              RING_SINGLE, RING_DOUBLE, RING_MISS], np.uint8)
+
+        # Hoek (in 0.1 graad stappen vanaf 0) -> segment index, in gehele stappen zodat
+        # segmentgrenzen exact op een stap vallen
+        bins = np.arange(360 * ANGLE_BINS_PER_DEGREE)
+        offset = int(round(self.segment_offset * ANGLE_BINS_PER_DEGREE))
+        angle_lut = ((bins - offset) % len(bins)) // int(SEGMENT_ANGLE * ANGLE_BINS_PER_DEGREE)
+        self.angle_lut = self._frozen_array(angle_lut, np.uint8)
+
+        # (ring, segment) -> waarde en vermenigvuldiger; bulls en mis hebben geen segment
+        values = np.zeros((6, 20), dtype=np.int16)
+        values[[RING_SINGLE, RING_DOUBLE, RING_TRIPLE]] = self.segment_values
+        values[RING_OUTER_BULL] = 25
+        values[RING_BULL] = 50
+        multipliers = np.zeros((6, 20), dtype=np.int16)
+        multipliers[[RING_SINGLE, RING_DOUBLE, RING_TRIPLE, RING_OUTER_BULL, RING_BULL]] = [[1], [2], [3], [1], [1]]
+        self.value_table = self._frozen_array(values)
+        self.multiplier_table = self._frozen_array(multipliers)
+        self.score_table = self._frozen_array(values * multipliers)
+
+        self.key = (tuple(sorted(self.regions.items())), self.segment_values, self.segment_offset)
+        self._frozen = True
+
+    @staticmethod
+    def _frozen_array(values, dtype=None) -> np.ndarray:
+        array = np.array(values, dtype=dtype)
+        array.flags.writeable = False
+        return array
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError("BoardGeometry is onveranderlijk")
+        super().__setattr__(name, value)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, BoardGeometry) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'BoardGeometry':
+        """Geometrie uit een board_config; zonder point_values de standaard layout"""
+        segments = config.get('point_values', {}).get('segments')
+        if not segments:
+            logger.info("Geen point_values.segments in de config, standaard layout gebruikt")
+        return cls(config['scoring_regions'], segments)
+
+    def segment_start(self, index: int, rotation: float = 0.0) -> float:
+        """Beginhoek (graden, beeldcoördinaten) van segment `index` op een gedraaid bord"""
+        return (self.segment_offset + index * SEGMENT_ANGLE + rotation) % 360.0
+
+    def classify(self, dx: np.ndarray, dy: np.ndarray, radius: float,
+                 rotation: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+        """(ring, segment index) voor offsets ten opzichte van het centrum"""
+        distance_sq = dx * dx + dy * dy
+        distance_sq *= 1.0 / (float(radius) * float(radius))
+        rings = self.ring_codes[np.searchsorted(self.ring_bounds_sq, distance_sq, side='left')]
+
+        angle = np.degrees(np.arctan2(dy, dx))
+        angle -= rotation
+        angle %= 360.0
+        bins = (angle * ANGLE_BINS_PER_DEGREE).astype(np.intp)
+        # Afronding kan precies 360 graden geven
+        np.minimum(bins, len(self.angle_lut) - 1, out=bins)
+        return rings, self.angle_lut[bins]
+
+    def score_points(self, points, center: Tuple[float, float], radius: float,
+                     rotation: float = 0.0) -> Dict[str, np.ndarray]:
+        """Ring, segment, vermenigvuldiger en score voor een (N, 2) array van punten"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        rings, index = self.classify(points[:, 0] - center[0], points[:, 1] - center[1], radius, rotation)
+        segment = self.value_table[rings, index]
+        multiplier = self.multiplier_table[rings, index]
+        return {
+            'ring': rings,
+            'segment_index': index,
+            'segment': segment,
+            'multiplier': multiplier,
+            'score': self.score_table[rings, index]
+        }
@@ -6,6 +6,11 @@ from typing import Dict, Callable
 import json
 from PIL import Image, ImageTk
 
+from ..frame_worker import FrameWorker
+from ..fusion import ThrowFusion
+from ..rectify import crop_lens
+from ..scheduler import DetectionScheduler
+
 logger = logging.getLogger('dart_scorer.gui.scoring')
 
 class ScoringGUI:
@@ -24,9 +29,16 @@ class ScoringGUI:
         self.game_active = False
         self.current_player = 1
         self.throws_left = 3
+        self.frame_workers: Dict[str, FrameWorker] = {}
         
         # GUI setup
         self.setup_gui()
+
+        # Eén worp per dart, gecombineerd over alle camera's
+        cameras = [name for name in self.camera_canvases if name in self.camera_manager.cameras]
+        self.fusion = ThrowFusion(cameras, self.detector.config.get('fusion'))
+        # Detectie alleen bij beweging in het bord, maximaal eens per detection_interval_ms
+        self.scheduler = DetectionScheduler(self.camera_manager.config.get('global_settings'))
         
     def setup_gui(self):
         """Initialiseer de GUI elementen"""
@@ -180,6 +192,10 @@ class ScoringGUI:
         self.current_player = 1
         self.throws_left = 3
         self.update_displays()
+        # Het huidige bord is de referentie voor de eerste worp
+        self.detector.reset_dart_detection()
+        self.fusion.reset()
+        self.scheduler.reset()
         self.start_camera_processing()
         
     def stop_game(self):
@@ -195,35 +211,70 @@ class ScoringGUI:
             return
             
         for cam_name, canvas in self.camera_canvases.items():
-            self.process_camera(cam_name, canvas)
+            # Preview komt kant-en-klaar uit de capture thread
+            self.camera_manager.subscribe(cam_name, 'preview')
+            worker = FrameWorker(
+                self.root, self.camera_manager, cam_name,
+                lambda lease, name=cam_name: self.process_camera(name, lease),
+                lambda result, name=cam_name, canvas=canvas: self.show_camera_result(name, canvas, result)
+            )
+            self.frame_workers[cam_name] = worker
+            worker.start()
             
-    def process_camera(self, camera_name: str, canvas: tk.Canvas):
-        """Verwerk camera feed en detecteer darts"""
+    def process_camera(self, camera_name: str, lease):
+        """Verwerk één nieuw frame en detecteer darts (in de worker thread van de camera)"""
+        frame = lease.frame
+        preview = lease.level('preview')
+        if preview is None:
+            return None
+
+        # Goedkope bewegingscheck; zonder beweging in het bord geen detectie
+        found_dart, dart_info = False, None
+        calibration = self.detector.camera_calibration(camera_name, frame.shape)
+        if self.scheduler.should_detect(camera_name, preview, calibration, frame.shape):
+            # Dart detectie op het canonieke bordbeeld (lenscorrectie + rectificatie in één remap)
+            board = self.rectify_frame(camera_name, frame)
+            if board is not None:
+                found_dart, dart_info = self.detector.detect_dart(board, camera_name, rectified=True)
+
+        # De process backend pint geen slots; een intussen overschreven
+        # frame kan twee beelden mengen en telt dus niet mee
+        if not lease.valid:
+            return None
+        if not (found_dart and self.scheduler.accept(camera_name, dart_info)):
+            dart_info = None
+        return Image.fromarray(cv2.cvtColor(preview, cv2.COLOR_BGR2RGB)), dart_info
+
+    def show_camera_result(self, camera_name: str, canvas: tk.Canvas, result):
+        """Toon de preview en geef een gedetecteerde dart aan de fusie (in de Tk mainloop)"""
         if not self.preview_active:
             return
-            
+
         try:
-            # Krijg frame van camera
-            frame = self.camera_manager.get_frame(camera_name)
-            if frame is not None:
-                # Dart detectie
-                found_dart, dart_info = self.detector.detect_dart(frame)
-                if found_dart:
-                    self.process_dart_hit(dart_info)
-                    
-                # Update preview
-                frame = cv2.resize(frame, (400, 300))
-                img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-                img_tk = ImageTk.PhotoImage(image=img)
-                canvas.create_image(0, 0, anchor=tk.NW, image=img_tk)
-                canvas.image = img_tk
-                
-            # Schedule volgende update
-            self.root.after(30, lambda: self.process_camera(camera_name, canvas))
-            
+            img, dart_info = result
+            if dart_info is not None:
+                self.fusion.add(camera_name, dart_info['board_position'],
+                                dart_info['confidence'], dart_info['board_scale'])
+
+            img_tk = ImageTk.PhotoImage(image=img)
+            canvas.create_image(0, 0, anchor=tk.NW, image=img_tk)
+            canvas.image = img_tk
+
+            throw = self.fusion.poll()
+            if throw is not None:
+                self.process_dart_hit(throw)
+
         except Exception as e:
             logger.error(f"Error bij camera processing: {str(e)}")
             
+    def rectify_frame(self, camera_name: str, frame):
+        """Canoniek bordbeeld met de lens kalibratie uit camera_config.json"""
+        config = self.camera_manager.config
+        camera_config = config['cameras'][camera_name]
+        return self.detector.rectify(frame, camera_name,
+                                     crop_lens(camera_config.get('calibration'), camera_config.get('roi')),
+                                     config['global_settings'].get('remap_cache_path'))
+            
     def process_dart_hit(self, dart_info: Dict):
         """Verwerk een gedetecteerde dart hit"""
         if self.throws_left > 0 and self.game_active:
@@ -340,6 +391,10 @@ class ScoringGUI:
     def stop_camera_processing(self):
         """Stop camera verwerking"""
         self.preview_active = False
+        for worker in self.frame_workers.values():
+            worker.stop()
+        self.frame_workers.clear()
         # Reset camera canvassen
-        for canvas in self.camera_canvases.values():
+        for cam_name, canvas in self.camera_canvases.items():
+            self.camera_manager.unsubscribe(cam_name, 'preview')
             canvas.delete("all")
\ No newline at end of file
@@ -7,6 +7,9 @@ from typing import Dict, Callable
 import os
 from PIL import Image, ImageTk
 
+from ..discovery import get_device_discovery
+from ..frame_worker import FrameWorker
+
 logger = logging.getLogger('dart_scorer.gui.setup')
 
 class CameraSetupGUI:
@@ -21,9 +24,9 @@ class CameraSetupGUI:
         
         # Camera variabelen
         self.camera_vars = {
-            'camera1': {'id': tk.StringVar(), 'active': False, 'preview': None},
-            'camera2': {'id': tk.StringVar(), 'active': False, 'preview': None},
-            'camera3': {'id': tk.StringVar(), 'active': False, 'preview': None}
+            'camera1': {'id': tk.StringVar(), 'active': False, 'preview': None, 'worker': None},
+            'camera2': {'id': tk.StringVar(), 'active': False, 'preview': None, 'worker': None},
+            'camera3': {'id': tk.StringVar(), 'active': False, 'preview': None, 'worker': None}
         }
         
         self.preview_active = False
@@ -134,13 +137,7 @@ class CameraSetupGUI:
         
     def get_available_cameras(self) -> list:
         """Detecteer beschikbare camera's"""
-        available_cameras = []
-        for i in range(10):  # Check eerste 10 indices
-            cap = cv2.VideoCapture(i)
-            if cap.isOpened():
-                available_cameras.append(str(i))
-                cap.release()
-        return available_cameras
+        return get_device_discovery().get_available_cameras()
         
     def test_camera(self, camera_name: str):
         """Test een specifieke camera"""
@@ -150,16 +147,18 @@ class CameraSetupGUI:
             return
             
         try:
-            cap = cv2.VideoCapture(int(camera_id))
-            if not cap.isOpened():
+            # Open (of hergebruik) de capture sessie van deze camera
+            camera = self.camera_manager.open_camera(camera_name, camera_id)
+            if camera is None:
                 raise Exception("Kon camera niet openen")
                 
-            ret, frame = cap.read()
-            if not ret:
+            lease = camera.wait_for_frame(0, timeout=2.0)
+            if lease is None:
                 raise Exception("Kon geen frame lezen")
                 
             # Toon test frame
-            cv2.imshow(f"{camera_name} Test", frame)
+            with lease:
+                cv2.imshow(f"{camera_name} Test", lease.frame)
             cv2.waitKey(1000)
             cv2.destroyWindow(f"{camera_name} Test")
             
@@ -169,8 +168,6 @@ class CameraSetupGUI:
             )
             self.camera_vars[camera_name]['active'] = True
             
-            cap.release()
-            
         except Exception as e:
             messagebox.showerror("Error", f"Error bij testen {camera_name}: {str(e)}")
             self.camera_vars[camera_name]['status_label'].config(
@@ -192,7 +189,12 @@ class CameraSetupGUI:
         
         for cam_name, cam_data in self.camera_vars.items():
             if cam_data['active']:
-                self.update_preview(cam_name)
+                self.camera_manager.subscribe(cam_name, 'preview')
+                cam_data['worker'] = FrameWorker(
+                    self.root, self.camera_manager, cam_name, self.preview_image,
+                    lambda img, name=cam_name: self.update_preview(name, img), level='preview'
+                )
+                cam_data['worker'].start()
                 
     def stop_previews(self):
         """Stop camera previews"""
@@ -200,51 +202,48 @@ class CameraSetupGUI:
         self.preview_button.config(text="Start Previews")
         
         # Reset preview canvassen
-        for cam_data in self.camera_vars.values():
+        for cam_name, cam_data in self.camera_vars.items():
+            if cam_data['worker'] is not None:
+                cam_data['worker'].stop()
+                cam_data['worker'] = None
+            if cam_data['active']:
+                self.camera_manager.unsubscribe(cam_name, 'preview')
             if 'canvas' in cam_data:
                 cam_data['canvas'].delete("all")
                 
-    def update_preview(self, camera_name: str):
+    @staticmethod
+    def preview_image(lease):
+        """PIL Image van een preview frame (in de worker thread)"""
+        frame = cv2.cvtColor(lease.frame, cv2.COLOR_BGR2RGB)
+        return Image.fromarray(frame) if lease.valid else None
+
+    def update_preview(self, camera_name: str, img):
         """Update preview voor een specifieke camera"""
         if not self.preview_active:
             return
             
-        camera_id = self.camera_vars[camera_name]['id'].get()
         try:
-            cap = cv2.VideoCapture(int(camera_id))
-            ret, frame = cap.read()
+            img_tk = ImageTk.PhotoImage(image=img)
             
-            if ret:
-                # Convert frame naar PIL Image
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                frame = cv2.resize(frame, (400, 300))
-                img = Image.fromarray(frame)
-                img_tk = ImageTk.PhotoImage(image=img)
-                
-                # Update canvas
-                canvas = self.camera_vars[camera_name]['canvas']
-                canvas.create_image(0, 0, anchor=tk.NW, image=img_tk)
-                canvas.image = img_tk  # Bewaar referentie
-                
-            cap.release()
-            
-            # Schedule volgende update
-            if self.preview_active:
-                self.root.after(30, lambda: self.update_preview(camera_name))
+            # Update canvas
+            canvas = self.camera_vars[camera_name]['canvas']
+            canvas.create_image(0, 0, anchor=tk.NW, image=img_tk)
+            canvas.image = img_tk  # Bewaar referentie
                 
         except Exception as e:
             logger.error(f"Error bij updaten preview voor {camera_name}: {str(e)}")
             
     def save_configuration(self):
         """Sla camera configuratie op"""
-        config = {}
-        for cam_name, cam_data in self.camera_vars.items():
-            if cam_data['active']:
-                config[cam_name] = cam_data['id'].get()
-                
         try:
-            with open('config/camera_config.json', 'w') as f:
-                json.dump(config, f, indent=4)
+            # De camera IDs staan al in de configuratie van de CameraManager
+            # (open_camera werkt die bij); sla de volledige config op
+            for cam_name, cam_data in self.camera_vars.items():
+                if cam_data['active']:
+                    # Device indices als int; paden naar opnames blijven strings
+                    self.camera_manager.config['cameras'][cam_name]['id'] = \
+                        self.camera_manager.parse_camera_id(cam_data['id'].get())
+            self.camera_manager.save_config()
             messagebox.showinfo("Success", "Camera configuratie opgeslagen")
         except Exception as e:
             messagebox.showerror("Error", f"Error bij opslaan configuratie: {str(e)}")
@@ -0,0 +1,431 @@
+import logging
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from .telemetry import CaptureTelemetry, LatencyHistogram, LATENCY_BUCKETS_MS
+
+logger = logging.getLogger('dart_scorer.process_capture')
+
+# Header velden (int64) vóór de slot tabellen
+HEADER_LATEST_SEQ = 0
+HEADER_STATUS = 1
+HEADER_FAILED_READS = 2
+HEADER_FIELDS = 4
+
+# Header velden (float64) met capture statistieken
+STATS_FPS = 0
+STATS_READ_LATENCY = 1
+STATS_LATENCY_TOTAL_MS = 2
+STATS_LATENCY_MAX_MS = 3
+STATS_FIELDS = 4
+
+# Read latency histogram (int64), zelfde buckets als CaptureTelemetry
+HISTOGRAM_FIELDS = len(LATENCY_BUCKETS_MS) + 1
+
+STATUS_STARTING = 0
+STATUS_READY = 1
+STATUS_FINISHED = 2
+STATUS_FAILED = -1
+
+
+class SharedFrameRing:
+    """Frame ringbuffer in shared memory met een lock-vrije sequence header
+
+    Layout: int64 header, int64 sequence per slot, float64 timestamp per
+    slot, float64 statistieken, int64 latency histogram en daarna de frame
+    slots. De schrijver zet
+    de sequence van een slot op -seq tijdens het schrijven en op seq als het
+    frame compleet is; een lezer controleert de sequence vóór en na gebruik
+    (seqlock), zodat er geen lock tussen processen nodig is.
+    """
+    def __init__(self, slots, shape, name=None, create=False):
+        self.slots = int(slots)
+        self.shape = tuple(shape)
+        frame_bytes = int(np.prod(self.shape))
+        meta_bytes = 8 * (HEADER_FIELDS + 2 * self.slots + STATS_FIELDS + HISTOGRAM_FIELDS)
+        # Frames uitlijnen op een cache line
+        self.frames_offset = (meta_bytes + 63) // 64 * 64
+        size = self.frames_offset + self.slots * frame_bytes
+
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.name = self.shm.name
+        self.owner = create
+
+        buf = self.shm.buf
+        offset = 0
+        self.header = np.ndarray((HEADER_FIELDS,), np.int64, buf, offset)
+        offset += 8 * HEADER_FIELDS
+        self.sequences = np.ndarray((self.slots,), np.int64, buf, offset)
+        offset += 8 * self.slots
+        self.timestamps = np.ndarray((self.slots,), np.float64, buf, offset)
+        offset += 8 * self.slots
+        self.stats = np.ndarray((STATS_FIELDS,), np.float64, buf, offset)
+        offset += 8 * STATS_FIELDS
+        self.latency_histogram = np.ndarray((HISTOGRAM_FIELDS,), np.int64, buf, offset)
+        self.frames = np.ndarray((self.slots,) + self.shape, np.uint8, buf, self.frames_offset)
+
+        if create:
+            self.header[:] = 0
+            self.sequences[:] = 0
+            self.stats[:] = 0
+            self.latency_histogram[:] = 0
+
+    @property
+    def latest_seq(self):
+        return int(self.header[HEADER_LATEST_SEQ])
+
+    def begin_write(self, seq):
+        """Markeer het slot voor seq als 'wordt geschreven' en geef het terug"""
+        slot = seq % self.slots
+        self.sequences[slot] = -seq
+        return self.frames[slot]
+
+    def end_write(self, seq, timestamp):
+        """Publiceer het frame voor seq"""
+        slot = seq % self.slots
+        self.timestamps[slot] = timestamp
+        self.sequences[slot] = seq
+        self.header[HEADER_LATEST_SEQ] = seq
+
+    def is_valid(self, seq):
+        """Check of het slot van seq nog ongewijzigd het frame seq bevat"""
+        return seq > 0 and self.sequences[seq % self.slots] == seq
+
+    def close(self):
+        """Ontkoppel de shared memory (en verwijder hem als we eigenaar zijn)"""
+        # Views moeten weg voordat de buffer gesloten kan worden
+        self.header = self.sequences = self.timestamps = self.stats = None
+        self.latency_histogram = self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _capture_worker(ring_name, slots, shape, camera_id, config, profile, start_event, stop_event):
+    """Capture loop die in een eigen proces draait en frames direct in de shared slots schrijft"""
+    # Import hier zodat het child proces dezelfde device instellingen gebruikt als Camera
+    from .camera import failure_backoff, open_source
+
+    ring = SharedFrameRing(slots, shape, name=ring_name)
+    try:
+        cap, _ = open_source(camera_id, config, profile)
+    except Exception as e:
+        logger.error(f"Error bij initialiseren camera {camera_id}: {str(e)}")
+        ring.header[HEADER_STATUS] = STATUS_FAILED
+        ring.close()
+        return
+    ring.header[HEADER_STATUS] = STATUS_READY
+
+    start_event.wait()
+    seq = 0
+    last_time = None
+    frame_interval = None
+    failures = 0
+    alpha = 0.1
+    bounds = np.asarray(LATENCY_BUCKETS_MS, dtype=np.float64)
+    try:
+        while not stop_event.is_set():
+            slot = ring.begin_write(seq + 1)
+            read_start = time.perf_counter()
+            ret, frame = cap.read(slot)
+            read_end = time.perf_counter()
+            latency_ms = (read_end - read_start) * 1000.0
+            ring.latency_histogram[np.searchsorted(bounds, latency_ms)] += 1
+            ring.stats[STATS_LATENCY_TOTAL_MS] += latency_ms
+            ring.stats[STATS_LATENCY_MAX_MS] = max(ring.stats[STATS_LATENCY_MAX_MS], latency_ms)
+            if not ret:
+                if getattr(cap, 'finished', False):
+                    # Einde van een opname: lezers niet laten wachten
+                    logger.info(f"Bron van camera {camera_id} is afgelopen")
+                    ring.header[HEADER_STATUS] = STATUS_FINISHED
+                    break
+                ring.header[HEADER_FAILED_READS] += 1
+                failures += 1
+                # Een losgekoppelde device faalt direct; niet een core vol laten draaien
+                stop_event.wait(failure_backoff(failures))
+                continue
+            failures = 0
+
+            if frame is not slot and not np.shares_memory(frame, slot):
+                # Slots hebben een vaste grootte; schaal afwijkende frames
+                cv2.resize(frame, (shape[1], shape[0]), dst=slot)
+
+            seq += 1
+            # Opnametijd van de bron (replay met index), anders de capture tijd
+            recorded = getattr(cap, 'recorded_timestamp', None)
+            ring.end_write(seq, time.time() if recorded is None else recorded)
+
+            latency = read_end - read_start
+            ring.stats[STATS_READ_LATENCY] = (1 - alpha) * ring.stats[STATS_READ_LATENCY] + alpha * latency
+            if last_time is not None:
+                # Middel het interval, niet 1/interval: korte intervallen domineren anders
+                interval = read_end - last_time
+                frame_interval = interval if frame_interval is None else \
+                    (1 - alpha) * frame_interval + alpha * interval
+                ring.stats[STATS_FPS] = 1.0 / max(frame_interval, 1e-6)
+            last_time = read_end
+    finally:
+        cap.release()
+        ring.close()
+
+
+class SharedFrameLease:
+    """Zero-copy read-only view op een shared memory slot
+
+    Het slot wordt niet vastgehouden; controleer `valid` na gebruik om te
+    zien of de schrijver er inmiddels overheen geschreven heeft.
+    """
+    def __init__(self, camera, seq, timestamp, frame, source):
+        self.camera = camera
+        self.ring = camera.ring
+        self.seq = seq
+        self.timestamp = timestamp
+        self.frame = frame
+        self._source = source
+
+    @property
+    def valid(self):
+        return self.ring is not None and self.ring.frames is not None and self.ring.is_valid(self.seq)
+
+    def level(self, name):
+        """Hetzelfde frame op een ander pyramid niveau, of None als het slot intussen overschreven is"""
+        frame = self.camera._level(self._source, name)
+        return frame if self.valid else None
+
+    def release(self):
+        self.frame = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class ProcessCamera:
+    """Camera die in een eigen proces draait en frames via shared memory publiceert
+
+    Biedt de lees-interface van Camera (wait_for_frame, acquire_frame,
+    get_latest_frame, get_frame_buffer, pyramid niveaus en telemetrie),
+    maar capture en decodering gebruiken een eigen interpreter en dus een
+    eigen GIL. Het proces leest zelf van de device: grab()/retrieve() voor
+    SynchronizedCapture zijn er niet. Leases houden het slot niet vast;
+    'full' frames zijn zero-copy en moeten na gebruik met `valid`
+    gecontroleerd worden, kleinere niveaus zijn gevalideerde kopieën.
+    """
+    POLL_INTERVAL = 0.0005
+
+    def __init__(self, camera_id, config, buffer_size=10, profile=None, start_timeout=10.0):
+        self.camera_id = camera_id
+        self.config = config
+        self.profile = profile or {}
+        self.start_timeout = start_timeout
+        resolution = config['resolution']
+        self.shape = (resolution['height'], resolution['width'], 3)
+        self.slots = max(2, int(buffer_size) + 1)
+        self.ring = None
+        self.process = None
+        self.is_running = False
+        self.fourcc = None
+        # Alleen de frame leeftijd wordt in dit proces gemeten
+        self.telemetry = CaptureTelemetry()
+
+        from .camera import FramePyramid, DEFAULT_PYRAMID
+        self.pyramid = FramePyramid(config.get('pyramid', DEFAULT_PYRAMID), 1)
+
+        context = mp.get_context('spawn')
+        self._context = context
+        self.start_event = context.Event()
+        self.stop_event = context.Event()
+
+    def initialize(self):
+        """Start het capture proces en wacht tot de camera geopend is"""
+        try:
+            self.ring = SharedFrameRing(self.slots, self.shape, create=True)
+            self.process = self._context.Process(
+                target=_capture_worker,
+                args=(self.ring.name, self.slots, self.shape, self.camera_id,
+                      self.config, self.profile, self.start_event, self.stop_event),
+                daemon=True
+            )
+            self.process.start()
+
+            deadline = time.monotonic() + self.start_timeout
+            while self.ring.header[HEADER_STATUS] == STATUS_STARTING:
+                if time.monotonic() > deadline or not self.process.is_alive():
+                    break
+                time.sleep(0.01)
+
+            if self.ring.header[HEADER_STATUS] != STATUS_READY:
+                raise Exception(f"Kon camera {self.camera_id} niet openen in capture proces")
+
+            logger.info(f"Camera {self.camera_id} geïnitialiseerd in proces {self.process.pid}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error bij initialiseren camera {self.camera_id}: {str(e)}")
+            self._shutdown()
+            return False
+
+    def start(self, threaded=True):
+        """Laat het capture proces beginnen met frames schrijven"""
+        if not self.is_running and self.process is not None:
+            self.is_running = True
+            self.start_event.set()
+            logger.info(f"Camera {self.camera_id} capture gestart (proces)")
+
+    def stop(self):
+        """Stop het capture proces en geef de shared memory vrij"""
+        self.is_running = False
+        self._shutdown()
+        logger.info(f"Camera {self.camera_id} capture gestopt (proces)")
+
+    def _shutdown(self):
+        self.stop_event.set()
+        self.start_event.set()
+        if self.process is not None:
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+    def set_roi(self, roi):
+        """Wijzig de ROI; het capture proces levert altijd het volledige beeld"""
+        self.config['roi'] = dict(roi)
+
+    def _apply_roi(self, frame):
+        """Geef een view van het frame met de geconfigureerde ROI"""
+        roi = self.config['roi']
+        if roi['width'] > 0 and roi['height'] > 0:
+            return frame[roi['y']:roi['y']+roi['height'],
+                         roi['x']:roi['x']+roi['width']]
+        return frame
+
+    @property
+    def device_index(self):
+        """Index van de live device die het capture proces open heeft, of None"""
+        if self.process is None or not str(self.camera_id).isdigit():
+            return None
+        return int(self.camera_id)
+
+    @property
+    def frame_seq(self):
+        """Volgnummer van het meest recente frame (0 als er nog geen is)"""
+        return self.ring.latest_seq if self.ring is not None else 0
+
+    def subscribe(self, level):
+        """Pyramid niveaus worden hier bij opvragen gemaakt; alleen valideren"""
+        self.pyramid.check_level(level)
+
+    def unsubscribe(self, level):
+        pass
+
+    def _level(self, frame, level):
+        """Verklein een frame naar een pyramid niveau (kopie, behalve voor 'full')"""
+        if level == 'full':
+            return frame
+        width, height = self.pyramid.level_size(level, frame.shape)
+        resized = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        resized.flags.writeable = False
+        return resized
+
+    def _lease(self, seq, level):
+        """Lease voor seq, of None als het slot (ook tijdens het verkleinen) overschreven is"""
+        slot = seq % self.slots
+        frame = self._apply_roi(self.ring.frames[slot]).view()
+        frame.flags.writeable = False
+        timestamp = float(self.ring.timestamps[slot])
+        if not self.ring.is_valid(seq):
+            return None
+        leveled = self._level(frame, level)
+        # De kopie van een kleiner niveau is alleen bruikbaar als de schrijver
+        # het slot tijdens cv2.resize niet aangeraakt heeft
+        if level != 'full' and not self.ring.is_valid(seq):
+            return None
+        self.telemetry.record_consumption(timestamp, seq)
+        return SharedFrameLease(self, seq, timestamp, leveled, frame)
+
+    def wait_for_frame(self, after_seq=0, timeout=None, level='full'):
+        """Wacht op een frame nieuwer dan after_seq, zie Camera.wait_for_frame
+
+        Tussen processen is er geen gedeelde Condition; de lock-vrije header
+        wordt met een korte interval gepolld. Alleen het 'full' niveau is
+        zero-copy; bij een overschreven slot wordt het nieuwste frame opnieuw
+        geprobeerd.
+        """
+        self.pyramid.check_level(level)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.ring is not None:
+            seq = self.ring.latest_seq
+            if seq > after_seq:
+                lease = self._lease(seq, level)
+                if lease is not None:
+                    return lease
+                continue
+            if self.ring.header[HEADER_STATUS] == STATUS_FINISHED:
+                # Bron afgelopen, er komen geen frames meer
+                self.is_running = False
+            if not self.is_running or (deadline is not None and time.monotonic() >= deadline):
+                return None
+            time.sleep(self.POLL_INTERVAL)
+        return None
+
+    def acquire_frame(self, seq, level='full'):
+        """Lease voor een specifiek volgnummer, of None als het frame al overschreven is"""
+        self.pyramid.check_level(level)
+        if self.ring is None or not self.ring.is_valid(seq):
+            return None
+        return self._lease(seq, level)
+
+    def get_frame_buffer(self):
+        """Kopieën van de frames in de ring van oud naar nieuw (overschreven frames vallen weg)"""
+        if self.ring is None:
+            return []
+        latest = self.ring.latest_seq
+        frames = []
+        for seq in range(max(1, latest - self.slots + 1), latest + 1):
+            frame = self._apply_roi(self.ring.frames[seq % self.slots]).copy()
+            if self.ring.is_valid(seq):
+                frames.append(frame)
+        return frames
+
+    def get_latest_frame(self, level='full'):
+        """Haal een kopie van het meest recente frame op"""
+        lease = self.wait_for_frame(0, timeout=0, level=level)
+        if lease is None:
+            return None
+        frame = lease.frame.copy()
+        return frame if lease.valid else None
+
+    def get_telemetry(self):
+        """Capture telemetrie, zie Camera.get_telemetry
+
+        fps, reads en de read latency komen uit de shared memory header van
+        het capture proces; de frame leeftijd wordt hier gemeten.
+        """
+        buffer = {'slots': self.slots}
+        if self.ring is not None:
+            # Het slot waarin geschreven wordt telt niet mee
+            filled = min(self.ring.latest_seq, self.slots - 1)
+            buffer.update(filled_slots=filled,
+                          unconsumed_slots=self.telemetry.unconsumed(self.ring.latest_seq, filled))
+        data = self.telemetry.snapshot(camera_id=self.camera_id, fourcc=self.fourcc, buffer=buffer)
+        if self.ring is not None:
+            histogram = LatencyHistogram()
+            histogram.counts[:] = self.ring.latency_histogram
+            histogram.total = float(self.ring.stats[STATS_LATENCY_TOTAL_MS])
+            histogram.max = float(self.ring.stats[STATS_LATENCY_MAX_MS])
+            data.update({
+                'fps': float(self.ring.stats[STATS_FPS]),
+                'frames': self.ring.latest_seq,
+                'failed_reads': int(self.ring.header[HEADER_FAILED_READS]),
+                'read_latency': histogram.to_dict()
+            })
+        return data
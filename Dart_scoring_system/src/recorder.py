@@ -0,0 +1,215 @@
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from threading import Thread, Condition
+
+import cv2
+
+logger = logging.getLogger('dart_scorer.recorder')
+
+# Bestandsextensie per FOURCC, standaard AVI
+CONTAINER_EXTENSIONS = {'mp4v': '.mp4', 'avc1': '.mp4', 'H264': '.mp4'}
+
+
+class DropOldestQueue:
+    """Begrensde queue die bij een volle buffer het oudste item weggooit
+
+    De producent blokkeert nooit, zodat een trage schijf alleen frames in
+    de opname kost en niet de capture vertraagt.
+    """
+    def __init__(self, maxsize):
+        self.items = deque(maxlen=maxsize)
+        self.condition = Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item):
+        with self.condition:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """Haal het oudste item op; None bij een timeout of als de queue gesloten en leeg is"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.items or self.closed, timeout)
+            if not self.items:
+                return None
+            return self.items.popleft()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def __len__(self):
+        return len(self.items)
+
+
+class CameraRecorder:
+    """Neemt de frames van één camera op in roterende videobestanden
+
+    Een feeder thread wacht op nieuwe frames van de camera, kopieert ze en
+    zet ze in een DropOldestQueue; een encoder thread schrijft ze weg met
+    cv2.VideoWriter. Naast elk videobestand komt een CSV index met per
+    frame het volgnummer en de capture tijdstempel.
+    """
+    def __init__(self, camera, cam_name, recording_config, queue_size=64):
+        self.camera = camera
+        self.cam_name = cam_name
+        self.output_path = recording_config.get('output_path', 'recordings/')
+        self.fourcc = recording_config.get('format', 'XVID')
+        self.max_duration = recording_config.get('max_duration_seconds', 3600)
+        quality = recording_config.get('quality', {})
+        self.size = (quality.get('width', 1280), quality.get('height', 720))
+        self.fps = quality.get('fps', 30)
+
+        self.queue = DropOldestQueue(queue_size)
+        self.is_running = False
+        self.feeder_thread = None
+        self.encoder_thread = None
+
+        self.writer = None
+        self.index_file = None
+        self.file_start = None
+        self.file_frames = 0
+        self.files = []
+        self.frames_written = 0
+
+    def start(self):
+        """Start de feeder en encoder threads"""
+        if self.is_running:
+            return
+        os.makedirs(self.output_path, exist_ok=True)
+        self.is_running = True
+        self.feeder_thread = Thread(target=self._feed_loop, daemon=True)
+        self.encoder_thread = Thread(target=self._encode_loop, daemon=True)
+        self.encoder_thread.start()
+        self.feeder_thread.start()
+        logger.info(f"Opname van {self.cam_name} gestart")
+
+    def stop(self):
+        """Stop de opname; frames die al in de queue staan worden nog weggeschreven"""
+        if not self.is_running:
+            return
+        self.is_running = False
+        self.feeder_thread.join()
+        self.queue.close()
+        self.encoder_thread.join()
+        logger.info(f"Opname van {self.cam_name} gestopt "
+                    f"({self.frames_written} frames, {self.queue.dropped} gedropt)")
+
+    def _feed_loop(self):
+        """Kopieer elk nieuw frame naar de queue zonder op de encoder te wachten"""
+        seq = self.camera.frame_seq
+        while self.is_running:
+            lease = self._next_lease(seq)
+            if lease is None:
+                if not self.camera.is_running:
+                    # Camera gestopt: niet blijven pollen
+                    time.sleep(0.1)
+                continue
+            with lease:
+                frame = lease.frame.copy()
+                seq, timestamp = lease.seq, lease.timestamp
+                # Shared memory frames kunnen tijdens het kopiëren overschreven zijn
+                if not getattr(lease, 'valid', True):
+                    continue
+            self.queue.put((seq, timestamp, frame))
+
+    def _next_lease(self, seq):
+        """Het frame direct na seq als het nog in de ringbuffer staat, anders het nieuwste"""
+        if hasattr(self.camera, 'acquire_frame') and self.camera.frame_seq > seq + 1:
+            lease = self.camera.acquire_frame(seq + 1)
+            if lease is not None:
+                return lease
+        return self.camera.wait_for_frame(seq, timeout=0.5)
+
+    def _encode_loop(self):
+        """Schrijf frames uit de queue weg en roteer bestanden op max_duration_seconds"""
+        try:
+            while True:
+                item = self.queue.get(timeout=0.5)
+                if item is None:
+                    if self.queue.closed:
+                        break
+                    continue
+                seq, timestamp, frame = item
+                try:
+                    self._write(seq, timestamp, frame)
+                except Exception as e:
+                    logger.error(f"Error bij opnemen frame van {self.cam_name}: {str(e)}")
+        finally:
+            self._close_file()
+
+    def _write(self, seq, timestamp, frame):
+        if self.writer is None or timestamp - self.file_start >= self.max_duration:
+            self._open_file(timestamp)
+
+        if (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        self.writer.write(frame)
+        self.index_file.write(f"{self.file_frames},{seq},{timestamp:.6f}\n")
+        self.file_frames += 1
+        self.frames_written += 1
+
+    def _open_file(self, timestamp):
+        """Sluit het huidige bestand en begin een nieuw bestand met index"""
+        self._close_file()
+        stamp = datetime.fromtimestamp(timestamp).strftime('%Y%m%d_%H%M%S_%f')
+        extension = CONTAINER_EXTENSIONS.get(self.fourcc, '.avi')
+        path = os.path.join(self.output_path, f"{self.cam_name}_{stamp}{extension}")
+
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.fourcc),
+                                      self.fps, self.size)
+        if not self.writer.isOpened():
+            self.writer = None
+            raise Exception(f"Kon opnamebestand niet openen: {path}")
+        self.index_file = open(os.path.splitext(path)[0] + '.csv', 'w')
+        self.index_file.write("frame,seq,timestamp\n")
+        self.file_start = timestamp
+        self.file_frames = 0
+        self.files.append(path)
+        logger.info(f"Opname van {self.cam_name} naar {path}")
+
+    def _close_file(self):
+        if self.writer is not None:
+            self.writer.release()
+            self.writer = None
+        if self.index_file is not None:
+            self.index_file.close()
+            self.index_file = None
+
+    def get_stats(self):
+        """Aantal geschreven en gedropte frames en de huidige queue lengte"""
+        return {
+            'frames_written': self.frames_written,
+            'frames_dropped': self.queue.dropped,
+            'queue_length': len(self.queue),
+            'files': list(self.files)
+        }
+
+
+class Recorder:
+    """Neemt alle camera's van een CameraManager op volgens het 'recording' config blok"""
+    def __init__(self, cameras, recording_config, queue_size=64):
+        self.recorders = {}
+        for cam_name, camera in cameras.items():
+            # Gedeelde sessies maar één keer opnemen
+            if any(r.camera is camera for r in self.recorders.values()):
+                continue
+            self.recorders[cam_name] = CameraRecorder(camera, cam_name, recording_config, queue_size)
+
+    def start(self):
+        for recorder in self.recorders.values():
+            recorder.start()
+
+    def stop(self):
+        for recorder in self.recorders.values():
+            recorder.stop()
+
+    def get_stats(self):
+        return {name: recorder.get_stats() for name, recorder in self.recorders.items()}
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .board_plane import CANONICAL_CENTER, CANONICAL_RADIUS, CANONICAL_SIZE, BoardPlane
+
+logger = logging.getLogger('dart_scorer.rectify')
+
+# Verhoog bij een wijziging in de opbouw van de maps, zodat oude cache bestanden vervallen
+MAP_VERSION = 2
+
+
+def lens_parameters(lens: Optional[Dict]) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """(camera matrix, distortie) uit de 'calibration' van camera_config.json, of (None, None)"""
+    if not lens or lens.get('matrix') is None:
+        return None, None
+    matrix = np.asarray(lens['matrix'], dtype=np.float64).reshape(3, 3)
+    distortion = lens.get('distortion')
+    distortion = None if distortion is None else np.asarray(distortion, dtype=np.float64).ravel()
+    return matrix, distortion
+
+
+def crop_lens(lens: Optional[Dict], roi: Optional[Dict]) -> Optional[Dict]:
+    """Lens kalibratie (in sensor pixels) voor frames die uitgesneden zijn op roi"""
+    if not lens or lens.get('matrix') is None or not roi or (not roi.get('x') and not roi.get('y')):
+        return lens
+    matrix = np.asarray(lens['matrix'], dtype=np.float64).reshape(3, 3).copy()
+    # Alleen het optische centrum verschuift mee met de uitsnede
+    matrix[0, 2] -= roi['x']
+    matrix[1, 2] -= roi['y']
+    return dict(lens, matrix=matrix.tolist())
+
+
+def calibration_hash(frame_size: Tuple[int, int], homography: np.ndarray, matrix: Optional[np.ndarray],
+                     distortion: Optional[np.ndarray], size: int) -> str:
+    """Sleutel voor de cache: alles waar de maps van afhangen"""
+    key = {
+        'version': MAP_VERSION,
+        'frame_size': [int(v) for v in frame_size],
+        'homography': np.round(homography, 9).tolist(),
+        'matrix': None if matrix is None else np.round(matrix, 9).tolist(),
+        'distortion': None if distortion is None else np.round(distortion, 9).tolist(),
+        'size': int(size)
+    }
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def undistort_homography(homography: np.ndarray, matrix: np.ndarray,
+                         distortion: Optional[np.ndarray]) -> np.ndarray:
+    """Homografie van onvervormde frame pixels naar het bordvlak
+
+    De kalibratie (centrum en rand van de dubbele ring) is op het ruwe,
+    vervormde frame gemeten. Die punten gaan door cv2.undistortPoints en de
+    homografie wordt er opnieuw op gefit, zodat build_maps het lensmodel
+    niet op al vervormde coördinaten toepast.
+    """
+    angles = np.radians(np.arange(0, 360, 10, dtype=np.float64))
+    board = np.vstack((
+        [CANONICAL_CENTER],
+        np.column_stack((CANONICAL_CENTER[0] + CANONICAL_RADIUS * np.cos(angles),
+                         CANONICAL_CENTER[1] + CANONICAL_RADIUS * np.sin(angles)))
+    ))
+    raw = BoardPlane(homography).to_image(board)
+    undistorted = cv2.undistortPoints(raw.reshape(-1, 1, 2), matrix,
+                                      distortion if distortion is not None else np.zeros(5), P=matrix)
+    fitted, _ = cv2.findHomography(undistorted.reshape(-1, 2), board, 0)
+    return fitted
+
+
+def build_maps(homography: np.ndarray, matrix: Optional[np.ndarray] = None,
+               distortion: Optional[np.ndarray] = None,
+               size: int = CANONICAL_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """Remap maps van het ruwe frame naar het canonieke bord, in fixed-point formaat
+
+    Voor elke canonieke pixel: terug door de homografie naar het
+    onvervormde frame, daarna door het lensmodel naar de ruwe pixel. De
+    homografie hoort dus bij onvervormde frame coördinaten als er een
+    camera matrix is.
+    """
+    us, vs = np.meshgrid(np.arange(size, dtype=np.float64), np.arange(size, dtype=np.float64))
+    grid = np.stack((us.ravel(), vs.ravel()), axis=1)
+    points = BoardPlane(homography).to_image(grid)
+
+    if matrix is not None:
+        # Onvervormde pixels -> genormaliseerde stralen -> vervormde pixels
+        normalized = np.linalg.solve(matrix, np.column_stack((points, np.ones(len(points)))).T).T
+        projected, _ = cv2.projectPoints(normalized.reshape(-1, 1, 3), np.zeros(3), np.zeros(3),
+                                         matrix, distortion if distortion is not None else np.zeros(5))
+        points = projected.reshape(-1, 2)
+
+    map_x = points[:, 0].reshape(size, size).astype(np.float32)
+    map_y = points[:, 1].reshape(size, size).astype(np.float32)
+    return cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+
+
+class BoardRectifier:
+    """Eén cv2.remap van een camera frame naar het canonieke bordbeeld"""
+    def __init__(self, map1: np.ndarray, map2: np.ndarray, key: str = ''):
+        self.map1 = map1
+        self.map2 = map2
+        self.key = key
+        self.size = map1.shape[1], map1.shape[0]
+
+    def rectify(self, frame: np.ndarray, dst: Optional[np.ndarray] = None) -> np.ndarray:
+        """Canoniek bordbeeld; met dst wordt een bestaande buffer gevuld"""
+        return cv2.remap(frame, self.map1, self.map2, cv2.INTER_LINEAR, dst=dst,
+                         borderMode=cv2.BORDER_CONSTANT)
+
+
+def load_rectifier(frame_size: Tuple[int, int], homography: np.ndarray, lens: Optional[Dict] = None,
+                   cache_path: Optional[str] = None, size: int = CANONICAL_SIZE) -> BoardRectifier:
+    """BoardRectifier uit de cache op schijf, of opnieuw berekend en daar opgeslagen"""
+    matrix, distortion = lens_parameters(lens)
+    key = calibration_hash(frame_size, homography, matrix, distortion, size)
+    if matrix is not None:
+        homography = undistort_homography(homography, matrix, distortion)
+    path = os.path.join(cache_path, f"remap_{key}.npz") if cache_path else None
+
+    if path and os.path.exists(path):
+        try:
+            with np.load(path) as data:
+                logger.debug(f"Remap maps geladen uit {path}")
+                return BoardRectifier(data['map1'], data['map2'], key)
+        except Exception as e:
+            logger.error(f"Error bij laden remap cache {path}: {str(e)}")
+
+    map1, map2 = build_maps(homography, matrix, distortion, size)
+    if path:
+        try:
+            os.makedirs(cache_path, exist_ok=True)
+            np.savez(path, map1=map1, map2=map2)
+            logger.info(f"Remap maps opgeslagen in {path}")
+        except Exception as e:
+            logger.error(f"Error bij opslaan remap cache {path}: {str(e)}")
+    return BoardRectifier(map1, map2, key)
@@ -0,0 +1,81 @@
+import logging
+import math
+from typing import Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .geometry import SEGMENT_ANGLE, STANDARD_SEGMENT_START
+
+logger = logging.getLogger('dart_scorer.rotation')
+
+# Zwart en wit wisselen elke 18 graden: 10 perioden per omwenteling
+SEGMENT_CYCLES = 10
+CYCLE_ANGLE = 360.0 / SEGMENT_CYCLES
+
+# Banden (als fractie van de radius) met alleen zwarte en witte single vakken
+SINGLE_BANDS = ((0.2, 0.5), (0.65, 0.9))
+
+ANGLE_STEPS = 360
+
+
+def single_bands(regions: Dict) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+    """Single banden uit scoring_regions, met wat marge van de draden en gekleurde ringen"""
+    return ((regions['bullseye']['outer_radius_factor'] + 0.05, regions['triples']['inner_radius_factor'] - 0.03),
+            (regions['triples']['outer_radius_factor'] + 0.03, regions['doubles']['inner_radius_factor'] - 0.03))
+
+
+def angular_profile(frame: np.ndarray, center: Tuple[float, float], radius: float,
+                    bands: Sequence[Tuple[float, float]] = SINGLE_BANDS,
+                    angle_steps: int = ANGLE_STEPS) -> np.ndarray:
+    """Gemiddelde grijswaarde per hoek (0..360 graden, beeldcoördinaten) over de single banden"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    radial_steps = max(16, int(round(radius)))
+    # Rijen zijn hoeken, kolommen lopen van het centrum tot de radius
+    polar = cv2.warpPolar(gray, (radial_steps, angle_steps), (float(center[0]), float(center[1])),
+                          float(radius), cv2.WARP_POLAR_LINEAR + cv2.INTER_LINEAR)
+    columns = np.concatenate([np.arange(int(inner * radial_steps), int(outer * radial_steps))
+                              for inner, outer in bands])
+    return polar[:, columns].astype(np.float32).mean(axis=1)
+
+
+def profile_phase(profile: np.ndarray) -> Tuple[float, float]:
+    """Rotatie (modulo 36 graden) en sterkte van de 10-voudige component van een hoekprofiel
+
+    De rotatie is hoe ver het bord uit de standaard stand (20 boven, een
+    zwart segment) gedraaid is, zoals de kalibratie overlays en
+    BoardGeometry hem gebruiken. De sterkte is het aandeel van die component in
+    de variatie van het profiel: ~0.8 voor een schoon bord, laag als er
+    geen segmenten te zien zijn.
+    """
+    spectrum = np.fft.rfft(profile - profile.mean())
+    power = np.abs(spectrum[1:]) ** 2
+    total = float(power.sum())
+    strength = float(power[SEGMENT_CYCLES - 1] / total) if total > 0 else 0.0
+
+    # profiel ~ cos(10 * theta + fase): helderste punt op -fase / 10
+    light = math.degrees(-np.angle(spectrum[SEGMENT_CYCLES]) / SEGMENT_CYCLES)
+    # Een donker segment begint een half segment na het helderste punt; in de
+    # standaard stand begint het zwarte segment 20 op STANDARD_SEGMENT_START
+    rotation = (light + SEGMENT_ANGLE / 2 - STANDARD_SEGMENT_START) % CYCLE_ANGLE
+    return rotation, strength
+
+
+def estimate_rotation(frame: np.ndarray, center: Tuple[float, float], radius: float,
+                      prior: float = 0.0, min_strength: float = 0.2,
+                      bands: Sequence[Tuple[float, float]] = SINGLE_BANDS) -> Optional[float]:
+    """Schat de segment rotatie van een gedetecteerd bord; None als de segmenten niet zichtbaar zijn
+
+    Het profiel bepaalt de rotatie alleen modulo 36 graden (welke zwarte
+    segment de 20 is valt niet te zien); van de kandidaten wordt die het
+    dichtst bij `prior` (de huidige, handmatige rotatie) gekozen.
+    """
+    rotation, strength = profile_phase(angular_profile(frame, center, radius, bands))
+    if strength < min_strength:
+        logger.info(f"Geen duidelijke segmenten gevonden (sterkte {strength:.2f})")
+        return None
+
+    steps = round(((prior - rotation + 180.0) % 360.0 - 180.0) / CYCLE_ANGLE)
+    estimate = (rotation + steps * CYCLE_ANGLE) % 360.0
+    logger.info(f"Rotatie geschat op {estimate:.1f} graden (sterkte {strength:.2f})")
+    return estimate
@@ -0,0 +1,135 @@
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger('dart_scorer.scheduler')
+
+# Grootte van het beeld waarop beweging gemeten wordt
+MOTION_SIZE = (64, 48)
+
+
+class CameraMotion:
+    """Bewegingsbuffers en planning van één camera"""
+    def __init__(self):
+        width, height = MOTION_SIZE
+        self.small_bgr = np.empty((height, width, 3), np.uint8)
+        self.small = np.empty((height, width), np.uint8)
+        self.previous = np.empty((height, width), np.uint8)
+        self.diff = np.empty((height, width), np.uint8)
+        self.mask: Optional[np.ndarray] = None
+        self.board: Optional[Tuple[float, float, float, float]] = None
+        self.primed = False
+        self.active_until = 0.0
+        self.last_detection = float('-inf')
+        self.stats = {'checked': 0, 'motion': 0, 'detected': 0, 'rejected': 0}
+
+
+class DetectionScheduler:
+    """Start de dart detectie alleen als er in het bord iets beweegt
+
+    Elk frame kost alleen een verschil van een 64x48 grijsbeeld binnen de
+    bord ROI. Zodra genoeg pixels veranderen wordt de camera `hold`
+    seconden actief (lang genoeg voor de dart detectie om de worp te zien
+    settelen) en mag de detectie draaien, maximaal eens per
+    detection_interval_ms. Detecties onder min_detection_confidence worden
+    afgewezen; confidence is (lengte/breedte - 1) / 4, dus 0.25 laat alles
+    door wat minstens twee keer zo lang als breed is. Een verkort in beeld
+    staande dart met flight komt vaak niet verder dan een verhouding van 3.
+    """
+    def __init__(self, settings: Optional[Dict] = None):
+        settings = settings or {}
+        self.interval = float(settings.get('detection_interval_ms', 33)) / 1000.0
+        self.min_confidence = float(settings.get('min_detection_confidence', 0.0))
+        self.hold = float(settings.get('motion_hold_ms', 1000)) / 1000.0
+        self.pixel_threshold = int(settings.get('motion_pixel_threshold', 20))
+        self.min_pixels = int(settings.get('motion_min_pixels', 2))
+        self.cameras: Dict[str, CameraMotion] = {}
+
+    def _camera(self, camera_name: str) -> CameraMotion:
+        camera = self.cameras.get(camera_name)
+        if camera is None:
+            camera = self.cameras[camera_name] = CameraMotion()
+        return camera
+
+    def _mask(self, camera: CameraMotion, frame_shape: Tuple[int, ...],
+              board: Optional[Tuple[Tuple[float, float], float]]) -> Optional[np.ndarray]:
+        """ROI masker op het bewegingsbeeld; None betekent het hele beeld"""
+        if board is None:
+            return None
+        scale_x = MOTION_SIZE[0] / frame_shape[1]
+        scale_y = MOTION_SIZE[1] / frame_shape[0]
+        key = (board[0][0] * scale_x, board[0][1] * scale_y, board[1] * scale_x, board[1] * scale_y)
+        if camera.board != key:
+            camera.board = key
+            camera.mask = np.zeros(camera.small.shape, np.uint8)
+            # Het bewegingsbeeld heeft niet dezelfde verhoudingen: een ellips
+            cv2.ellipse(camera.mask, (int(round(key[0])), int(round(key[1]))),
+                        (int(np.ceil(key[2])) + 1, int(np.ceil(key[3])) + 1), 0, 0, 360, 255, -1)
+        return camera.mask
+
+    def motion_score(self, camera_name: str, frame: np.ndarray,
+                     board: Optional[Tuple[Tuple[float, float], float]] = None,
+                     board_shape: Optional[Tuple[int, ...]] = None) -> int:
+        """Aantal veranderde pixels in de bord ROI sinds het vorige frame (-1 voor het eerste frame)
+
+        board is (center, radius) in de coördinaten van een frame met vorm
+        board_shape (standaard die van frame).
+        """
+        camera = self._camera(camera_name)
+        # Bilineair: INTER_AREA is bij deze niet-gehele verkleining tientallen keren trager
+        if frame.ndim == 3:
+            cv2.resize(frame, MOTION_SIZE, dst=camera.small_bgr, interpolation=cv2.INTER_LINEAR)
+            cv2.cvtColor(camera.small_bgr, cv2.COLOR_BGR2GRAY, dst=camera.small)
+        else:
+            cv2.resize(frame, MOTION_SIZE, dst=camera.small, interpolation=cv2.INTER_LINEAR)
+
+        if not camera.primed:
+            camera.primed = True
+            camera.small, camera.previous = camera.previous, camera.small
+            return -1
+
+        cv2.absdiff(camera.small, camera.previous, dst=camera.diff)
+        cv2.threshold(camera.diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=camera.diff)
+        mask = self._mask(camera, board_shape or frame.shape, board)
+        if mask is not None:
+            cv2.bitwise_and(camera.diff, mask, dst=camera.diff)
+        camera.small, camera.previous = camera.previous, camera.small
+        return cv2.countNonZero(camera.diff)
+
+    def should_detect(self, camera_name: str, frame: np.ndarray,
+                      board: Optional[Tuple[Tuple[float, float], float]] = None,
+                      board_shape: Optional[Tuple[int, ...]] = None,
+                      now: Optional[float] = None) -> bool:
+        """Check een klein frame (bv. het 'preview' niveau) en beslis of de detectie moet draaien"""
+        now = time.monotonic() if now is None else now
+        camera = self._camera(camera_name)
+        camera.stats['checked'] += 1
+
+        score = self.motion_score(camera_name, frame, board, board_shape)
+        if score >= self.min_pixels:
+            camera.stats['motion'] += 1
+            camera.active_until = now + self.hold
+
+        # Het eerste frame gaat altijd door: de detectie heeft een referentie nodig
+        if score >= 0 and (now >= camera.active_until or now - camera.last_detection < self.interval):
+            return False
+        camera.last_detection = now
+        camera.stats['detected'] += 1
+        return True
+
+    def accept(self, camera_name: str, dart_info: Dict) -> bool:
+        """Alleen detecties met voldoende confidence doorlaten"""
+        if dart_info.get('confidence', 1.0) >= self.min_confidence:
+            return True
+        self._camera(camera_name).stats['rejected'] += 1
+        logger.debug(f"Dart van {camera_name} afgewezen: confidence {dart_info['confidence']:.2f}")
+        return False
+
+    def reset(self) -> None:
+        self.cameras.clear()
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: dict(camera.stats) for name, camera in self.cameras.items()}
@@ -0,0 +1,148 @@
+import logging
+import math
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Tuple
+
+import numpy as np
+
+from .geometry import BoardGeometry, RING_SINGLE, RING_DOUBLE, RING_TRIPLE, RING_OUTER_BULL, RING_BULL
+
+logger = logging.getLogger('dart_scorer.scoremap')
+
+# Labels: 0 is mis, 1..60 zijn (segment, single/double/triple), dan de bulls
+LABEL_OUTER_BULL = 61
+LABEL_BULL = 62
+LABEL_COUNT = 63
+
+
+def segment_label(segment_index: int, ring: int) -> int:
+    """Label voor een segment met ring single, double of triple"""
+    return 1 + segment_index * 3 + (ring - RING_SINGLE)
+
+
+class ScoreMap:
+    """Label afbeelding met (segment, ring) voor elke pixel rond het bord
+
+    Wordt één keer per kalibratie gebouwd; het scoren van een punt (of een
+    array van punten) is daarna één array index plus een lookup tabel. De
+    afbeelding beslaat alleen het vierkant rond de dubbele ring, in
+    camera coördinaten vanaf `origin`. Pixels waarvan een buur een ander
+    label heeft liggen op een ring- of segmentgrens; punten die daarop
+    afronden worden exact met de geometrie geclassificeerd, zodat een
+    sub-pixel positie hetzelfde scoort als met BoardGeometry.score_points.
+    """
+    def __init__(self, center: Tuple[float, float], radius: float, geometry: BoardGeometry,
+                 rotation: float = 0.0):
+        self.center = (float(center[0]), float(center[1]))
+        self.radius = float(radius)
+        self.geometry = geometry
+        self.rotation = float(rotation)
+        self.segment_values = list(geometry.segment_values)
+
+        half = int(math.ceil(self.radius * geometry.regions['doubles'][1])) + 1
+        self.origin = (int(round(self.center[0])) - half, int(round(self.center[1])) - half)
+        self._build_tables()
+        self.labels = self._build_labels(2 * half + 1)
+        self.boundary = self._build_boundary(self.labels)
+
+    def _build_labels(self, size: int) -> np.ndarray:
+        xs = np.arange(size, dtype=np.float64) + (self.origin[0] - self.center[0])
+        ys = np.arange(size, dtype=np.float64) + (self.origin[1] - self.center[1])
+        dx, dy = np.meshgrid(xs, ys)
+        rings, segments = self.geometry.classify(dx, dy, self.radius, self.rotation)
+        return self.label_table[rings, segments]
+
+    @staticmethod
+    def _build_boundary(labels: np.ndarray) -> np.ndarray:
+        """Pixels met een ander label in hun 8-buurt; buiten de kaart is mis"""
+        padded = np.pad(labels, 1)
+        size = labels.shape[0]
+        boundary = np.zeros(labels.shape, dtype=bool)
+        for dy in range(3):
+            for dx in range(3):
+                boundary |= padded[dy:dy + size, dx:dx + size] != labels
+        boundary.flags.writeable = False
+        return boundary
+
+    def _build_tables(self) -> None:
+        """Lookup tabellen van label naar segment, ring, waarde en score, en van (ring, segment) naar label"""
+        self.segment_table = np.full(LABEL_COUNT, -1, dtype=np.int16)
+        self.ring_table = np.zeros(LABEL_COUNT, dtype=np.uint8)
+        self.value_table = np.zeros(LABEL_COUNT, dtype=np.int16)
+        self.multiplier_table = np.zeros(LABEL_COUNT, dtype=np.int16)
+        self.label_table = np.zeros((6, 20), dtype=np.uint8)
+        for index, value in enumerate(self.segment_values):
+            for ring, multiplier in ((RING_SINGLE, 1), (RING_DOUBLE, 2), (RING_TRIPLE, 3)):
+                label = segment_label(index, ring)
+                self.label_table[ring, index] = label
+                self.segment_table[label] = index
+                self.ring_table[label] = ring
+                self.value_table[label] = value
+                self.multiplier_table[label] = multiplier
+        for label, ring, value in ((LABEL_OUTER_BULL, RING_OUTER_BULL, 25), (LABEL_BULL, RING_BULL, 50)):
+            self.label_table[ring] = label
+            self.ring_table[label] = ring
+            self.value_table[label] = value
+            self.multiplier_table[label] = 1
+        self.score_table = self.value_table * self.multiplier_table
+
+    def labels_at(self, points) -> np.ndarray:
+        """Labels voor een (N, 2) array van (x, y) punten; punten buiten de kaart zijn mis"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        cols = np.rint(points[:, 0]).astype(np.intp) - self.origin[0]
+        rows = np.rint(points[:, 1]).astype(np.intp) - self.origin[1]
+        size = self.labels.shape[0]
+        inside = (cols >= 0) & (cols < size) & (rows >= 0) & (rows < size)
+        labels = np.zeros(len(points), dtype=np.uint8)
+        labels[inside] = self.labels[rows[inside], cols[inside]]
+
+        # Op een grens kan afronden het label veranderen: daar exact classificeren
+        exact = np.zeros(len(points), dtype=bool)
+        exact[inside] = self.boundary[rows[inside], cols[inside]]
+        if exact.any():
+            rings, segments = self.geometry.classify(points[exact, 0] - self.center[0],
+                                                     points[exact, 1] - self.center[1],
+                                                     self.radius, self.rotation)
+            labels[exact] = self.label_table[rings, segments]
+        return labels
+
+    def scores(self, points) -> np.ndarray:
+        """Scores voor een (N, 2) array van punten"""
+        return self.score_table[self.labels_at(points)]
+
+    def lookup(self, point: Tuple[float, float]) -> Dict:
+        """Segment, ring en score voor één punt"""
+        label = int(self.labels_at([point])[0])
+        return {
+            'label': label,
+            'segment_index': int(self.segment_table[label]),
+            'ring': int(self.ring_table[label]),
+            'segment_value': int(self.value_table[label]),
+            'multiplier': int(self.multiplier_table[label]),
+            'score': int(self.score_table[label])
+        }
+
+
+_cache: "OrderedDict[Tuple, ScoreMap]" = OrderedDict()
+_cache_lock = Lock()
+CACHE_SIZE = 16
+
+
+def get_score_map(center: Tuple[float, float], radius: float, geometry: BoardGeometry,
+                  rotation: float = 0.0) -> ScoreMap:
+    """Gedeelde ScoreMap, alleen opnieuw gebouwd als kalibratie of geometrie veranderen"""
+    key = (float(center[0]), float(center[1]), float(radius), float(rotation), geometry.key)
+    with _cache_lock:
+        score_map = _cache.get(key)
+        if score_map is not None:
+            _cache.move_to_end(key)
+            return score_map
+
+    score_map = ScoreMap(center, radius, geometry, rotation)
+    logger.debug(f"ScoreMap gebouwd voor center={center}, radius={radius}")
+    with _cache_lock:
+        _cache[key] = score_map
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return score_map
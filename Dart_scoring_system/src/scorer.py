@@ -1,9 +1,11 @@
-import math
 import json
 import logging
 from typing import Tuple, Dict, Optional
 import numpy as np
 
+from .geometry import BoardGeometry
+from .scoremap import ScoreMap, get_score_map
+
 logger = logging.getLogger('dart_scorer.scorer')
 
 class ScoreCalculator:
@@ -21,99 +23,60 @@ class ScoreCalculator:
         try:
             with open(self.config_path, 'r') as f:
                 self.config = json.load(f)
+            self.geometry = BoardGeometry.from_config(self.config)
             logger.info("Scoring configuratie geladen")
         except Exception as e:
             logger.error(f"Error bij laden scoring config: {str(e)}")
             raise
-            
-    def calculate_score(self, hit_position: Tuple[int, int], 
+
+    def calculate_score(self, hit_position: Tuple[float, float], 
                        board_center: Tuple[int, int],
-                       board_radius: int) -> Dict:
-        """Bereken score voor een dart hit"""
+                       board_radius: int,
+                       rotation: float = 0.0) -> Dict:
+        """Bereken score voor een dart hit (rotation: hoe ver het bord uit de standaard stand gedraaid is)"""
         try:
-            # Bereken afstand en hoek vanaf centrum
-            dx = hit_position[0] - board_center[0]
-            dy = hit_position[1] - board_center[1]
-            distance = math.sqrt(dx*dx + dy*dy)
-            angle = math.degrees(math.atan2(dy, dx))
-            
-            # Normaliseer hoek naar 0-360
-            if angle < 0:
-                angle += 360
-                
-            # Bepaal multiplicator (single, double, triple)
-            multiplier = self._get_multiplier(distance, board_radius)
-            
-            # Bepaal segment waarde
-            segment_value = self._get_segment_value(angle)
-            
-            # Check voor bullseye
-            if self._is_bullseye(distance, board_radius):
-                score = 50 if self._is_double_bull(distance, board_radius) else 25
-                multiplier = 1
-                segment_value = score
-            else:
-                score = segment_value * multiplier
+            # Segment en ring komen uit de (gecachete) label afbeelding; op een
+            # grens classificeert de ScoreMap de sub-pixel positie exact
+            hit = self._score_map(board_center, board_radius, rotation).lookup(hit_position)
                 
             result = {
-                'score': score,
-                'multiplier': multiplier,
-                'segment_value': segment_value,
-                'angle': angle,
-                'distance_factor': distance / board_radius
+                'score': hit['score'],
+                'multiplier': hit['multiplier'],
+                'segment_value': hit['segment_value']
             }
             
             # Update throws history voor huidige speler
             self.players[self.current_player]['throws'].append(result)
-            self._update_player_score(self.current_player, score)
+            self._update_player_score(self.current_player, hit['score'])
             
             return result
             
         except Exception as e:
             logger.error(f"Error bij score berekening: {str(e)}")
             return {'score': 0, 'error': str(e)}
+
+    def _score_map(self, board_center: Tuple[int, int], board_radius: int, rotation: float = 0.0) -> ScoreMap:
+        """ScoreMap voor deze kalibratie met de bord geometrie uit de config"""
+        return get_score_map(board_center, board_radius, self.geometry, rotation)
+
+    def calculate_scores(self, points: np.ndarray,
+                         board_center: Tuple[float, float],
+                         board_radius: float,
+                         rotation: float = 0.0) -> Dict[str, np.ndarray]:
+        """Bereken scores voor een (N, 2) array van hit posities in één keer
+
+        Voor offline herberekening en simulaties: er wordt geen worp
+        geschiedenis of spelerstand bijgewerkt. Geeft arrays 'segment'
+        (segmentwaarde, 25/50 voor de bull, 0 voor mis), 'multiplier' en
+        'score' terug.
+        """
+        hits = self.geometry.score_points(points, board_center, board_radius, rotation)
+        return {
+            'segment': hits['segment'],
+            'multiplier': hits['multiplier'],
+            'score': hits['score']
+        }
             
-    def _get_multiplier(self, distance: float, board_radius: float) -> int:
-        """Bepaal vermenigvuldigingsfactor gebaseerd op afstand"""
-        distance_factor = distance / board_radius
-        
-        # Check triple ring
-        triple_outer = self.config['scoring_regions']['triples']['outer_radius_factor']
-        triple_inner = self.config['scoring_regions']['triples']['inner_radius_factor']
-        if triple_inner <= distance_factor <= triple_outer:
-            return 3
-            
-        # Check double ring
-        double_outer = self.config['scoring_regions']['doubles']['outer_radius_factor']
-        double_inner = self.config['scoring_regions']['doubles']['inner_radius_factor']
-        if double_inner <= distance_factor <= double_outer:
-            return 2
-            
-        return 1
-        
-    def _get_segment_value(self, angle: float) -> int:
-        """Bepaal segment waarde gebaseerd op hoek"""
-        segments = self.config['point_values']['segments']
-        
-        # Vind het juiste segment
-        for segment in segments:
-            next_angle = (segment['angle'] + 18) % 360
-            if segment['angle'] <= angle < next_angle:
-                return segment['value']
-                
-        # Fallback naar eerste segment
-        return segments[0]['value']
-        
-    def _is_bullseye(self, distance: float, board_radius: float) -> bool:
-        """Check of hit in bullseye gebied is"""
-        distance_factor = distance / board_radius
-        return distance_factor <= self.config['scoring_regions']['bullseye']['outer_radius_factor']
-        
-    def _is_double_bull(self, distance: float, board_radius: float) -> bool:
-        """Check of hit in dubbel bull gebied is"""
-        distance_factor = distance / board_radius
-        return distance_factor <= self.config['scoring_regions']['bullseye']['inner_radius_factor']
-        
     def _update_player_score(self, player: int, points: int):
         """Update score voor een specifieke speler"""
         new_score = self.players[player]['score'] - points
@@ -0,0 +1,258 @@
+import glob
+import logging
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger('dart_scorer.sources')
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+
+class FrameSource:
+    """Basis voor frame bronnen achter Camera
+
+    Volgt de interface van cv2.VideoCapture (read/grab/retrieve/set/get/
+    isOpened/release), zodat Camera niet hoeft te weten of frames van een
+    live device of uit een opname komen.
+    """
+    is_device = False
+
+    def __init__(self):
+        # True zodra een opname helemaal afgespeeld is
+        self.finished = False
+        # Opnametijd (epoch seconden) van het laatst gegrabde frame, als de bron die kent
+        self.recorded_timestamp = None
+
+    def isOpened(self) -> bool:
+        raise NotImplementedError
+
+    def grab(self) -> bool:
+        raise NotImplementedError
+
+    def retrieve(self, image=None):
+        raise NotImplementedError
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def set(self, prop, value) -> bool:
+        return False
+
+    def get(self, prop) -> float:
+        return 0.0
+
+    def release(self):
+        pass
+
+
+def capture_api():
+    """OpenCV backend voor live devices: V4L2 op Linux, anders de standaard"""
+    return cv2.CAP_V4L2 if sys.platform.startswith('linux') else cv2.CAP_ANY
+
+
+class DeviceSource(FrameSource):
+    """Live camera via V4L2 (Linux) of de standaard OpenCV backend"""
+    is_device = True
+
+    def __init__(self, index):
+        super().__init__()
+        self.cap = cv2.VideoCapture(int(index), capture_api())
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def grab(self):
+        return self.cap.grab()
+
+    def retrieve(self, image=None):
+        return self.cap.retrieve(image)
+
+    def read(self, image=None):
+        return self.cap.read(image)
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def release(self):
+        self.cap.release()
+
+
+class ReplaySource(FrameSource):
+    """Basis voor opnames die op opnametempo of zo snel mogelijk afgespeeld worden"""
+    def __init__(self, replay='realtime', loop=False):
+        super().__init__()
+        if replay not in ('realtime', 'fast'):
+            raise ValueError(f"Onbekende replay modus: {replay}")
+        self.replay = replay
+        self.loop = loop
+        self.start_wall = None
+        self.start_timestamp = None
+        self.frame_timestamp = 0.0
+
+    def _pace(self, timestamp):
+        """Wacht tot het opnametijdstip van dit frame bereikt is (alleen realtime)"""
+        self.frame_timestamp = timestamp
+        if self.replay != 'realtime':
+            return
+        now = time.perf_counter()
+        if self.start_wall is None or timestamp < self.start_timestamp:
+            self.start_wall = now
+            self.start_timestamp = timestamp
+            return
+        delay = (timestamp - self.start_timestamp) - (now - self.start_wall)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class VideoFileSource(ReplaySource):
+    """Frames uit een videobestand, met tijdstempels uit de container
+
+    Staat naast het bestand een CSV index van de Recorder (frame,seq,
+    timestamp), dan zijn de opgenomen capture tijden de tijdlijn en worden
+    ze als recorded_timestamp doorgegeven.
+    """
+    def __init__(self, path, replay='realtime', loop=False):
+        super().__init__(replay, loop)
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_index = 0
+        # Tijd die vorige rondes van een geloopte opname duurden
+        self.loop_offset = 0.0
+        self.index_times = self._load_index(os.path.splitext(path)[0] + '.csv')
+
+    @staticmethod
+    def _load_index(path):
+        """Capture tijden per frame uit een Recorder index, of None"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                header = f.readline().strip().split(',')
+                column = header.index('timestamp')
+                times = [float(line.split(',')[column]) for line in f if line.strip()]
+            return np.asarray(times, dtype=np.float64) if times else None
+        except Exception as e:
+            logger.error(f"Error bij lezen opname index {path}: {str(e)}")
+            return None
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def grab(self):
+        if not self.cap.grab():
+            if not self.loop or self.frame_index == 0:
+                self.finished = True
+                return False
+            # Terug naar het begin van de opname; de tijdlijn loopt door
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            start = self.index_times[0] if self.index_times is not None else 0.0
+            self.loop_offset = self.frame_timestamp + 1.0 / self.fps - start
+            self.frame_index = 0
+            if not self.cap.grab():
+                self.finished = True
+                return False
+
+        if self.index_times is not None and self.frame_index < len(self.index_times):
+            timestamp = float(self.index_times[self.frame_index])
+            self.recorded_timestamp = self.loop_offset + timestamp
+        else:
+            # Sommige containers geven geen tijdstempels; val terug op fps
+            timestamp = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if timestamp <= 0 and self.frame_index > 0:
+                timestamp = self.frame_index / self.fps
+            self.recorded_timestamp = None
+        self.frame_index += 1
+        self._pace(self.loop_offset + timestamp)
+        return True
+
+    def retrieve(self, image=None):
+        return self.cap.retrieve(image)
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageSequenceSource(ReplaySource):
+    """Frames uit een map met afbeeldingen, op naam gesorteerd"""
+    def __init__(self, directory, fps=30.0, replay='realtime', loop=False):
+        super().__init__(replay, loop)
+        self.directory = directory
+        self.fps = float(fps)
+        self.files = sorted(f for f in glob.glob(os.path.join(directory, '*'))
+                            if f.lower().endswith(IMAGE_EXTENSIONS))
+        self.index = -1
+        self.frame_index = 0
+
+    def isOpened(self):
+        return len(self.files) > 0
+
+    def grab(self):
+        if self.index + 1 >= len(self.files):
+            if not self.loop or not self.files:
+                self.finished = True
+                return False
+            self.index = -1
+        self.index += 1
+        # frame_index telt door over rondes heen, zodat het tempo gelijk blijft
+        self._pace(self.frame_index / self.fps)
+        self.frame_index += 1
+        return True
+
+    def retrieve(self, image=None):
+        frame = cv2.imread(self.files[self.index], cv2.IMREAD_COLOR)
+        if frame is None:
+            logger.warning(f"Kon afbeelding niet lezen: {self.files[self.index]}")
+            return False, None
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.files))
+        return 0.0
+
+
+def create_frame_source(camera_id, source_config=None) -> FrameSource:
+    """Maak een frame bron op basis van camera ID en de 'source' configuratie
+
+    Zonder configuratie is een getal een live device, een map een reeks
+    afbeeldingen en elk ander pad een videobestand.
+    """
+    source_config = source_config or {}
+    source_type = source_config.get('type')
+    path = source_config.get('path', camera_id)
+    replay = source_config.get('replay', 'realtime')
+    loop = source_config.get('loop', False)
+
+    if source_type is None:
+        if isinstance(path, int) or str(path).isdigit():
+            source_type = 'device'
+        elif os.path.isdir(str(path)):
+            source_type = 'images'
+        else:
+            source_type = 'video'
+
+    if source_type == 'device':
+        return DeviceSource(int(path))
+    if source_type == 'images':
+        return ImageSequenceSource(str(path), source_config.get('fps', 30.0), replay, loop)
+    if source_type == 'video':
+        return VideoFileSource(str(path), replay, loop)
+    raise ValueError(f"Onbekend type frame bron: {source_type}")
@@ -0,0 +1,246 @@
+import logging
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread, Condition, Lock
+
+import cv2
+
+logger = logging.getLogger('dart_scorer.streaming')
+
+BOUNDARY = 'dartframe'
+
+
+class StreamEncoder:
+    """Codeert de frames van één camera één keer naar JPEG voor alle clients
+
+    De encoder thread draait alleen als er clients zijn. Clients wachten op
+    een nieuwer volgnummer en krijgen altijd de meest recente JPEG, zodat
+    een trage client frames overslaat in plaats van ze op te sparen.
+    """
+    def __init__(self, camera, quality=80, level='full', overlay=None):
+        self.camera = camera
+        self.quality = int(quality)
+        self.level = level
+        self.overlay = overlay
+        self.condition = Condition()
+        self.jpeg = None
+        self.seq = 0
+        self.clients = 0
+        self.is_running = False
+        self.encode_thread = None
+        self.encoded_frames = 0
+
+    def start(self):
+        if self.is_running:
+            return
+        self.is_running = True
+        self.camera.subscribe(self.level)
+        self.encode_thread = Thread(target=self._encode_loop, daemon=True)
+        self.encode_thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.is_running = False
+            self.condition.notify_all()
+        if self.encode_thread:
+            self.encode_thread.join()
+            self.encode_thread = None
+        self.camera.unsubscribe(self.level)
+
+    def _encode_loop(self):
+        """Wacht op nieuwe frames en codeer ze zolang er clients zijn"""
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        frame_seq = 0
+        while self.is_running:
+            with self.condition:
+                # Zonder clients niets coderen
+                self.condition.wait_for(lambda: self.clients > 0 or not self.is_running)
+            if not self.is_running:
+                break
+
+            lease = self.camera.wait_for_frame(frame_seq, timeout=0.5, level=self.level)
+            if lease is None:
+                if not self.camera.is_running:
+                    time.sleep(0.1)
+                continue
+            try:
+                with lease:
+                    frame_seq = lease.seq
+                    frame = lease.frame
+                    if self.overlay is not None:
+                        frame = self.overlay(frame.copy())
+                    ok, buffer = cv2.imencode('.jpg', frame, params)
+                    ok = ok and lease.valid
+                if not ok:
+                    continue
+            except Exception as e:
+                logger.error(f"Error bij coderen stream frame: {str(e)}")
+                continue
+
+            with self.condition:
+                self.jpeg = buffer.tobytes()
+                self.seq += 1
+                self.encoded_frames += 1
+                self.condition.notify_all()
+
+    def add_client(self):
+        with self.condition:
+            self.clients += 1
+            self.condition.notify_all()
+
+    def remove_client(self):
+        with self.condition:
+            self.clients -= 1
+
+    def wait_for_jpeg(self, after_seq=0, timeout=None):
+        """Geef (seq, jpeg bytes) van de nieuwste JPEG na after_seq, of None bij een timeout"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.seq > after_seq or not self.is_running, timeout)
+            if self.seq <= after_seq:
+                return None
+            return self.seq, self.jpeg
+
+
+class StreamRequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler: / geeft een overzicht, /stream/<camera> een MJPEG stream
+    en /snapshot/<camera> één JPEG"""
+    server_version = 'DartScorerStream/1.0'
+
+    def do_GET(self):
+        parts = [p for p in self.path.split('?')[0].split('/') if p]
+        if not parts:
+            self._send_index()
+            return
+        if len(parts) != 2 or parts[0] not in ('stream', 'snapshot'):
+            self.send_error(404)
+            return
+
+        cam_name = parts[1].rsplit('.', 1)[0]
+        encoder = self.server.stream_server.get_encoder(cam_name)
+        if encoder is None:
+            self.send_error(404, f"Onbekende camera: {cam_name}")
+            return
+
+        encoder.add_client()
+        try:
+            if parts[0] == 'snapshot':
+                self._send_snapshot(encoder)
+            else:
+                self._send_stream(encoder)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            encoder.remove_client()
+
+    def _send_index(self):
+        links = ''.join(f'<li><a href="/stream/{name}">{name}</a></li>'
+                        for name in self.server.stream_server.camera_names())
+        body = f"<html><body><h1>Dart Scorer</h1><ul>{links}</ul></body></html>".encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_snapshot(self, encoder):
+        result = encoder.wait_for_jpeg(0, timeout=2.0)
+        if result is None:
+            self.send_error(503, "Geen frame beschikbaar")
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(result[1])))
+        self.end_headers()
+        self.wfile.write(result[1])
+
+    def _send_stream(self, encoder):
+        self.send_response(200)
+        self.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        seq = 0
+        while self.server.stream_server.is_running:
+            # Altijd de nieuwste JPEG: een trage client slaat frames over
+            result = encoder.wait_for_jpeg(seq, timeout=1.0)
+            if result is None:
+                continue
+            seq, jpeg = result
+            self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                             f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+            self.wfile.write(jpeg)
+            self.wfile.write(b"\r\n")
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+
+class StreamServer:
+    """Lokale MJPEG server voor de camera's van een CameraManager
+
+    Implementeert het 'networking' config blok: stream_port en
+    stream_quality (JPEG kwaliteit).
+    """
+    def __init__(self, cameras, port=8080, quality=80, host='0.0.0.0', level='full'):
+        self.cameras = cameras
+        self.port = port
+        self.quality = quality
+        self.host = host
+        self.level = level
+        self.encoders = {}
+        self.overlays = {}
+        self.lock = Lock()
+        self.httpd = None
+        self.server_thread = None
+        self.is_running = False
+
+    def start(self):
+        """Start de HTTP server in een achtergrond thread"""
+        if self.is_running:
+            return
+        self.httpd = ThreadingHTTPServer((self.host, self.port), StreamRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stream_server = self
+        # Poort 0 kiest een vrije poort
+        self.port = self.httpd.server_address[1]
+        self.is_running = True
+        self.server_thread = Thread(target=self.httpd.serve_forever, daemon=True)
+        self.server_thread.start()
+        logger.info(f"Stream server gestart op poort {self.port}")
+
+    def stop(self):
+        """Stop de server en alle encoders"""
+        if not self.is_running:
+            return
+        self.is_running = False
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.server_thread.join()
+        with self.lock:
+            for encoder in self.encoders.values():
+                encoder.stop()
+            self.encoders = {}
+        logger.info("Stream server gestopt")
+
+    def camera_names(self):
+        return sorted(self.cameras)
+
+    def set_overlay(self, cam_name, overlay):
+        """Stream een debug overlay: overlay(frame) krijgt een kopie en geeft het te tonen frame"""
+        with self.lock:
+            self.overlays[cam_name] = overlay
+            if cam_name in self.encoders:
+                self.encoders[cam_name].overlay = overlay
+
+    def get_encoder(self, cam_name):
+        """De encoder voor een camera, aangemaakt bij de eerste client"""
+        with self.lock:
+            if not self.is_running or cam_name not in self.cameras:
+                return None
+            encoder = self.encoders.get(cam_name)
+            if encoder is None:
+                encoder = StreamEncoder(self.cameras[cam_name], self.quality, self.level,
+                                        self.overlays.get(cam_name))
+                encoder.start()
+                self.encoders[cam_name] = encoder
+            return encoder
@@ -0,0 +1,134 @@
+import json
+import time
+from collections import deque
+from threading import Lock
+
+import numpy as np
+
+# Bovengrenzen van de histogram buckets in milliseconden
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 33, 50, 100, 200, 500)
+
+
+class LatencyHistogram:
+    """Histogram met vaste buckets voor tijden in milliseconden"""
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = np.asarray(bounds, dtype=np.float64)
+        self.counts = np.zeros(len(bounds) + 1, dtype=np.int64)
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def add(self, ms):
+        self.counts[np.searchsorted(self.bounds, ms)] += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, p):
+        """Bovengrens van de bucket waarin percentiel p valt (max voor de laatste bucket)"""
+        count = self.count
+        if count == 0:
+            return None
+        index = int(np.searchsorted(np.cumsum(self.counts), p / 100.0 * count))
+        return float(self.bounds[index]) if index < len(self.bounds) else self.max
+
+    def to_dict(self):
+        labels = [f"<={b:g}" for b in self.bounds] + [f">{self.bounds[-1]:g}"]
+        count = self.count
+        return {
+            'count': count,
+            'mean_ms': self.total / count if count else None,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'max_ms': self.max if count else None,
+            'buckets': dict(zip(labels, self.counts.tolist()))
+        }
+
+
+class CaptureTelemetry:
+    """Capture statistieken van één camera
+
+    Houdt de behaalde fps (over een venster van recente frames), mislukte
+    reads, gedropte frames, een histogram van de read() latency en een
+    histogram van de leeftijd van frames op het moment dat een consument
+    ze ophaalt bij. `clock` (standaard time.perf_counter) bepaalt de
+    frame tijden voor de fps.
+    """
+    def __init__(self, window=120, clock=time.perf_counter):
+        self.lock = Lock()
+        self.clock = clock
+        self.frame_times = deque(maxlen=window)
+        self.frames = 0
+        self.failed_reads = 0
+        self.consecutive_failures = 0
+        self.dropped_frames = 0
+        self.read_latency = LatencyHistogram()
+        self.frame_age = LatencyHistogram()
+        # Nieuwste volgnummer dat een consument opgehaald heeft
+        self.consumed_seq = 0
+        self.started = time.time()
+
+    def record_read(self, duration, ok=True):
+        """Registreer één read() aanroep; geeft het aantal opeenvolgende fouten terug"""
+        with self.lock:
+            self.read_latency.add(duration * 1000.0)
+            if not ok:
+                self.failed_reads += 1
+                self.consecutive_failures += 1
+                return self.consecutive_failures
+            self.frames += 1
+            self.consecutive_failures = 0
+            self.frame_times.append(self.clock())
+            return 0
+
+    def record_drop(self):
+        """Een frame is overgeslagen omdat er geen vrij buffer slot was"""
+        with self.lock:
+            self.dropped_frames += 1
+
+    def record_consumption(self, frame_timestamp, seq=0):
+        """Registreer hoe oud een frame is als een consument het ophaalt"""
+        age_ms = max(0.0, time.time() - frame_timestamp) * 1000.0
+        with self.lock:
+            self.frame_age.add(age_ms)
+            self.consumed_seq = max(self.consumed_seq, int(seq))
+
+    def reset_consumption(self):
+        """Volgnummers beginnen opnieuw (buffer opnieuw gealloceerd)"""
+        with self.lock:
+            self.consumed_seq = 0
+
+    def unconsumed(self, latest_seq, capacity):
+        """Gevulde slots met een frame dat nog geen consument opgehaald heeft"""
+        with self.lock:
+            return int(min(max(0, latest_seq - self.consumed_seq), capacity))
+
+    def fps(self):
+        """Behaalde fps over het venster van recente frames"""
+        with self.lock:
+            if len(self.frame_times) < 2:
+                return 0.0
+            span = self.frame_times[-1] - self.frame_times[0]
+            return (len(self.frame_times) - 1) / span if span > 0 else 0.0
+
+    def snapshot(self, **extra):
+        """Alle statistieken als dict; extra velden worden toegevoegd"""
+        fps = self.fps()
+        with self.lock:
+            data = {
+                'uptime_s': time.time() - self.started,
+                'fps': fps,
+                'frames': self.frames,
+                'failed_reads': self.failed_reads,
+                'consecutive_failures': self.consecutive_failures,
+                'dropped_frames': self.dropped_frames,
+                'read_latency': self.read_latency.to_dict(),
+                'frame_age': self.frame_age.to_dict()
+            }
+        data.update(extra)
+        return data
+
+    def to_json(self, **extra):
+        return json.dumps(self.snapshot(**extra), indent=2)
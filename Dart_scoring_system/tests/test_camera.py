@@ -0,0 +1,636 @@
+import json
+import os
+import threading
+import urllib.request
+
+import cv2
+import numpy as np
+import pytest
+
+from src.camera import Camera, CameraManager, FrameRingBuffer, SynchronizedCapture, board_roi
+from src.discovery import DeviceDiscovery
+from src.frame_worker import FrameWorker
+from src.process_capture import (STATUS_FINISHED, ProcessCamera, SharedFrameRing, HEADER_FAILED_READS,
+                                 HEADER_STATUS, _capture_worker)
+from src.recorder import CameraRecorder, DropOldestQueue
+from src.streaming import StreamServer
+from src.telemetry import CaptureTelemetry, LatencyHistogram
+
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config', 'camera_config.json')
+
+CAMERA_CONFIG = {
+    'resolution': {'width': 8, 'height': 6},
+    'settings': {'exposure': -2, 'brightness': 50, 'contrast': 50, 'fps': 30},
+    'roi': {'x': 0, 'y': 0, 'width': 8, 'height': 6},
+}
+
+
+class FakeCapture:
+    """Levert frames met een oplopende pixelwaarde"""
+    def __init__(self, limit=None):
+        self.value = 0
+        self.limit = limit
+        self.released = False
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def grab(self):
+        # Net als een echte device blokkeert grab() tot het volgende frame
+        threading.Event().wait(0.001)
+        if self.limit is not None and self.value >= self.limit:
+            return False
+        self.value += 1
+        return True
+
+    def retrieve(self, image=None):
+        if image is None:
+            image = np.empty((6, 8, 3), np.uint8)
+        image[:] = self.value % 256
+        return True, image
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        self.released = True
+
+
+@pytest.fixture
+def running_camera():
+    camera = Camera(0, CAMERA_CONFIG, buffer_size=3)
+    camera.cap = FakeCapture(limit=50)
+    camera.start()
+    yield camera
+    camera.stop()
+
+
+def test_ring_buffer_orders_frames_oldest_first():
+    ring = FrameRingBuffer(3, (2, 2, 3))
+    for value in range(5):
+        ring.next_slot()[:] = value
+        ring.commit()
+
+    frames = [ring.frames[i] for i in ring.ordered_indices()]
+    assert [int(f[0, 0, 0]) for f in frames] == [2, 3, 4]
+    assert ring.generation == 5
+
+
+def test_ring_buffer_never_exposes_write_slot():
+    ring = FrameRingBuffer(2, (1, 1, 3))
+    for _ in range(4):
+        ring.commit()
+        assert ring.write_index not in ring.ordered_indices()
+
+
+def test_ring_buffer_write_slot_loses_its_old_sequence():
+    ring = FrameRingBuffer(2, (1, 1, 3))
+    for _ in range(3):
+        ring.next_slot()
+        ring.commit()
+    # Slot van seq 1 wordt het volgende schrijfslot
+    assert ring.sequences[ring.write_index] == 1
+    ring.next_slot()
+    assert 1 not in ring.sequences.tolist()
+    assert ring.write_index not in ring.ordered_indices()
+
+
+def test_acquire_frame_refuses_the_slot_being_written():
+    camera = Camera(0, CAMERA_CONFIG, buffer_size=2)
+    for _ in range(3):
+        slot = camera._acquire_write_slot()
+        camera._publish_frame(slot, slot, 0.0)
+    # Capture thread is begonnen aan het volgende frame, in het slot van seq 1
+    camera._acquire_write_slot()
+    assert camera.acquire_frame(1) is None
+    with camera.acquire_frame(2) as lease:
+        assert lease.valid
+
+
+def test_ring_buffer_reallocate_resets_state():
+    ring = FrameRingBuffer(2, (4, 4, 3))
+    ring.commit()
+    ring.reallocate((2, 3, 3))
+    assert ring.shape == (2, 3, 3)
+    assert ring.latest_index() is None
+    assert ring.frames.dtype == np.uint8
+
+
+def test_ring_buffer_skips_pinned_slots():
+    ring = FrameRingBuffer(2, (1, 1, 3))
+    ring.next_slot()
+    pinned = ring.commit()
+    ring.pin(pinned)
+    for _ in range(6):
+        assert ring.next_slot() is not None
+        assert ring.write_index != pinned
+        ring.commit()
+
+
+def test_wait_for_frame_returns_newer_read_only_frame(running_camera):
+    with running_camera.wait_for_frame(0, timeout=1.0) as lease:
+        assert lease.seq > 0
+        assert not lease.frame.flags.writeable
+        first_seq = lease.seq
+
+    lease = running_camera.wait_for_frame(first_seq, timeout=1.0)
+    assert lease is not None and lease.seq > first_seq
+    lease.release()
+
+
+def test_leased_frame_is_not_overwritten(running_camera):
+    lease = running_camera.wait_for_frame(0, timeout=1.0)
+    value = int(lease.frame[0, 0, 0])
+    assert running_camera.wait_for_frame(40, timeout=1.0) is not None
+    assert int(lease.frame[0, 0, 0]) == value
+    lease.release()
+
+
+def test_latest_frame_is_a_copy_outside_the_ring(running_camera):
+    running_camera.wait_for_frame(0, timeout=1.0).release()
+    frame = running_camera.get_latest_frame()
+    value = int(frame[0, 0, 0])
+    running_camera.wait_for_frame(40, timeout=1.0).release()
+    assert int(frame[0, 0, 0]) == value
+    # Geen ongepinde view op een ring slot meer
+    assert not hasattr(running_camera, 'last_frame')
+
+
+def test_wait_for_frame_times_out_without_new_frames(running_camera):
+    running_camera.wait_for_frame(49, timeout=1.0).release()
+    assert running_camera.wait_for_frame(running_camera.frame_seq, timeout=0.05) is None
+
+
+def test_synchronized_capture_publishes_consistent_framesets():
+    cameras = {}
+    for name in ('camera1', 'camera2', 'camera3'):
+        cameras[name] = Camera(0, CAMERA_CONFIG, buffer_size=3)
+        cameras[name].cap = FakeCapture(limit=20)
+
+    sync = SynchronizedCapture(cameras)
+    sync.start()
+    try:
+        with sync.wait_for_frameset(0, timeout=1.0) as frameset:
+            assert set(frameset.frames) == set(cameras)
+            values = {int(frame[0, 0, 0]) for frame in frameset.frames.values()}
+            assert len(values) == 1
+            assert frameset.skew >= 0
+        stats = sync.get_skew_statistics()
+        assert stats['count'] >= 1
+        assert stats['max_ms'] >= stats['mean_ms']
+    finally:
+        sync.stop()
+
+
+class FakeRoot:
+    """Tk root zonder display: een virtueel event roept de binding direct aan"""
+    def __init__(self):
+        self.bindings = {}
+        self.events = 0
+
+    def bind(self, event, callback):
+        self.bindings[event] = callback
+
+    def unbind(self, event):
+        self.bindings.pop(event, None)
+
+    def event_generate(self, event, when=None):
+        self.events += 1
+        self.bindings[event]()
+
+
+def test_frame_worker_delivers_each_new_frame_once():
+    camera = Camera(0, CAMERA_CONFIG, buffer_size=3)
+    camera.cap = FakeCapture(limit=20)
+    manager = CameraManager.__new__(CameraManager)
+    manager.cameras = {'camera1': camera}
+    root = FakeRoot()
+    delivered = []
+    done = threading.Event()
+
+    def deliver(seq):
+        delivered.append(seq)
+        if seq == 20:
+            done.set()
+
+    worker = FrameWorker(root, manager, 'camera1', lambda lease: lease.seq, deliver)
+    worker.start()
+    camera.start()
+    try:
+        assert done.wait(2.0)
+        assert delivered == sorted(set(delivered))
+        # Zonder nieuwe frames wordt er niets meer afgeleverd
+        events = root.events
+        threading.Event().wait(0.05)
+        assert root.events == events
+    finally:
+        worker.stop()
+        camera.stop()
+    assert not worker.is_running and not root.bindings
+
+
+def test_frame_worker_follows_a_replaced_session():
+    first = Camera(0, CAMERA_CONFIG, buffer_size=3)
+    first.cap = FakeCapture(limit=20)
+    manager = CameraManager.__new__(CameraManager)
+    manager.cameras = {'camera1': first}
+    delivered = []
+    events = {20: threading.Event(), 5: threading.Event()}
+
+    def deliver(seq):
+        delivered.append(seq)
+        if seq in events:
+            events[seq].set()
+
+    worker = FrameWorker(FakeRoot(), manager, 'camera1', lambda lease: lease.seq, deliver)
+    worker.start()
+    first.start()
+    second = Camera(0, CAMERA_CONFIG, buffer_size=3)
+    second.cap = FakeCapture(limit=5)
+    try:
+        assert events[20].wait(2.0)
+        # Nieuwe sessie begint weer bij volgnummer 1
+        manager.cameras['camera1'] = second
+        second.start()
+        assert events[5].wait(2.0)
+    finally:
+        worker.stop()
+        first.stop()
+        second.stop()
+
+
+def test_telemetry_reports_fps_failures_and_latency(running_camera):
+    with running_camera.wait_for_frame(49, timeout=1.0):
+        threading.Event().wait(0.01)
+        stats = json.loads(json.dumps(running_camera.get_telemetry()))
+    assert stats['frames'] == 50
+    # Alleen dat er een fps is; de waarde zelf hangt van de klok af (zie injected clock test)
+    assert stats['fps'] > 0
+    # FakeCapture levert na 50 frames niets meer
+    assert stats['failed_reads'] > 0
+    assert stats['read_latency']['count'] == stats['frames'] + stats['failed_reads']
+    assert stats['frame_age']['count'] == 1
+    # Lezer heeft het nieuwste frame (49 of later) opgehaald
+    assert stats['buffer']['slots'] == 4 and stats['buffer']['filled_slots'] == 3
+    assert stats['buffer']['unconsumed_slots'] <= 1
+    assert stats['buffer']['pinned_slots'] == 1 and stats['buffer']['leases'] == 1
+
+
+def test_buffer_occupancy_counts_unconsumed_frames():
+    camera = Camera(0, CAMERA_CONFIG, buffer_size=3)
+    for _ in range(5):
+        slot = camera._acquire_write_slot()
+        camera._publish_frame(slot, slot, 0.0)
+    # Nog niets opgehaald: alle gevulde slots zijn onverwerkt
+    assert camera.get_telemetry()['buffer']['unconsumed_slots'] == 3
+    camera.acquire_frame(4).release()
+    assert camera.get_telemetry()['buffer']['unconsumed_slots'] == 1
+    camera.wait_for_frame(0, timeout=0).release()
+    assert camera.get_telemetry()['buffer']['unconsumed_slots'] == 0
+
+
+def test_telemetry_fps_uses_injected_clock():
+    ticks = iter(np.arange(0, 10, 0.025))
+    telemetry = CaptureTelemetry(window=5, clock=lambda: next(ticks))
+    assert telemetry.fps() == 0.0
+    for _ in range(8):
+        telemetry.record_read(0.001)
+    telemetry.record_read(0.001, ok=False)
+    # Venster van de laatste 5 frames, 25 ms uit elkaar; een mislukte read telt niet
+    assert telemetry.fps() == pytest.approx(40.0)
+    assert telemetry.snapshot()['frames'] == 8
+
+
+def test_latency_histogram_percentiles_use_bucket_bounds():
+    histogram = LatencyHistogram()
+    for ms in [0.5] * 90 + [40] * 9 + [900]:
+        histogram.add(ms)
+    assert histogram.percentile(50) == 1
+    assert histogram.percentile(95) == 50
+    assert histogram.percentile(100) == 900
+    assert histogram.to_dict()['buckets']['>500'] == 1
+
+
+def test_shared_frame_ring_publishes_and_invalidates_slots():
+    writer = SharedFrameRing(2, (4, 4, 3), create=True)
+    reader = SharedFrameRing(2, (4, 4, 3), name=writer.name)
+    try:
+        writer.begin_write(1)[:] = 7
+        assert not reader.is_valid(1)
+        writer.end_write(1, 123.0)
+
+        assert reader.latest_seq == 1
+        assert reader.is_valid(1)
+        assert int(reader.frames[1][0, 0, 0]) == 7
+
+        # Na twee nieuwe frames is slot 1 hergebruikt
+        for seq in (2, 3):
+            writer.begin_write(seq)
+            writer.end_write(seq, 0.0)
+        assert not reader.is_valid(1)
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_process_camera_leases_only_valid_frames():
+    camera = ProcessCamera(0, CAMERA_CONFIG, buffer_size=1)
+    camera.ring = SharedFrameRing(camera.slots, camera.shape, create=True)
+    try:
+        for seq in (1, 2):
+            camera.ring.begin_write(seq)[:] = seq
+            camera.ring.end_write(seq, 0.0)
+
+        lease = camera.wait_for_frame(0, timeout=0, level='half')
+        assert lease.seq == 2 and lease.valid
+        assert lease.frame.shape == (3, 4, 3) and int(lease.frame[0, 0, 0]) == 2
+        assert int(lease.level('full')[0, 0, 0]) == 2
+        assert [int(f[0, 0, 0]) for f in camera.get_frame_buffer()] == [1, 2]
+
+        # Slot van seq 1 wordt hergebruikt: geen lease meer, en de oude lease is ongeldig
+        camera.ring.begin_write(3)[:] = 3
+        assert camera.acquire_frame(1) is None
+        assert camera.acquire_frame(3) is None
+        camera.ring.end_write(3, 0.0)
+        assert int(camera.acquire_frame(3, level='half').frame[0, 0, 0]) == 3
+        camera.ring.begin_write(4)
+        assert not lease.valid and lease.level('preview') is None
+    finally:
+        camera.ring.close()
+        camera.ring = None
+
+
+class FakeReplay(FakeCapture):
+    """Opname die na `limit` frames afgelopen is"""
+    @property
+    def finished(self):
+        return self.value >= self.limit
+
+
+def run_capture_worker(monkeypatch, source, duration):
+    """Draai de capture loop van het child proces in een thread met een nep bron"""
+    monkeypatch.setattr('src.camera.open_source', lambda *args: (source, None))
+    ring = SharedFrameRing(2, (6, 8, 3), create=True)
+    start_event, stop_event = threading.Event(), threading.Event()
+    start_event.set()
+    worker = threading.Thread(target=_capture_worker, args=(ring.name, 2, (6, 8, 3), 0, CAMERA_CONFIG,
+                                                            None, start_event, stop_event))
+    worker.start()
+    worker.join(duration)
+    stop_event.set()
+    worker.join(1.0)
+    return ring, worker
+
+
+def test_capture_worker_stops_at_end_of_replay(monkeypatch):
+    source = FakeReplay(limit=5)
+    ring, worker = run_capture_worker(monkeypatch, source, 1.0)
+    try:
+        assert not worker.is_alive()
+        assert ring.latest_seq == 5 and ring.header[HEADER_STATUS] == STATUS_FINISHED
+        assert source.released
+    finally:
+        ring.close()
+
+
+def test_capture_worker_backs_off_on_failing_device(monkeypatch):
+    # Losgekoppelde device: elke read faalt meteen
+    ring, _ = run_capture_worker(monkeypatch, FakeCapture(limit=0), 0.3)
+    try:
+        assert 3 <= ring.header[HEADER_FAILED_READS] < 30
+    finally:
+        ring.close()
+
+
+def test_device_discovery_caches_by_device_nodes(monkeypatch):
+    discovery = DeviceDiscovery(max_index=4)
+    probes = []
+
+    def fake_probe(index):
+        probes.append(index)
+        return index in (0, 2)
+
+    monkeypatch.setattr(discovery, '_probe', fake_probe)
+    monkeypatch.setattr(discovery, '_device_nodes', lambda: frozenset({'/dev/video0', '/dev/video2'}))
+
+    assert discovery.get_available_cameras() == ['0', '2']
+    assert discovery.get_available_cameras() == ['0', '2']
+    assert sorted(probes) == [0, 2]
+
+    monkeypatch.setattr(discovery, '_device_nodes', lambda: frozenset({'/dev/video0'}))
+    discovery.get_available_cameras()
+    assert sorted(probes) == [0, 0, 2]
+
+
+def test_device_discovery_skips_devices_held_by_sessions(monkeypatch):
+    discovery = DeviceDiscovery(max_index=4)
+    probes = []
+    monkeypatch.setattr(discovery, '_probe', lambda index: probes.append(index) or True)
+    monkeypatch.setattr(discovery, '_device_nodes', lambda: frozenset({'/dev/video0', '/dev/video2'}))
+
+    class Session:
+        devices = {2}
+
+        def devices_in_use(self):
+            return self.devices
+
+    session = Session()
+    discovery.register_sessions(session.devices_in_use)
+    # Video2 is open in een sessie: niet geprobed, wel beschikbaar
+    assert discovery.get_available_cameras(refresh=True) == ['0', '2']
+    assert probes == [0]
+
+    del session
+    assert discovery.devices_in_use() == set()
+
+
+def test_open_camera_reuses_running_session(monkeypatch):
+    manager = CameraManager(CONFIG_PATH)
+    created = []
+
+    def fake_create(cam_name, camera_id):
+        camera = Camera(int(camera_id), CAMERA_CONFIG, buffer_size=2)
+        camera.initialize = lambda: setattr(camera, 'cap', FakeCapture()) or True
+        created.append(camera)
+        return camera
+
+    monkeypatch.setattr(manager, '_create_camera', fake_create)
+    try:
+        first = manager.open_camera('camera1', 0)
+        assert manager.open_camera('camera1', 0) is first
+        # Zelfde device onder een andere naam deelt de sessie
+        assert manager.open_camera('camera2', 0) is first
+        assert len(created) == 1
+        manager.wait_for_frame('camera2', 0, timeout=1.0).release()
+        assert manager.get_frame('camera2') is not None
+    finally:
+        manager.stop_all_cameras()
+
+
+def test_subscribed_pyramid_level_is_built_per_frame(running_camera):
+    running_camera.subscribe('half')
+    with running_camera.wait_for_frame(running_camera.frame_seq, timeout=1.0, level='half') as lease:
+        assert lease.frame.shape == (3, 4, 3)
+        assert not lease.frame.flags.writeable
+        assert int(lease.frame[0, 0, 0]) == int(lease.level('full')[0, 0, 0])
+        assert lease.level('preview').shape == (300, 400, 3)
+
+
+def test_unknown_pyramid_level_is_rejected(running_camera):
+    with pytest.raises(ValueError):
+        running_camera.subscribe('quarter')
+
+
+def test_image_sequence_replays_every_frame_in_order(tmp_path):
+    for i in range(5):
+        cv2.imwrite(str(tmp_path / f'frame_{i:03d}.png'), np.full((6, 8, 3), i * 10, np.uint8))
+
+    config = dict(CAMERA_CONFIG, source={'path': str(tmp_path), 'replay': 'fast'})
+    camera = Camera(str(tmp_path), config, buffer_size=2)
+    assert camera.initialize()
+    camera.start(threaded=False)
+    values = []
+    while camera.grab():
+        with camera.acquire_frame(camera.retrieve(0.0)) as lease:
+            values.append(int(lease.frame[0, 0, 0]))
+    camera.stop()
+
+    assert values == [0, 10, 20, 30, 40]
+    assert camera.cap.finished
+
+
+def test_video_replay_publishes_recorded_timestamps(tmp_path):
+    path = str(tmp_path / 'camera1.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (8, 6))
+    for i in range(3):
+        writer.write(np.full((6, 8, 3), i * 40, np.uint8))
+    writer.release()
+    # Index zoals de Recorder hem naast het bestand schrijft
+    (tmp_path / 'camera1.csv').write_text("frame,seq,timestamp\n0,7,1000.5\n1,8,1000.55\n2,9,1000.6\n")
+
+    config = dict(CAMERA_CONFIG, source={'path': path, 'replay': 'fast'})
+    camera = Camera(path, config, buffer_size=2)
+    assert camera.initialize()
+    camera.start(threaded=False)
+    timestamps = []
+    while camera.grab():
+        with camera.acquire_frame(camera.retrieve(0.0)) as lease:
+            timestamps.append(lease.timestamp)
+    camera.stop()
+    assert timestamps == [1000.5, 1000.55, 1000.6]
+
+
+def test_parse_camera_id_keeps_replay_paths():
+    assert CameraManager.parse_camera_id('2') == 2
+    assert CameraManager.parse_camera_id('recordings/camera1.avi') == 'recordings/camera1.avi'
+
+
+def test_finished_replay_stops_capture_thread(tmp_path):
+    cv2.imwrite(str(tmp_path / 'frame.png'), np.zeros((6, 8, 3), np.uint8))
+    config = dict(CAMERA_CONFIG, source={'type': 'images', 'path': str(tmp_path), 'replay': 'fast'})
+    camera = Camera(0, config)
+    assert camera.initialize()
+    camera.start()
+    camera.capture_thread.join(timeout=1.0)
+    assert not camera.is_running
+    lease = camera.wait_for_frame(0, timeout=1.0)
+    assert lease is not None
+    lease.release()
+    camera.stop()
+
+
+def test_drop_oldest_queue_never_blocks_producer():
+    queue = DropOldestQueue(2)
+    for i in range(5):
+        queue.put(i)
+    assert queue.dropped == 3
+    assert [queue.get(timeout=0), queue.get(timeout=0)] == [3, 4]
+    assert queue.get(timeout=0) is None
+
+
+def test_recorder_rotates_files_with_timestamp_index(tmp_path):
+    camera = Camera(0, CAMERA_CONFIG, buffer_size=3)
+    camera.cap = FakeCapture()
+    camera.start()
+    recorder = CameraRecorder(camera, 'camera1', {
+        'format': 'XVID',
+        'output_path': str(tmp_path),
+        'max_duration_seconds': 0.01,
+        'quality': {'width': 64, 'height': 48, 'fps': 30}
+    })
+    recorder.start()
+    threading.Event().wait(0.1)
+    recorder.stop()
+    camera.stop()
+
+    stats = recorder.get_stats()
+    assert stats['frames_written'] > 0
+    assert len(stats['files']) > 1
+    rows = []
+    for path in stats['files']:
+        assert os.path.getsize(path) > 0
+        with open(os.path.splitext(path)[0] + '.csv') as f:
+            lines = f.read().splitlines()
+        assert lines[0] == 'frame,seq,timestamp'
+        rows.extend(int(line.split(',')[1]) for line in lines[1:])
+    assert rows == sorted(rows) and len(rows) == stats['frames_written']
+
+
+def test_stream_server_serves_snapshots_from_shared_encoder(running_camera):
+    server = StreamServer({'camera1': running_camera}, port=0, host='127.0.0.1')
+    server.start()
+    try:
+        url = f"http://127.0.0.1:{server.port}/snapshot/camera1.jpg"
+        with urllib.request.urlopen(url, timeout=2) as response:
+            assert response.headers['Content-Type'] == 'image/jpeg'
+            jpeg = response.read()
+        assert cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR).shape == (6, 8, 3)
+
+        encoder = server.get_encoder('camera1')
+        first = encoder.wait_for_jpeg(0, timeout=1.0)
+        assert encoder.wait_for_jpeg(first[0], timeout=0) is None
+        assert server.get_encoder('camera2') is None
+    finally:
+        server.stop()
+
+
+def test_board_roi_crops_padded_ring_and_moves_calibration():
+    # Bord gekalibreerd op het 'half' niveau van het volledige 1280x720 beeld
+    roi, (center, radius, frame_size) = board_roi(
+        (320, 180), 100, (640, 360), {'x': 0, 'y': 0, 'width': 1280, 'height': 720},
+        {'width': 1280, 'height': 720})
+    assert roi == {'x': 420, 'y': 140, 'width': 440, 'height': 440, 'padding': 0.1}
+    assert center == (220, 220) and radius == 200 and frame_size == (440, 440)
+
+    # Opnieuw kalibreren binnen de ROI blijft in sensor coördinaten; randen worden geknipt
+    roi, _ = board_roi((20, 20), 100, (440, 440), roi, {'width': 1280, 'height': 720})
+    assert roi == {'x': 328, 'y': 48, 'width': 224, 'height': 224, 'padding': 0.1}
+    roi, _ = board_roi((10, 10), 50, (640, 360), {'x': 0, 'y': 0, 'width': 0, 'height': 0},
+                       {'width': 1280, 'height': 720})
+    assert roi['x'] == 0 and roi['y'] == 0
+
+
+def test_set_roi_crops_frames_while_running():
+    camera = Camera(0, dict(CAMERA_CONFIG), buffer_size=3)
+    camera.cap = FakeCapture(limit=50)
+    camera.start()
+    try:
+        camera.subscribe('half')
+        camera.set_roi({'x': 2, 'y': 1, 'width': 4, 'height': 4})
+        with camera.wait_for_frame(camera.frame_seq, timeout=1.0, level='half') as lease:
+            assert lease.level('full').shape == (4, 4, 3)
+            assert lease.frame.shape == (2, 2, 3)
+    finally:
+        camera.stop()
+
+
+def test_apply_board_roi_updates_camera_config(monkeypatch):
+    manager = CameraManager(CONFIG_PATH)
+    monkeypatch.setattr(manager, 'save_config', lambda: None)
+    center, radius, frame_size = manager.apply_board_roi('camera1', (320, 180), 100, (640, 360))
+    assert manager.config['cameras']['camera1']['roi'] == {'x': 420, 'y': 140, 'width': 440, 'height': 440, 'padding': 0.1}
+    assert manager.board_roi_padding('camera1') == 0.1
+    assert center == (220, 220) and frame_size == (440, 440)
@@ -0,0 +1,384 @@
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from src.camera import CameraManager
+from src.board_plane import CANONICAL_CENTER, CANONICAL_RADIUS, CANONICAL_SIZE
+from src.detector import DartboardDetector
+from src.fusion import ThrowFusion
+from src.geometry import STANDARD_SEGMENT_START
+from src.board_plane import similarity_homography
+from src.rectify import build_maps, load_rectifier
+from src.scheduler import DetectionScheduler
+
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config', 'board_config.json')
+
+
+def make_board(center=(160, 120), radius=80, size=(240, 320)):
+    """Synthetisch bord: donkere dubbele ring op een lichte achtergrond"""
+    frame = np.full(size + (3,), 200, np.uint8)
+    cv2.circle(frame, center, radius, (20, 20, 20), 6)
+    return frame
+
+
+@pytest.fixture
+def detector():
+    return DartboardDetector(CONFIG_PATH)
+
+
+def test_track_board_verifies_without_redetecting(detector, monkeypatch):
+    frame = make_board()
+    detected, info = detector.track_board(frame, 'camera1')
+    assert detected and not info['tracked']
+
+    calls = []
+    original = detector.detect_board
+    monkeypatch.setattr(detector, 'detect_board', lambda *args: calls.append(1) or original(*args))
+
+    # Een dart over de ring mag de verificatie niet breken
+    cv2.line(frame, (160, 120), (160, 30), (0, 0, 255), 3)
+    for _ in range(5):
+        detected, info = detector.track_board(frame, 'camera1')
+        assert detected and info['tracked']
+    assert calls == []
+    assert detector.tracking_stats['verified'] == 5
+
+
+def test_track_board_redetects_when_camera_moves(detector):
+    detector.track_board(make_board(), 'camera1')
+    detected, info = detector.track_board(make_board(center=(175, 128)), 'camera1')
+    assert detected and not info['tracked']
+    assert abs(int(info['center'][0]) - 175) <= 3
+    assert detector.tracking_stats['lost'] == 1
+
+    # Trackers zijn per camera
+    detected, info = detector.track_board(make_board(), 'camera2')
+    assert not info['tracked']
+
+
+def test_detection_pipeline_reuses_buffers_and_reads_config(detector):
+    pipeline = detector.pipeline
+    assert pipeline.threshold == detector.config['board_detection']['preprocessing']['threshold']
+
+    assert detector.detect_board(make_board())[0]
+    buffers = {name: buffer for name, buffer in pipeline.buffers.items()}
+    detected, info = detector.detect_board(make_board(center=(150, 115)))
+    assert detected
+    assert abs(info['center'][0] - 150) <= 3 and abs(info['radius'] - 80) <= 2
+    assert all(pipeline.buffers[name] is buffer for name, buffer in buffers.items())
+
+
+def throw_dart(frame, tip, tail):
+    """Teken een dart: dunne schacht met een brede flight aan het einde"""
+    frame = frame.copy()
+    cv2.line(frame, tip, tail, (40, 40, 200), 2)
+    cv2.circle(frame, tail, 9, (40, 200, 40), -1)
+    return frame
+
+
+def test_detect_dart_finds_tip_after_settling(detector):
+    detector.config['cameras']['camera1'] = {
+        'calibration': {'center': [80, 60], 'radius': 40, 'rotation': 0, 'frame_size': [160, 120]}
+    }
+    empty = make_board()
+    assert detector.detect_dart(empty, 'camera1') == (False, None)
+
+    dart = throw_dart(empty, (180, 100), (220, 60))
+    results = [detector.detect_dart(dart, 'camera1') for _ in range(4)]
+    found = [info for detected, info in results if detected]
+    assert len(found) == 1
+    info = found[0]
+    # Kalibratie is geschaald naar het 320x240 frame
+    assert info['board_center'] == (160, 120) and info['board_radius'] == 80
+    assert abs(info['position'][0] - 180) <= 3 and abs(info['position'][1] - 100) <= 3
+
+    # De dart hoort nu bij de referentie en wordt niet opnieuw gemeld
+    assert not any(detector.detect_dart(dart, 'camera1')[0] for _ in range(4))
+
+    # Een tweede dart wordt los van de eerste gevonden
+    second = throw_dart(dart, (130, 150), (100, 190))
+    found = [info for detected, info in (detector.detect_dart(second, 'camera1') for _ in range(4)) if detected]
+    assert len(found) == 1
+    assert abs(found[0]['position'][0] - 130) <= 3 and abs(found[0]['position'][1] - 150) <= 3
+
+
+def test_detect_dart_waits_for_motion_to_stop(detector):
+    detector.config['cameras']['camera1'] = {'calibration': {'center': [80, 60], 'radius': 40}}
+    # Zonder frame_size geldt de 640x360 kalibratie grootte
+    assert detector.camera_calibration('camera1', (720, 1280, 3)) == ((160.0, 120.0), 80.0)
+
+    empty = np.full((720, 1280, 3), 200, np.uint8)
+    detector.detect_dart(empty, 'camera1')
+    for offset in range(0, 40, 8):
+        moving = throw_dart(empty, (150 + offset, 100), (190 + offset, 60))
+        assert not detector.detect_dart(moving, 'camera1')[0]
+    settled = [detector.detect_dart(moving, 'camera1')[0] for _ in range(3)]
+    assert settled == [False, False, True]
+
+
+def test_board_plane_maps_calibrations_to_one_plane(detector):
+    detector.config['cameras']['camera1'] = {
+        'calibration': {'center': [80, 60], 'radius': 40, 'rotation': 0, 'frame_size': [160, 120]}
+    }
+    detector.config['cameras']['camera2'] = {
+        'calibration': {'center': [100, 90], 'radius': 50, 'rotation': 90, 'frame_size': [320, 240]}
+    }
+    plane1 = detector.board_plane('camera1', (240, 320, 3))
+    plane2 = detector.board_plane('camera2', (240, 320, 3))
+    assert detector.board_plane('camera3', (240, 320, 3)) is None
+
+    assert np.allclose(plane1.to_board([(160, 120)]), [CANONICAL_CENTER])
+    assert np.allclose(plane1.to_board([(240, 120)]), [(CANONICAL_CENTER[0] + CANONICAL_RADIUS, CANONICAL_CENTER[1])])
+    assert plane1.local_scale((160, 120)) == pytest.approx(CANONICAL_RADIUS / 80)
+    # Rotatie van de kalibratie wordt eruit gehaald
+    assert np.allclose(plane2.to_board([(100, 140)]), [(CANONICAL_CENTER[0] + CANONICAL_RADIUS, CANONICAL_CENTER[1])])
+    assert np.allclose(plane2.to_image(plane2.to_board([(123, 77)])), [(123, 77)])
+
+    dart = throw_dart(make_board(), (180, 100), (220, 60))
+    detector.detect_dart(make_board(), 'camera1')
+    found = [info for detected, info in (detector.detect_dart(dart, 'camera1') for _ in range(4)) if detected]
+    assert np.allclose(found[0]['board_position'], plane1.to_board_point(found[0]['position']))
+
+
+def test_fusion_emits_one_weighted_throw():
+    fusion = ThrowFusion(['camera1', 'camera2', 'camera3'], {'window': 0.5, 'max_spread': 20})
+    fusion.add('camera1', (100, 100), 1.0, timestamp=10.0)
+    assert fusion.poll(now=10.1) is None
+    fusion.add('camera2', (110, 100), 1.0, scale=2.0, timestamp=10.1)
+    fusion.add('camera3', (300, 300), 1.0, timestamp=10.2)
+
+    throw = fusion.poll(now=10.2)
+    # camera3 ligt te ver weg; camera2 telt een kwart door zijn grotere schaal
+    assert throw['cameras'] == ['camera1', 'camera2'] and throw['rejected'] == ['camera3']
+    assert throw['position'] == pytest.approx((102.0, 100.0))
+    assert throw['board_radius'] == CANONICAL_RADIUS
+    assert fusion.poll(now=10.3) is None
+
+    # Een late melding van dezelfde dart levert geen tweede worp op
+    fusion.add('camera1', (101, 100), 1.0, timestamp=10.4)
+    assert fusion.poll(now=11.0) is None
+
+    # Zonder alle camera's wordt de worp na het window toch uitgegeven
+    fusion.add('camera2', (50, 60), 0.5, timestamp=12.0)
+    assert fusion.poll(now=12.2) is None
+    assert fusion.poll(now=12.6)['position'] == pytest.approx((50.0, 60.0))
+    assert fusion.emitted == 2
+
+
+def test_rectify_produces_canonical_board_and_caches_maps(detector, tmp_path, monkeypatch):
+    detector.config['cameras']['camera1'] = {
+        'calibration': {'center': [160, 120], 'radius': 80, 'rotation': 0, 'frame_size': [320, 240]}
+    }
+    board = detector.rectify(make_board(), 'camera1', cache_path=str(tmp_path))
+    assert board.shape == (CANONICAL_SIZE, CANONICAL_SIZE, 3)
+    center, radius = int(CANONICAL_CENTER[0]), int(CANONICAL_RADIUS)
+    assert board[center, center + radius].max() < 60 and board[center, center + radius // 2].min() > 180
+    assert len(list(tmp_path.glob('remap_*.npz'))) == 1
+    # Buffer wordt hergebruikt
+    assert detector.rectify(make_board(), 'camera1', cache_path=str(tmp_path)) is board
+
+    # Een nieuwe detector leest de maps van schijf
+    other = DartboardDetector(CONFIG_PATH)
+    other.config['cameras'] = detector.config['cameras']
+    monkeypatch.setattr('src.rectify.build_maps', lambda *args: pytest.fail('maps opnieuw berekend'))
+    assert np.array_equal(other.rectify(make_board(), 'camera1', cache_path=str(tmp_path)), board)
+
+
+def test_rectify_maps_include_lens_model():
+    homography = np.eye(3)
+    plain = build_maps(homography, size=64)
+    matrix = np.array([[100.0, 0, 32], [0, 100.0, 32], [0, 0, 1]])
+    assert np.array_equal(build_maps(homography, matrix, np.zeros(5), size=64)[0], plain[0])
+
+    # Tonvormige vervorming trekt de hoeken naar het midden van het ruwe beeld
+    distorted = build_maps(homography, matrix, np.array([-0.3, 0, 0, 0, 0]), size=64)
+    assert (np.abs(distorted[0][0, 0] - 32) < np.abs(plain[0][0, 0] - 32)).all()
+
+
+def test_rectify_undistorts_calibration_measured_on_raw_frame():
+    matrix = np.array([[300.0, 0, 160], [0, 300.0, 120], [0, 0, 1]])
+    distortion = np.array([-0.3, 0, 0, 0, 0])
+    # De dubbele ring zoals de detector hem op het ruwe (vervormde) frame ziet
+    center, radius = (160.0, 120.0), 100.0
+    homography = similarity_homography(center, radius)
+    lens = {'matrix': matrix.tolist(), 'distortion': distortion.tolist()}
+    rectifier = load_rectifier((320, 240), homography, lens, size=CANONICAL_SIZE)
+
+    map_x, map_y = cv2.convertMaps(rectifier.map1, rectifier.map2, cv2.CV_32FC1)
+    # De canonieke ring moet weer op de gemeten ring in het ruwe frame uitkomen
+    for u, v in ((CANONICAL_CENTER[0] + CANONICAL_RADIUS, CANONICAL_CENTER[1]),
+                 (CANONICAL_CENTER[0], CANONICAL_CENTER[1] - CANONICAL_RADIUS)):
+        x, y = map_x[int(v), int(u)], map_y[int(v), int(u)]
+        assert np.hypot(x - center[0], y - center[1]) == pytest.approx(radius, abs=0.5)
+    x, y = map_x[int(CANONICAL_CENTER[1]), int(CANONICAL_CENTER[0])], map_y[int(CANONICAL_CENTER[1]), int(CANONICAL_CENTER[0])]
+    assert (x, y) == pytest.approx(center, abs=0.5)
+
+
+def test_coarse_to_fine_refines_at_full_resolution(detector):
+    pipeline = detector.pipeline
+    assert pipeline.coarse_scale < 1.0
+
+    frame = make_board(center=(650, 355), radius=250, size=(720, 1280))
+    # Een dart over de ring en de triple ring als afleiding
+    cv2.line(frame, (650, 355), (650, 80), (0, 0, 255), 4)
+    cv2.circle(frame, (650, 355), 150, (20, 20, 20), 6)
+    x, y, r = pipeline.detect(frame)
+    assert abs(x - 650) <= 1 and abs(y - 355) <= 1 and abs(r - 250) <= 1
+    # HoughCircles draaide op het grove niveau
+    assert pipeline.shape == (180, 320)
+
+
+def test_realistic_dart_passes_configured_confidence(detector):
+    with open(os.path.join(os.path.dirname(CONFIG_PATH), 'camera_config.json')) as f:
+        scheduler = DetectionScheduler(json.load(f)['global_settings'])
+    detector.config['cameras']['camera1'] = {
+        'calibration': {'center': [80, 60], 'radius': 40, 'rotation': 0, 'frame_size': [160, 120]}
+    }
+    empty = make_board()
+    detector.detect_dart(empty, 'camera1')
+
+    # Verkort in beeld: korte, dikke barrel met een brede flight erachter
+    dart = empty.copy()
+    cv2.line(dart, (140, 110), (170, 110), (40, 40, 160), 8)
+    cv2.fillPoly(dart, [np.array([[165, 110], [195, 95], [195, 125]], np.int32)], (40, 160, 40))
+    found = [info for detected, info in (detector.detect_dart(dart, 'camera1') for _ in range(4)) if detected]
+    assert len(found) == 1 and scheduler.accept('camera1', found[0])
+
+    # Een ronde vlek (schaduw, hand) is geen dart
+    blob = dart.copy()
+    cv2.circle(blob, (150, 160), 12, (60, 60, 60), -1)
+    found = [info for detected, info in (detector.detect_dart(blob, 'camera1') for _ in range(4)) if detected]
+    assert len(found) == 1 and not scheduler.accept('camera1', found[0])
+
+
+def test_scheduler_runs_detection_only_after_motion_in_board():
+    scheduler = DetectionScheduler({'detection_interval_ms': 100, 'min_detection_confidence': 0.8,
+                                    'motion_hold_ms': 500})
+    board = ((640, 360), 250)
+    empty = np.full((300, 400, 3), 200, np.uint8)
+
+    # Eerste frame: referentie voor de detectie
+    assert scheduler.should_detect('camera1', empty, board, (720, 1280), now=0.0)
+    assert not scheduler.should_detect('camera1', empty, board, (720, 1280), now=0.2)
+    assert not scheduler.should_detect('camera1', empty, board, (720, 1280), now=0.6)
+
+    # Beweging naast het bord telt niet
+    outside = empty.copy()
+    cv2.rectangle(outside, (0, 0), (40, 40), (0, 0, 0), -1)
+    assert not scheduler.should_detect('camera1', outside, board, (720, 1280), now=0.7)
+
+    dart = empty.copy()
+    cv2.line(dart, (200, 150), (230, 120), (0, 0, 0), 6)
+    assert scheduler.should_detect('camera1', dart, board, (720, 1280), now=0.8)
+    # Binnen het interval niet opnieuw, daarna wel zolang de camera actief is
+    assert not scheduler.should_detect('camera1', dart, board, (720, 1280), now=0.85)
+    assert scheduler.should_detect('camera1', dart, board, (720, 1280), now=0.95)
+    assert not scheduler.should_detect('camera1', dart, board, (720, 1280), now=1.4)
+    assert scheduler.get_stats()['camera1'] == {'checked': 8, 'motion': 1, 'detected': 3, 'rejected': 0}
+
+    assert scheduler.accept('camera1', {'confidence': 0.9})
+    assert not scheduler.accept('camera1', {'confidence': 0.5})
+
+
+def make_segmented_board(rotation, center=(320, 180), radius=150, size=(360, 640)):
+    """Standaard bord (zwarte 20 boven) dat `rotation` graden gedraaid is"""
+    frame = np.full(size + (3,), 230, np.uint8)
+    for segment in range(0, 20, 2):
+        angles = np.radians(STANDARD_SEGMENT_START + segment * 18 + rotation + np.arange(19))
+        reach = radius * 0.9
+        points = np.column_stack((center[0] + reach * np.cos(angles), center[1] + reach * np.sin(angles)))
+        cv2.fillPoly(frame, [np.vstack(([center], points)).astype(np.int32)], (20, 20, 20))
+    cv2.circle(frame, center, radius, (20, 20, 20), 6)
+    return frame
+
+
+@pytest.mark.parametrize('rotation', [0, 7, 22.5, 100, 351])
+def test_estimate_rotation_from_segments(detector, rotation):
+    frame = make_segmented_board(rotation)
+    assert detector.detect_board(frame)[0]
+    # Een ruwe handmatige rotatie kiest welke van de 10 kandidaten
+    estimate = detector.estimate_rotation(frame, prior=rotation + 12)
+    assert abs((estimate - rotation + 180) % 360 - 180) < 1.0
+
+
+def test_estimate_rotation_without_segments(detector):
+    frame = make_board(center=(320, 180), radius=150, size=(360, 640))
+    assert detector.detect_board(frame)[0]
+    assert detector.estimate_rotation(frame) is None
+
+
+def test_throw_lifecycle_scores_each_dart_once(detector):
+    detector.config['cameras']['camera1'] = {
+        'calibration': {'center': [160, 120], 'radius': 80, 'frame_size': [320, 240]}
+    }
+    empty = make_board()
+
+    def feed(frame, count=4):
+        return [info for detected, info in (detector.detect_dart(frame, 'camera1') for _ in range(count))
+                if detected]
+
+    feed(empty, 1)
+    assert detector.throw_state('camera1')['state'] == 'idle'
+
+    # In de lucht: beweging, nog geen detectie
+    flying = throw_dart(empty, (150, 90), (190, 50))
+    assert feed(flying, 1) == []
+    assert detector.throw_state('camera1')['state'] == 'in-flight'
+
+    first = throw_dart(empty, (180, 100), (220, 60))
+    assert len(feed(first, 10)) == 1
+    state = detector.throw_state('camera1')
+    assert state['state'] == 'scored' and state['darts_on_board'] == 1
+
+    # Een hand die voorbij komt zonder iets achter te laten
+    hand = first.copy()
+    cv2.circle(hand, (120, 150), 12, (90, 60, 60), -1)
+    assert feed(hand, 1) == [] and feed(first, 5) == []
+    assert detector.throw_state('camera1')['stats']['false_alarms'] == 1
+
+    second = throw_dart(first, (130, 150), (100, 190))
+    assert [info['darts_on_board'] for info in feed(second, 10)] == [2]
+
+    # Darts eruit: het bord is weer leeg
+    assert feed(empty, 10) == []
+    state = detector.throw_state('camera1')
+    assert state['state'] == 'darts-removed' and state['darts_on_board'] == 0
+    assert state['stats']['throws'] == 2 and state['stats']['removals'] == 1
+
+    assert len(feed(throw_dart(empty, (140, 160), (110, 200)), 10)) == 1
+
+
+def test_board_is_detected_again_after_board_roi(detector, monkeypatch):
+    camera_config = os.path.join(os.path.dirname(__file__), '..', 'config', 'camera_config.json')
+    manager = CameraManager(camera_config)
+    monkeypatch.setattr(manager, 'save_config', lambda: None)
+
+    sensor = make_board(center=(600, 380), radius=260, size=(720, 1280))
+    cv2.circle(sensor, (600, 380), int(260 * 0.58), (20, 20, 20), 6)
+
+    def half(roi):
+        crop = sensor[roi['y']:roi['y'] + roi['height'], roi['x']:roi['x'] + roi['width']]
+        return cv2.resize(crop, (crop.shape[1] // 2, crop.shape[0] // 2), interpolation=cv2.INTER_AREA)
+
+    detected, info = detector.track_board(half(manager.config['cameras']['camera1']['roi']), 'camera1')
+    assert detected
+    center, radius, frame_size = manager.apply_board_roi('camera1', info['center'], info['radius'],
+                                                          detector.board_frame_size)
+    detector.set_board_roi('camera1', manager.board_roi_padding('camera1'))
+    assert detector.board_center is None
+
+    # In de ROI vult de ring bijna het hele beeld; de dubbele ring, niet de triple, wordt gevonden
+    roi = dict(manager.config['cameras']['camera1']['roi'])
+    detected, info = detector.track_board(half(roi), 'camera1')
+    assert detected
+    assert abs(info['radius'] * 2 - 260) <= 4
+    assert abs(info['center'][0] * 2 + roi['x'] - 600) <= 4 and abs(info['center'][1] * 2 + roi['y'] - 380) <= 4
+
+    # Opnieuw opslaan vanuit de ROI geeft dezelfde ROI
+    manager.apply_board_roi('camera1', info['center'], info['radius'], detector.board_frame_size)
+    again = manager.config['cameras']['camera1']['roi']
+    assert abs(again['x'] - roi['x']) <= 4 and abs(again['width'] - roi['width']) <= 8
@@ -0,0 +1,143 @@
+import json
+import math
+import os
+
+import numpy as np
+import pytest
+
+from src.geometry import STANDARD_SEGMENTS, BoardGeometry
+from src.scoremap import ScoreMap, get_score_map
+from src.scorer import ScoreCalculator
+
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config', 'board_config.json')
+
+with open(CONFIG_PATH) as f:
+    REGIONS = json.load(f)['scoring_regions']
+GEOMETRY = BoardGeometry(REGIONS)
+
+
+def reference_score(point, center, radius, rotation=0):
+    """Score per punt op een standaard bord (20 boven), `rotation` graden gedraaid"""
+    dx, dy = point[0] - center[0], point[1] - center[1]
+    factor = math.hypot(dx, dy) / radius
+    angle = math.degrees(math.atan2(dy, dx)) % 360
+    value = STANDARD_SEGMENTS[int(((angle - 261 - rotation) % 360) / 18)]
+    if factor <= REGIONS['bullseye']['outer_radius_factor']:
+        return 50 if factor <= REGIONS['bullseye']['inner_radius_factor'] else 25
+    if REGIONS['doubles']['inner_radius_factor'] <= factor <= REGIONS['doubles']['outer_radius_factor']:
+        return value * 2
+    if REGIONS['triples']['inner_radius_factor'] <= factor <= REGIONS['triples']['outer_radius_factor']:
+        return value * 3
+    if factor > REGIONS['doubles']['outer_radius_factor']:
+        return 0
+    return value
+
+
+@pytest.mark.parametrize('rotation', [0, 13.5])
+def test_score_map_matches_per_point_scoring(rotation):
+    center, radius = (298, 166), 157
+    score_map = ScoreMap(center, radius, GEOMETRY, rotation)
+    rng = np.random.default_rng(1)
+    points = rng.integers([100, -20], [500, 360], size=(2000, 2))
+    expected = [reference_score(p, center, radius, rotation) for p in points]
+    assert score_map.scores(points).tolist() == expected
+
+
+def test_score_map_lookup_and_cache():
+    score_map = get_score_map((100, 100), 50, GEOMETRY)
+    assert get_score_map((100, 100), 50, BoardGeometry(REGIONS)) is score_map
+    assert get_score_map((100, 100), 51, GEOMETRY) is not score_map
+    assert get_score_map((100, 100), 50, GEOMETRY, rotation=18) is not score_map
+
+    # Triple 20 ligt boven het centrum
+    hit = score_map.lookup((100, 100 - 0.58 * 50))
+    assert (hit['segment_value'], hit['multiplier'], hit['score']) == (20, 3, 60)
+    assert score_map.lookup((100, 100))['score'] == 50
+    assert score_map.lookup((1000, 1000))['label'] == 0
+
+
+@pytest.fixture
+def scorer(tmp_path):
+    with open(CONFIG_PATH) as f:
+        config = json.load(f)
+    # Standaard layout: 20 boven (270 graden in beeldcoördinaten)
+    order = [6, 10, 15, 2, 17, 3, 19, 7, 16, 8, 11, 14, 9, 12, 5, 20, 1, 18, 4, 13]
+    config['point_values'] = {'segments': [{'angle': (i * 18 - 9) % 360, 'value': v}
+                                           for i, v in enumerate(order)]}
+    path = tmp_path / 'board_config.json'
+    path.write_text(json.dumps(config))
+    return ScoreCalculator(str(path))
+
+
+def test_calculate_score_uses_point_values_layout(scorer):
+    result = scorer.calculate_score((200, 200 - int(0.95 * 100)), (200, 200), 100)
+    assert result == {'score': 40, 'multiplier': 2, 'segment_value': 20}
+    assert scorer.get_player_score(1) == 461
+
+    assert scorer.calculate_score((200, 500), (200, 200), 100)['score'] == 0
+
+
+def test_calculate_scores_matches_score_map(scorer):
+    center, radius = (298.0, 166.0), 157.0
+    rng = np.random.default_rng(2)
+    points = rng.integers([100, -20], [500, 360], size=(5000, 2))
+    result = scorer.calculate_scores(points, center, radius)
+    score_map = scorer._score_map(center, radius)
+    labels = score_map.labels_at(points)
+    assert result['score'].tolist() == score_map.score_table[labels].tolist()
+    assert result['multiplier'].tolist() == score_map.multiplier_table[labels].tolist()
+    assert result['segment'].tolist() == score_map.value_table[labels].tolist()
+    # Batch scoren verandert de spelerstand niet
+    assert scorer.get_player_score(1) == 501
+
+
+def test_calculate_score_keeps_sub_pixel_positions(scorer):
+    center, radius = (200.0, 200.0), 101.0
+    score_map = scorer._score_map(center, radius)
+    # Binnen de double ring (98.98 px), maar afgerond op het pixelraster erbuiten
+    point = (200.0, 200.0 - 98.7)
+    assert score_map.lookup(point)['score'] == 40
+    assert scorer.calculate_scores([point], center, radius)['score'].tolist() == [40]
+    assert scorer.calculate_score(point, center, radius) == {'score': 40, 'multiplier': 2, 'segment_value': 20}
+
+    point = (200.0, 200.0 - 99.1)
+    assert scorer.calculate_score(point, center, radius)['score'] == 0
+
+    # Sub-pixel punten rond alle grenzen: de kaart en exact scoren zijn het eens
+    rng = np.random.default_rng(4)
+    points = rng.uniform(95, 305, size=(20000, 2))
+    assert score_map.scores(points).tolist() == scorer.calculate_scores(points, center, radius)['score'].tolist()
+    assert 0 < score_map.boundary.mean() < 0.5
+
+
+def test_missing_point_values_falls_back_to_standard_layout(tmp_path):
+    path = tmp_path / 'board_config.json'
+    path.write_text(json.dumps({'scoring_regions': REGIONS}))
+    scorer = ScoreCalculator(str(path))
+    assert scorer.geometry == BoardGeometry.from_config(json.load(open(CONFIG_PATH)))
+    points = np.array([[100, 100 - 58], [100, 100], [400, 400]])
+    assert scorer.calculate_scores(points, (100, 100), 100)['score'].tolist() == [60, 50, 0]
+    assert scorer.calculate_score((100, 42), (100, 100), 100)['score'] == 60
+    # Een kwart slag gedraaid bord: de 20 staat rechts
+    assert scorer.calculate_score((158, 100), (100, 100), 100, rotation=90)['score'] == 60
+
+
+def test_board_geometry_is_compiled_and_immutable():
+    assert GEOMETRY.segment_values[:3] == (10, 15, 2) and GEOMETRY.segment_offset == 9.0
+    assert GEOMETRY.bull_sq == pytest.approx(REGIONS['bullseye']['inner_radius_factor'] ** 2)
+    with pytest.raises(AttributeError):
+        GEOMETRY.segment_offset = 0.0
+    with pytest.raises(ValueError):
+        GEOMETRY.angle_lut[0] = 1
+
+    # De hoek tabel geeft op segmentgrenzen hetzelfde als de directe berekening
+    angles = np.radians(np.arange(0, 360, 0.5))
+    points = np.column_stack((np.cos(angles), np.sin(angles))) * 50
+    hits = GEOMETRY.score_points(points, (0, 0), 100)
+    expected = ((np.degrees(np.arctan2(points[:, 1], points[:, 0])) - 9.0) % 360 // 18).astype(int)
+    assert hits['segment_index'].tolist() == expected.tolist()
+    assert set(hits['multiplier'].tolist()) == {1}
+
+    with pytest.raises(ValueError):
+        BoardGeometry(REGIONS, [{'value': v, 'angle': i * 10} for i, v in enumerate(STANDARD_SEGMENTS)])